@@ -12,6 +12,12 @@ import json
 import logging
 import re
 import os
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from data_manager.numeric_fields import normalize_numeric_fields
+from services.rankings import RankingMaterializer, mark_cities_dirty
 
 os.environ["NEO4J_POOL_SIZE"] = "20"
 
@@ -109,6 +115,8 @@ class Neo4jClient:
                         tx.merge(feature_node, "Feature", "name")
                         tx.create(Relationship(delicacy, "HAS_FEATURE", feature_node))
 
+            # 标记受影响城市，排行榜在爬取结束后增量刷新
+            mark_cities_dirty(tx, [city_node["name"] for _, city_node in self.current_batch])
             tx.commit()
             logging.info(f"成功提交 {len(self.current_batch)} 个美食")
             self.current_batch = []
@@ -117,6 +125,14 @@ class Neo4jClient:
             logging.error(f"批量提交失败: {e}")
             self.current_batch = []
 
+    def refresh_rankings(self):
+        """增量刷新本次爬取涉及城市的排行榜"""
+        try:
+            counts = RankingMaterializer(self.graph).refresh_dirty()
+            logging.info(f"排行榜已刷新: {counts}")
+        except Exception as e:
+            logging.error(f"排行榜刷新失败: {str(e)[:200]}")
+
     def _clean_data(self, raw_data):
         cleaned = {}
         for k, v in raw_data.items():
@@ -125,6 +141,8 @@ class Neo4jClient:
                 if k == "price" and "￥" in v:
                     v = v.replace("￥", "").strip()
             cleaned[k] = v
+        # 数值字段解析为独立的数值属性（保留原始文本），便于索引排序和范围过滤
+        cleaned.update(normalize_numeric_fields(cleaned))
         return cleaned
 
 
@@ -180,6 +198,7 @@ class DelicacyCrawler:
                     logging.error(f"处理失败 [{city.get('city_name')}]: {str(e)[:200]}")
 
             self.neo4j._commit_batch()
+            self.neo4j.refresh_rankings()
             logging.info(f"处理完成！成功：{self.processed} 失败：{self.errors}")
         except Exception as e:
             logging.error(f"文件处理失败: {str(e)}")
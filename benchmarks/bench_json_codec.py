@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""聊天记录文件的 JSON 读写吞吐量基准
+
+对比原实现（标准库 json.dump(indent=2) / json.load）与当前编解码器的缩进、紧凑两种格式，
+以及流式解码。用法:
+    python benchmarks/bench_json_codec.py [--sizes 10000 100000 1000000] [--users 100]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from data_manager.json_codec import StdlibCodec, get_codec, iter_json  # noqa: E402
+
+
+def make_history(messages: int, users: int) -> dict:
+    """生成与 user_chat_history.json 结构相同的数据: {用户名: [消息, ...]}"""
+    history = {f"user{u:04d}": [] for u in range(users)}
+    names = list(history)
+    for i in range(messages):
+        role = "user" if i % 2 == 0 else "assistant"
+        content = "北京有哪些5A级景点？" if role == "user" else f"故宫博物院(热度{i % 97})、颐和园、八达岭长城"
+        history[names[i % users]].append({"role": role, "content": content})
+    return history
+
+
+def timed(fn) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def bench(messages: int, users: int, tmp_dir: str) -> list:
+    history = make_history(messages, users)
+    path = os.path.join(tmp_dir, "history.json")
+    rows = []
+
+    def baseline_save():
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(history, f, indent=2, ensure_ascii=False)
+
+    def baseline_load():
+        with open(path, "r", encoding="utf-8") as f:
+            json.loads(f.read())
+
+    save = timed(baseline_save)
+    rows.append(("baseline json indent=2", save, timed(baseline_load), os.path.getsize(path)))
+
+    codecs = [get_codec()] if isinstance(get_codec(), StdlibCodec) else [StdlibCodec(), get_codec()]
+    for codec in codecs:
+        for compact in (False, True):
+            def codec_save():
+                with open(path, "wb") as f:
+                    f.write(codec.dumps(history, compact=compact))
+
+            def codec_load():
+                with open(path, "rb") as f:
+                    codec.loads(f.read())
+
+            save = timed(codec_save)
+            label = f"{codec.name} {'compact' if compact else 'indent=2'}"
+            rows.append((label, save, timed(codec_load), os.path.getsize(path)))
+
+    rows.append(("streaming decode (compact)", 0.0,
+                 timed(lambda: sum(1 for _ in iter_json(path))), os.path.getsize(path)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--users", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for messages in args.sizes:
+            print(f"\n== {messages:,} messages / {args.users} users ==")
+            print(f"{'mode':<28}{'save s':>9}{'load s':>9}{'save msg/s':>14}{'load msg/s':>14}{'size MB':>10}")
+            for label, save, load, size in bench(messages, args.users, tmp_dir):
+                save_rate = f"{messages / save:,.0f}" if save else "-"
+                print(f"{label:<28}{save:>9.3f}{load:>9.3f}{save_rate:>14}"
+                      f"{messages / load:>14,.0f}{size / 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""地图渲染基准：逐行 folium.Marker 与单个 GeoJSON 图层
+
+对比两种方式生成地图 HTML 的耗时和 HTML 大小。用法:
+    python benchmarks/bench_map_render.py [--sizes 1000 10000 100000] [--marker-limit 20000]
+逐行 Marker 在点数很多时非常慢，超过 --marker-limit 的规模跳过该方式。
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import folium
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from services.map_layer import SightsMarkerLayer, encode_features  # noqa: E402
+
+TILES = 'https://webrd01.is.autonavi.com/appmaptile?lang=zh_cn&size=1&scale=1&style=8&x={x}&y={y}&z={z}'
+
+
+def make_points(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    lat = rng.uniform(18.0, 50.0, n)
+    lon = rng.uniform(75.0, 134.0, n)
+    names = np.array([f"景点{i}" for i in range(n)], dtype=object)
+    prices = rng.integers(0, 300, n).astype(str)
+    return lat, lon, names, prices
+
+
+def new_map():
+    return folium.Map(location=[35.0, 105.0], zoom_start=5, tiles=TILES, attr='高德地图')
+
+
+def render_markers(lat, lon, names, prices) -> str:
+    """原实现：每个景点一个 Marker + Popup + Icon"""
+    m = new_map()
+    for la, lo, name, price in zip(lat, lon, names, prices):
+        folium.Marker(
+            location=[la, lo],
+            popup=folium.Popup(f"<b>{name}</b>", max_width=120),
+            tooltip=f"{name} ¥{price}",
+            icon=folium.Icon(color='blue'),
+        ).add_to(m)
+    return m.get_root().render()
+
+
+def render_layer(lat, lon, names, prices) -> str:
+    """单个 GeoJSON 图层，提示和弹窗在浏览器端生成"""
+    m = new_map()
+    counts = np.ones(len(lat), dtype=np.int64)
+    SightsMarkerLayer(encode_features(lat, lon, {"name": names, "price": prices, "count": counts})).add_to(m)
+    return m.get_root().render()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--marker-limit", type=int, default=20_000)
+    args = parser.parse_args()
+
+    print(f"{'points':>8}  {'mode':<16}{'render s':>10}{'HTML MB':>10}")
+    for n in args.sizes:
+        points = make_points(n)
+        modes = [("geojson layer", render_layer)]
+        if n <= args.marker_limit:
+            modes.insert(0, ("folium.Marker", render_markers))
+        for label, render in modes:
+            started = time.perf_counter()
+            html = render(*points)
+            elapsed = time.perf_counter() - started
+            print(f"{n:>8}  {label:<16}{elapsed:>10.3f}{len(html.encode('utf-8')) / 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,84 @@ class Settings:
     NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
     NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "XXXXXXXX")
 
+    # 索引配置
+    APPLY_INDEXES_ON_STARTUP = os.getenv("APPLY_INDEXES_ON_STARTUP", "1") == "1"
+    INDEX_WAIT_TIMEOUT = float(os.getenv("INDEX_WAIT_TIMEOUT", "300"))
+    # 启动时等待索引上线的秒数，超时只打印状态不阻塞启动
+    STARTUP_INDEX_WAIT_TIMEOUT = float(os.getenv("STARTUP_INDEX_WAIT_TIMEOUT", "30"))
+
+    # 全文检索配置
+    FULLTEXT_ANALYZER = os.getenv("FULLTEXT_ANALYZER", "cjk")
+    FULLTEXT_MIN_SCORE = float(os.getenv("FULLTEXT_MIN_SCORE", "0.5"))
+    MAP_USE_FULLTEXT = os.getenv("MAP_USE_FULLTEXT", "0") == "1"
+    MAP_SUGGEST_LIMIT = int(os.getenv("MAP_SUGGEST_LIMIT", "200"))  # 有搜索词时景点下拉框的联想候选数
+
+    # 地图渲染配置
+    MAP_CLUSTER_CELL_PX = int(os.getenv("MAP_CLUSTER_CELL_PX", "80"))  # 聚合网格边长（屏幕像素）
+    MAP_CLUSTER_MAX_ZOOM = int(os.getenv("MAP_CLUSTER_MAX_ZOOM", "14"))  # 该级别及以上不再聚合
+    MAP_MAX_MARKERS = int(os.getenv("MAP_MAX_MARKERS", "500"))  # 单次渲染的标记数上限
+    MAP_VIEWPORT_PADDING = float(os.getenv("MAP_VIEWPORT_PADDING", "0.25"))  # 视野外额外加载的比例
+    MAP_RENDER_CACHE_MB = int(os.getenv("MAP_RENDER_CACHE_MB", "64"))  # 渲染结果缓存上限（所有会话共享）
+
+    # 周边检索配置
+    PROXIMITY_CELL_DEG = float(os.getenv("PROXIMITY_CELL_DEG", "0.1"))  # 近邻索引网格边长（度）
+    PROXIMITY_START_RADIUS_M = float(os.getenv("PROXIMITY_START_RADIUS_M", "2000"))  # k近邻的初始搜索半径
+    PROXIMITY_K = int(os.getenv("PROXIMITY_K", "5"))  # 周边推荐条数
+    NEAR_STATION_K = int(os.getenv("NEAR_STATION_K", "3"))  # 每个景点关联的最近地铁站数
+    NEAR_STATION_MAX_M = float(os.getenv("NEAR_STATION_MAX_M", "3000"))  # 超过该距离的地铁站不关联（米）
+
+    # 地铁路线规划配置
+    METRO_SPEED_KMH = float(os.getenv("METRO_SPEED_KMH", "35"))  # 列车平均运行速度
+    METRO_DWELL_SECONDS = float(os.getenv("METRO_DWELL_SECONDS", "30"))  # 每站停靠时间
+    METRO_TRANSFER_SECONDS = float(os.getenv("METRO_TRANSFER_SECONDS", "300"))  # 每次换乘耗时
+    METRO_TREE_CACHE = int(os.getenv("METRO_TREE_CACHE", "256"))  # 每个城市缓存的最短路径树数量
+
+    # 排行榜物化配置
+    RANKING_TOP_N = int(os.getenv("RANKING_TOP_N", "10"))
+    RANKED_AREAS_TTL = float(os.getenv("RANKED_AREAS_TTL", "600"))  # 意图路由的区域名缓存（秒）
+
+    # 图快照配置
+    GRAPH_SNAPSHOT_DIR = os.getenv("GRAPH_SNAPSHOT_DIR", str(Path(__file__).parent.parent / "data" / "snapshot"))
+    # 有快照时由内存图引擎回答常见查询；快照不会随数据库更新，默认关闭
+    USE_IN_MEMORY_ENGINE = os.getenv("USE_IN_MEMORY_ENGINE", "0") == "1"
+    # 快照导出超过该秒数视为过期，改由Neo4j回答（0 不检查）
+    GRAPH_SNAPSHOT_MAX_AGE = float(os.getenv("GRAPH_SNAPSHOT_MAX_AGE", "86400"))
+
+    # 批量查询配置
+    BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+
+    # 本地存储配置
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json")  # json / sqlite
+    SQLITE_DB_PATH = os.getenv("SQLITE_DB_PATH", str(Path(__file__).parent.parent / "data" / "app_store.sqlite3"))
+
+    # JSON 编解码配置
+    JSON_CODEC = os.getenv("JSON_CODEC", "auto")  # auto / orjson / msgspec / json
+    # 只由程序读写的文件以紧凑格式保存（不缩进）
+    JSON_COMPACT_FILES = os.getenv(
+        "JSON_COMPACT_FILES", "schema_cache.json,cypher_templates.json,sights_data.json,user_chat_history.json"
+    ).split(",")
+
+    # 聊天记录配置
+    CHAT_LOG_DIR = os.getenv("CHAT_LOG_DIR", str(Path(__file__).parent.parent / "data" / "chat_history"))
+    CHAT_SEGMENT_BYTES = int(os.getenv("CHAT_SEGMENT_BYTES", str(256 * 1024)))
+    CHAT_COMPACT_SEGMENTS = int(os.getenv("CHAT_COMPACT_SEGMENTS", "8"))  # 封存段超过该数量时后台合并
+    CHAT_HISTORY_TAIL = int(os.getenv("CHAT_HISTORY_TAIL", "200"))  # 进入页面时加载的最近消息数
+
+    # 后台写入配置（评分、评论、聊天消息）
+    WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "1") == "1"
+    WRITE_BEHIND_QUEUE_SIZE = int(os.getenv("WRITE_BEHIND_QUEUE_SIZE", "10000"))
+    WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "500"))
+    WRITE_BEHIND_MAX_STALENESS = float(os.getenv("WRITE_BEHIND_MAX_STALENESS", "1.0"))  # 改动最长延迟写入（秒）
+    WRITE_BEHIND_MAX_RETRIES = int(os.getenv("WRITE_BEHIND_MAX_RETRIES", "5"))  # 写入失败的重试次数，用尽后落盘
+    WRITE_BEHIND_RETRY_DELAY = float(os.getenv("WRITE_BEHIND_RETRY_DELAY", "1.0"))  # 首次重试等待（秒），之后逐次加倍
+    WRITE_BEHIND_SPILL_DIR = os.getenv(
+        "WRITE_BEHIND_SPILL_DIR", str(Path(__file__).parent.parent / "data" / "write_behind_failed")
+    )
+
+    # 数据缓存配置
+    DATA_CACHE_DIR = os.getenv("DATA_CACHE_DIR", str(Path(__file__).parent.parent / "data" / "cache"))
+    COORDINATES_CACHE_FORMAT = os.getenv("COORDINATES_CACHE_FORMAT", "auto")  # auto / feather / numpy
+
     # 领域实体配置
     DOMAIN_ENTITIES = ["attraction", "hotel", "restaurant"]
 
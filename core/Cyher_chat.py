@@ -1,16 +1,80 @@
 import json
+import re
+import time
 from datetime import datetime
 import traceback
 import ollama
 from data_manager.file_handler import FileHandler
+from data_manager.storage import StorageError
 from data_manager.schema_cache import SchemaCache
-from typing import Dict, List, Optional, Any
+from data_manager.graph_snapshot import get_snapshot
+from typing import Dict, List, Optional, Any, Tuple
 from services.database import Neo4jDriver
+from services.index_manager import ensure_indexes
+from services.fulltext_search import FullTextSearch, FULLTEXT_LABELS
+from services.rankings import RANKING_SPECS
+from services.graph_engine import get_engine
+from services.metro_routing import FASTEST, FEWEST_TRANSFERS, get_metro_router
+from services.proximity import get_sight_proximity
+from services.station_links import near_stations_cypher
+from config.settings import settings
+
+# 模糊名称过滤: s.name CONTAINS '故宫'
+_CONTAINS_NAME = re.compile(r"\b(\w+)\.name\s+CONTAINS\s+'([^']+)'")
+_SINGLE_ROW = re.compile(r"\bLIMIT\s+1\b", re.IGNORECASE)
+
+# 排行榜意图识别（读取物化的 TOP_RANKED 关系）
+_RANKING_LABELS = [
+    ("Restaurant", ["餐馆", "餐厅", "饭店", "馆子"]),
+    ("Delicacy", ["美食", "小吃", "特色菜"]),
+    ("Sight", ["景点", "景区", "好玩"]),
+]
+_RANKING_METRICS = [
+    ("star", ["星级"]),
+    ("score", ["评分", "口碑", "好评"]),
+]
+# 只有明确要排行/推荐时才读取排行，"有哪些"之类的泛问交给模板或大模型
+_RECOMMEND_WORDS = ["推荐", "排行", "最火", "热门", "必去"]
+# 带属性条件的问题（"广西的5A景点有哪些"、"人均100元以下"）不是排行，排行无法回答
+_ATTRIBUTE_FILTER = re.compile(r"[1-5１-５]\s*[AaＡ]|\d+(?:\.\d+)?\s*(?:分|元|块)|以上|以下|低于|高于|超过|不到")
+_RANKING_FIELDS = {
+    "Sight": "n.star AS star, n.heat AS heat",
+    "Restaurant": "n.comment_score AS comment_score, n.price_average AS price_average",
+    "Delicacy": "n.introduce AS introduce",
+}
+
+# 周边景点意图（由本地近邻索引回答，不生成Cypher）
+_NEARBY_WORDS = ["附近", "周边", "周围", "旁边"]
+_NEARBY_FILLERS = ["还有什么", "有什么", "有哪些", "好玩的", "景点", "景区", "地方"]
+# 问的是其他类型的周边实体时不走景点近邻
+_NEARBY_OTHER_WORDS = (["地铁", "车站", "吃", "餐", "美食", "酒店", "住宿"]
+                       + [w for label, words in _RANKING_LABELS if label != "Sight" for w in words])
+
+# 景点附近地铁站意图（读取预计算的 NEAR_STATION 关系）
+_STATION_WORDS = ["地铁站", "地铁"]
+_STATION_FILLERS = ["最近的", "最近", "有什么", "有哪些", "是哪个", "是什么", "哪个", "离", "在"]
+# "最近"单独出现也可能是"近期"，只认"离X最近"的说法
+_NEAREST_TO = re.compile(r"离(?P<mention>[^，,。？?]+?)最近")
+
+# 地铁路线意图（由内存地铁网络规划，不生成Cypher）: "从A到B怎么坐地铁"
+_ROUTE = re.compile(r"(?:从)?(?P<origin>[^，,。？?]+?)(?:到|去)(?P<destination>[^，,。？?]+?)"
+                    r"(?:地铁|怎么|如何|要|坐|乘|搭|换乘|的|[，,。？?]|$)")
+_FEWEST_TRANSFER_WORDS = ["少换乘", "换乘最少", "换乘少", "不换乘", "少转"]
+
+# 已物化排行的区域名（进程内缓存）
+_ranked_areas = {"loaded_at": 0.0, "areas": []}
+
+
+def _quote(value: str) -> str:
+    """转义Cypher字符串字面量中的单引号"""
+    return value.replace("'", "\\'")
 
 
 class LocalCypherGenerator:
     def __init__(self):
         self.neo4j_driver = Neo4jDriver()
+        ensure_indexes(self.neo4j_driver.driver)
+        self.fulltext = FullTextSearch(self.neo4j_driver.driver)
         self.schema_cache = SchemaCache(self.neo4j_driver.driver)
         self.schema = self.schema_cache.refresh_schema()
         self._setup_prompt_template()
@@ -20,7 +84,12 @@ class LocalCypherGenerator:
 
     def _load_templates(self) -> Dict:
         """安全加载模板数据，确保返回字典"""
-        data = self.file_handler.load_json(self.template_file)
+        try:
+            data = self.file_handler.load_json(self.template_file)
+        except StorageError as e:
+            # 模板只是缓存，文件损坏时从空模板开始
+            print(f"模板文件损坏，忽略: {str(e)}")
+            return {}
 
         # 处理可能的格式问题
         if data is None:
@@ -73,6 +142,8 @@ class LocalCypherGenerator:
         3. Sort results by rating descending
         4. Include LIMIT 5
         5. Return ONLY the Cypher query, no additional explanation
+        6. heat/comment_score/comment_number/price are raw text; sort and compare on
+           heat_num/comment_score_num/comment_number_num/price_num instead
         Example:
 
         # 优惠政策查询模式
@@ -105,13 +176,18 @@ class LocalCypherGenerator:
         Question: 我想去南宁玩，有什么推荐的景点吗？
         Cypher: MATCH (s:Sight)-[:LOCATED_IN]->(c:City {{name: '南宁'}})
                 RETURN s.name AS name, s.heat AS heat
-                ORDER BY heat DESC
+                ORDER BY s.heat_num DESC
                 LIMIT 5
         Question: 推荐一下北京的比较火的4A和5A景点？
         Cypher: MATCH (s:Sight)-[:LOCATED_IN]->(c:City)
                 WHERE c.name = '北京' AND s.star IN ['4A', '5A']
                 RETURN s.name AS name, s.heat AS heat, s.star AS star
-                ORDER BY heat DESC
+                ORDER BY s.heat_num DESC
+                LIMIT 5
+        Question: 推荐一下西安评分高的景点
+        Cypher: MATCH (c:City {{name: '西安'}})-[r:TOP_RANKED {{label: 'Sight', metric: 'score'}}]->(s)
+                RETURN s.name AS name, s.comment_score AS comment_score
+                ORDER BY r.rank
                 LIMIT 5
         Question: 广西的5A景点有哪些？
         Cypher: MATCH (s:Sight {{star: '5A'}})-[:LOCATED_IN]->(c:City)-[:BELONGS_TO]->(p:Province {{name: '广西'}})
@@ -135,14 +211,23 @@ class LocalCypherGenerator:
                 return template_data.get("cypher")
         return None
 
+    def answer_locally(self, question: str) -> Optional[Tuple[str, List[Dict]]]:
+        """无需生成Cypher即可回答的问题（本地索引或固定的批量查询），返回 (查询描述, 结果)；不匹配时返回None"""
+        return (self._match_route_intent(question) or self._match_nearby_intent(question)
+                or self._match_ranking_comparison(question))
+
     def generate_cypher(self, question: str) -> str:
         """通用查询生成方法"""
         try:
             # 1. 模板匹配
+            if stations := self._match_station_intent(question):
+                return stations
+            if ranking := self._match_ranking_intent(question):
+                return ranking
             if not isinstance(self.templates, dict):
                 self.templates = self._load_templates()
             if template := self._get_template_match(question):
-                return template
+                return self._resolve_entities(template)
 
             # 2. 调用大模型生成查询
             response = ollama.chat(
@@ -158,7 +243,7 @@ class LocalCypherGenerator:
             # 3. 基本语法验证
             if not cypher.startswith(("MATCH", "CREATE", "MERGE")):
                 raise ValueError("生成的Cypher格式无效")
-            return cypher
+            return self._resolve_entities(cypher)
 
         except Exception as e:
             print(f"[ERROR] 生成查询失败: {str(e)}\n{traceback.format_exc()}")
@@ -244,6 +329,212 @@ class LocalCypherGenerator:
     #         raise RuntimeError("查询生成失败")
 
 
+    def _get_ranked_areas(self) -> List[tuple]:
+        """已物化排行的区域 [(标签, 名称)]，城市优先、长名称优先"""
+        if time.time() - _ranked_areas["loaded_at"] > settings.RANKED_AREAS_TTL:
+            try:
+                snapshot = get_snapshot()
+                if snapshot is not None and "TOP_RANKED" in snapshot.rel_types:
+                    # 有快照时直接从快照冷启动，无需访问数据库
+                    src, _ = snapshot.relationships("TOP_RANKED")
+                    areas = snapshot.names_of(sorted(set(src.tolist())))
+                else:
+                    rows = self.execute_query("""
+                        MATCH (a) WHERE (a:City OR a:Province) AND EXISTS { (a)-[:TOP_RANKED]->() }
+                        RETURN labels(a)[0] AS label, a.name AS name
+                    """)
+                    areas = [(r["label"], r["name"]) for r in rows]
+                _ranked_areas["areas"] = sorted(
+                    ((label, name) for label, name in areas if name),
+                    key=lambda area: (area[0] != "City", -len(area[1]))
+                )
+            except Exception as e:
+                print(f"加载排行区域失败: {str(e)}")
+            _ranked_areas["loaded_at"] = time.time()
+        return _ranked_areas["areas"]
+
+    def _ranking_request(self, question: str) -> Optional[Tuple[str, str, List[tuple]]]:
+        """推荐类问题的 (实体标签, 排行指标, 提到的区域[(标签, 名称)])，区域按在问题中出现的顺序"""
+        if not any(word in question for word in _RECOMMEND_WORDS):
+            return None
+        if _ATTRIBUTE_FILTER.search(question):
+            return None
+        label = next((l for l, words in _RANKING_LABELS if any(w in question for w in words)), None)
+        if not label:
+            return None
+        areas = []
+        for area in self._get_ranked_areas():
+            if area[1] in question and not any(area[1] in matched[1] for matched in areas):
+                areas.append(area)
+        if not areas:
+            return None
+
+        metric = next((m for m, words in _RANKING_METRICS if any(w in question for w in words)), "heat")
+        if metric not in RANKING_SPECS[label]:
+            metric = "heat"
+        return label, metric, sorted(areas, key=lambda a: question.index(a[1]))
+
+    def _match_ranking_intent(self, question: str) -> Optional[str]:
+        """推荐类问题直接读取物化的 Top-N 排行（单个区域）"""
+        request = self._ranking_request(question)
+        if request is None or len(request[2]) != 1:
+            return None
+        label, metric, [(area_label, area_name)] = request
+        ranked = f"-[r:TOP_RANKED {{label: '{label}', metric: '{metric}'}}]->(n)"
+        return f"""
+            MATCH (a:{area_label} {{name: '{_quote(area_name)}'}}){ranked}
+            RETURN n.name AS name, {_RANKING_FIELDS[label]}
+            ORDER BY r.rank
+            LIMIT 5
+        """.strip()
+
+    def _match_ranking_comparison(self, question: str) -> Optional[Tuple[str, List[Dict]]]:
+        """多区域对比（如"比较北京、上海、西安的热门景点"）：一次批量查询取回各区域排行"""
+        request = self._ranking_request(question)
+        if request is None or len(request[2]) < 2:
+            return None
+        label, metric, areas = request
+        # 每行带上区域标签，北京等同时是城市和省份的区域只取识别出的那一个
+        template = f"""
+            MATCH (a:City|Province {{name: row.area}})
+            WHERE row.area_label IN labels(a)
+            MATCH (a)-[r:TOP_RANKED {{label: row.label, metric: row.metric}}]->(n)
+            RETURN a.name AS area, n.name AS name, {_RANKING_FIELDS[label]}
+            ORDER BY r.rank
+            LIMIT 5
+        """
+        rows = [{"area": name, "area_label": area_label, "label": label, "metric": metric}
+                for area_label, name in areas]
+        records = [record for group in self.neo4j_driver.execute_bulk(template, rows) for record in group]
+        names = ", ".join(f"{area_label} '{_quote(name)}'" for area_label, name in areas)
+        return f"RANKING {label}.{metric} IN {names}", records
+
+    def _match_route_intent(self, question: str) -> Optional[Tuple[str, List[Dict]]]:
+        """"从A到B怎么坐地铁"：A、B 可以是地铁站名或景点（经由最近的地铁站）"""
+        if "地铁" not in question:
+            return None
+        match = _ROUTE.search(question)
+        if not match:
+            return None
+        router = get_metro_router()
+        if router is None:
+            return None
+        # "我想从A到B"：起点取最后一个"从"之后的部分
+        origin = self._resolve_route_endpoint(router, match.group("origin").split("从")[-1])
+        destination = self._resolve_route_endpoint(router, match.group("destination"))
+        if origin is None or destination is None:
+            return None
+
+        mode = FEWEST_TRANSFERS if any(w in question for w in _FEWEST_TRANSFER_WORDS) else FASTEST
+        route = router.route(origin, destination, mode)
+        if route is None:
+            return None
+        summary = {
+            "name": f"{route['from']} → {route['to']}",
+            "minutes": route["minutes"],
+            "transfers": route["transfers"],
+            "distance_km": round(route["distance_m"] / 1000, 1),
+        }
+        if route["walk_from_m"] or route["walk_to_m"]:
+            summary["walk_m"] = route["walk_from_m"] + route["walk_to_m"]
+        description = f"ROUTE {route['city']}: '{_quote(route['from'])}' -> '{_quote(route['to'])}' ({mode})"
+        return description, [summary] + route["legs"]
+
+    def _resolve_route_endpoint(self, router, mention: str):
+        """地铁站名原样返回，景点返回其 (纬度, 经度)，无法识别时返回None"""
+        mention = mention.strip("的 ")
+        for name in (mention, mention[:-1] if mention.endswith("站") else None):
+            if name and router.cities_of(name):
+                return name
+        try:
+            index = get_sight_proximity()
+        except Exception as e:
+            print(f"加载景点近邻索引失败: {str(e)}")
+            return None
+        name = mention if index.position(mention) is not None else None
+        if name is None:
+            try:
+                name = self.fulltext.resolve(mention, label="Sight")
+            except Exception as e:
+                print(f"实体解析失败: {str(e)}")
+        i = index.position(name) if name else None
+        return None if i is None else (float(index.lat[i]), float(index.lon[i]))
+
+    def _match_station_intent(self, question: str) -> Optional[str]:
+        """"X附近有什么地铁站"类问题：一跳读取 NEAR_STATION 关系"""
+        if not any(word in question for word in _STATION_WORDS):
+            return None
+        nearest = _NEAREST_TO.search(question)
+        if nearest:
+            mention = nearest.group("mention")
+        elif any(word in question for word in _NEARBY_WORDS):
+            mention = self._clean_question(question, _NEARBY_WORDS + _STATION_WORDS + _STATION_FILLERS)
+        else:
+            return None
+        mention = mention.strip("的？?。！!，, ")
+        if not mention:
+            return None
+        # 只有解析到确切的景点才生成查询，否则交给模板或大模型
+        try:
+            hit = self.fulltext.resolve_hit(mention, label="Sight")
+        except Exception as e:
+            print(f"实体解析失败: {str(e)}")
+            return None
+        if not hit:
+            return None
+        # 同名景点可能分布在多个城市，按解析到的景点所在城市定位
+        return near_stations_cypher(hit["name"], hit.get("city"))
+
+    def _match_nearby_intent(self, question: str) -> Optional[Tuple[str, List[Dict]]]:
+        """"X附近还有什么"类问题：用景点近邻索引找出距离最近的景点"""
+        if not any(word in question for word in _NEARBY_WORDS):
+            return None
+        if any(word in question for word in _NEARBY_OTHER_WORDS):
+            return None
+        try:
+            index = get_sight_proximity()
+        except Exception as e:
+            print(f"加载景点近邻索引失败: {str(e)}")
+            return None
+
+        mention = self._clean_question(question, _NEARBY_WORDS + _NEARBY_FILLERS).strip("的？?。！!，, ")
+        if not mention:
+            return None
+        name = mention if index.position(mention) is not None else None
+        if name is None:
+            try:
+                name = self.fulltext.resolve(mention, label="Sight")
+            except Exception as e:
+                print(f"实体解析失败: {str(e)}")
+        if not name or index.position(name) is None:
+            return None
+
+        k = settings.PROXIMITY_K
+        records = [{"name": r["name"], "distance_km": round(r["distance_m"] / 1000, 2)}
+                   for r in index.nearest_to(name, k)]
+        return f"NEARBY (s:Sight {{name: '{_quote(name)}'}}) LIMIT {k}", records
+
+    def _resolve_entities(self, cypher: str) -> str:
+        """单实体查询(LIMIT 1)中用全文索引把 name CONTAINS '片段' 解析为精确实体名，走索引等值查找"""
+        if not _SINGLE_ROW.search(cypher):
+            return cypher
+
+        def replace(match):
+            var, mention = match.group(1), match.group(2)
+            label = re.search(rf"\(\s*{var}\s*:\s*(\w+)", cypher)
+            if not label or label.group(1) not in FULLTEXT_LABELS:
+                return match.group(0)
+            try:
+                name = self.fulltext.resolve(mention, label=label.group(1))
+            except Exception as e:
+                print(f"实体解析失败: {str(e)}")
+                return match.group(0)
+            if not name:
+                return match.group(0)
+            return f"{var}.name = '{_quote(name)}'"
+
+        return _CONTAINS_NAME.sub(replace, cypher)
+
     def _clean_question(self, question: str, remove_words: List[str]) -> str:
         """清理问题中的干扰词"""
         for word in remove_words:
@@ -252,6 +543,15 @@ class LocalCypherGenerator:
 
     def execute_query(self, cypher: str) -> Any:
         """执行Cypher查询并安全返回结果"""
+        # 常见模板形态优先由内存图引擎回答，不支持的形态回退到Neo4j
+        if settings.USE_IN_MEMORY_ENGINE:
+            try:
+                engine = get_engine()
+                records = engine.try_execute(cypher) if engine else None
+                if records is not None:
+                    return records
+            except Exception as e:
+                print(f"内存图引擎执行失败，回退到Neo4j: {str(e)}")
         try:
             with self.neo4j_driver.driver.session() as session:
                 result = session.run(cypher)
@@ -6,7 +6,10 @@ from typing import Dict, List
 from datetime import datetime
 import json
 import traceback
-from data_manager.file_handler import FileHandler
+from data_manager.chat_log import get_chat_log
+from data_manager.write_behind import get_write_queue
+from services.map_cache import get_map_cache
+from config.settings import settings
 
 
 def format_neo4j_results(results: List[Dict]) -> str:
@@ -92,29 +95,26 @@ def user_page(session_state=None):
         st.warning("请先登录")
         return
 
-    # 初始化文件处理器
-    file_handler = FileHandler()
-    chat_history_file = "user_chat_history.json"
+    # 追加式聊天记录存储（按用户分片）
+    chat_log = get_chat_log()
 
     # 用户隔离的session key
     user_session_key = f"user_{username}_messages"
     last_query_key = f"user_{username}_last_query"
 
     def load_chat_history():
-        """加载当前用户的聊天历史"""
+        """加载当前用户最近的聊天历史"""
         try:
-            history = file_handler.load_json(chat_history_file) or {}
-            return history.get(username, [])
+            return chat_log.tail(username, settings.CHAT_HISTORY_TAIL)
         except Exception as e:
             print(f"加载聊天记录失败: {str(e)}")
             return []
 
-    def save_chat_history(messages: List[Dict]):
-        """保存当前用户的聊天历史"""
+    def append_message(message: Dict):
+        """追加一条消息到会话和聊天记录"""
+        session_state[user_session_key].append(message)
         try:
-            history = file_handler.load_json(chat_history_file) or {}
-            history[username] = messages
-            file_handler.save_json(chat_history_file, history)
+            chat_log.append(username, message)
         except Exception as e:
             st.error(f"保存聊天记录失败: {str(e)}")
             print(f"保存聊天记录失败: {str(e)}")
@@ -140,15 +140,21 @@ def user_page(session_state=None):
             session_state[user_session_key] = [
                 {"role": "assistant", "content": "您好！我是智能旅行助手，请问有什么可以帮您？"}
             ]
-            save_chat_history(session_state[user_session_key])
+            chat_log.clear(username, session_state[user_session_key])
             st.rerun()
 
         if session_state.get("role") == "admin":
             st.subheader("管理员工具")
             if st.checkbox("📊 查看所有聊天记录"):
-                history = file_handler.load_json(chat_history_file) or {}
-                selected_user = st.selectbox("选择用户", list(history.keys()))
-                st.json(history[selected_user])
+                selected_user = st.selectbox("选择用户", chat_log.users())
+                if selected_user:
+                    st.json(chat_log.read_all(selected_user))
+            if st.checkbox("💾 后台写入状态"):
+                # 队列深度、已写入条数、批次数与写入耗时
+                st.json(get_write_queue().stats())
+            if st.checkbox("🗺️ 地图渲染缓存"):
+                # 命中/未命中/淘汰次数与缓存占用字节数
+                st.json(get_map_cache().stats())
 
     # 显示当前用户的历史消息
     for msg in session_state[user_session_key]:
@@ -157,8 +163,7 @@ def user_page(session_state=None):
     # 处理用户输入
     if prompt := st.chat_input():
         # 保存用户消息
-        session_state[user_session_key].append({"role": "user", "content": prompt})
-        save_chat_history(session_state[user_session_key])
+        append_message({"role": "user", "content": prompt})
         st.chat_message("user").write(prompt)
 
         # 初始化工具类
@@ -166,9 +171,13 @@ def user_page(session_state=None):
         correction_db = CorrectionDB()
 
         try:
-            # 生成并执行查询
-            cypher_query = cypher_chat.generate_cypher(prompt)
-            raw_results = cypher_chat.execute_query(cypher_query)
+            # 周边、路线和多区域排行问题直接回答，其余生成并执行查询
+            local_answer = cypher_chat.answer_locally(prompt)
+            if local_answer is not None:
+                cypher_query, raw_results = local_answer
+            else:
+                cypher_query = cypher_chat.generate_cypher(prompt)
+                raw_results = cypher_chat.execute_query(cypher_query)
 
             # 仅管理员可见CYPHER语句
             if session_state.get("role") == "admin":
@@ -185,10 +194,7 @@ def user_page(session_state=None):
             }
 
             # 保存并显示结果
-            session_state[user_session_key].append(
-                {"role": "assistant", "content": response}
-            )
-            save_chat_history(session_state[user_session_key])
+            append_message({"role": "assistant", "content": response})
             st.chat_message("assistant").write(response)
         except Exception as e:
             # Initialize correction_db if not already done
@@ -205,11 +211,10 @@ def user_page(session_state=None):
                   1. 换种方式提问
                   2. 联系管理员修复
                   """
-            session_state[user_session_key].append({
+            append_message({
                 "role": "assistant",
                 "content": error_detail
             })
-            save_chat_history(session_state[user_session_key])
             st.chat_message("assistant").write(error_detail)
 
             # 记录错误详情
@@ -1,26 +1,22 @@
-import json
-import os
 from datetime import datetime
-from pathlib import Path
-from typing import List, Dict
+from typing import Callable, List, Dict
+
+from data_manager.file_handler import FileHandler
 
 
 class CorrectionDB:
     def __init__(self, db_file: str = "correction_requests.json"):
-        # 确保使用绝对路径
-        self.db_file = str(Path(__file__).parent.parent / "data" / db_file)
-        os.makedirs(Path(self.db_file).parent, exist_ok=True)
+        self.file_handler = FileHandler()
+        self.db_file = db_file
 
         # 如果文件不存在则创建
-        if not os.path.exists(self.db_file):
-            with open(self.db_file, 'w') as f:
-                json.dump([], f)
+        if not self.file_handler.exists(self.db_file):
+            self.file_handler.save_json(self.db_file, [])
 
     def add_request(self, question: str, generated_cypher: str, error_msg: str,
                     feedback_type: str = "system_error") -> None:
         """添加修正请求（增加反馈类型）"""
-        requests = self.get_all_requests()
-        requests.append({
+        self.file_handler.append_item(self.db_file, {
             "question": question,
             "generated_cypher": generated_cypher,
             "error_msg": error_msg,
@@ -29,13 +25,11 @@ class CorrectionDB:
             "feedback_type": feedback_type,  # system_error/user_dissatisfied
             "timestamp": datetime.now().isoformat()
         })
-        self._save_requests(requests)
 
 
     def get_all_requests(self, status: str = None) -> List[Dict]:
         """获取所有修正请求，可筛选状态"""
-        with open(self.db_file, 'r') as f:
-            requests = json.load(f)
+        requests = self.file_handler.load_json(self.db_file) or []
 
         if status:
             return [r for r in requests if r["status"] == status]
@@ -43,20 +37,20 @@ class CorrectionDB:
 
     def resolve_request(self, question: str, corrected_cypher: str) -> None:
         """解决修正请求"""
-        requests = self.get_all_requests()
-        for req in requests:
-            if req["question"] == question and req["status"] == "pending":
-                req["corrected_cypher"] = corrected_cypher
-                req["status"] = "resolved"
-                break
-        self._save_requests(requests)
+        def resolve(requests):
+            requests = requests or []
+            for req in requests:
+                if req["question"] == question and req["status"] == "pending":
+                    req["corrected_cypher"] = corrected_cypher
+                    req["status"] = "resolved"
+                    break
+            return requests
+        self._update_requests(resolve)
 
     def delete_resolved(self) -> None:
         """删除已解决的请求"""
-        requests = [r for r in self.get_all_requests() if r["status"] != "resolved"]
-        self._save_requests(requests)
+        self._update_requests(lambda requests: [r for r in requests or [] if r["status"] != "resolved"])
 
-    def _save_requests(self, requests: List[Dict]) -> None:
-        """保存请求到文件"""
-        with open(self.db_file, 'w') as f:
-            json.dump(requests, f, indent=2, ensure_ascii=False)
\ No newline at end of file
+    def _update_requests(self, fn: Callable[[List[Dict]], List[Dict]]) -> None:
+        """并发安全地读-改-写请求列表（其他进程同时写入时自动重试）"""
+        self.file_handler.update(self.db_file, fn)
@@ -1,15 +1,89 @@
 # -*- coding: utf-8 -*-
-import time  # 正确的 time 模块导入
 import streamlit as st
+import numpy as np
 import pandas as pd
 from pathlib import Path
 import folium
 from streamlit_folium import st_folium
 from data_manager.sights_data import SightsData
+from data_manager.coordinates_cache import load_coordinates
+from services.marker_clustering import MarkerClusterer
+from services.map_cache import get_map_cache, normalize_query, zoom_bucket
+from services.map_layer import SightsMarkerLayer, encode_features
+from services.proximity import get_sight_proximity
+from services.sight_search import SightSearchIndex
+from services.spatial_index import GridIndex, bounds_from_folium, contains, estimate_bounds, pad_bounds
+from config.settings import settings
 
 # 在 sights_map.py 开头添加页面配置
 st.set_page_config(page_title="中国景点地图", layout="wide")
 
+
+@st.cache_resource
+def get_fulltext_search():
+    """全文检索服务（进程内共享一个Neo4j连接）"""
+    from services.database import Neo4jDriver
+    from services.fulltext_search import FullTextSearch
+    return FullTextSearch(Neo4jDriver().driver)
+
+
+@st.cache_resource(max_entries=2)
+def get_search_index(data_version, _df):
+    """景点名称/地址检索索引，坐标表内容不变时在所有会话间共用（行号对应 _df 的位置）"""
+    return SightSearchIndex(_df["name"].tolist(), _df["address"].tolist())
+
+
+def fulltext_sight_names(query, limit=500):
+    """通过Neo4j全文索引检索景点名称，按相关度排序；不可用时返回None"""
+    try:
+        result = get_fulltext_search().search(query, labels=["Sight"], page_size=limit)
+        return [hit["name"] for hit in result["hits"]]
+    except Exception as e:
+        print(f"全文检索不可用，回退到本地筛选: {str(e)}")
+        return None
+
+def with_avg_rating(df, sights_data):
+    """合并评分统计表，向量化计算平均评分: (评分和 + 初始评分) / (评分数 + 1)"""
+    ratings = sights_data.ratings_frame()
+    merged = df.merge(ratings, on="name", how="left")
+    count = merged["rating_count"].fillna(0).to_numpy(dtype=np.float64)
+    total = merged["rating_sum"].fillna(0).to_numpy(dtype=np.float64)
+    initial = merged["initial_rating"].to_numpy(dtype=np.float64)
+    merged["avg_rating"] = (total + initial) / (count + 1)
+    merged.index = df.index
+    return merged.drop(columns=["rating_count", "rating_sum"])
+
+
+def get_map_layers(session_state, search_query, filtered_df):
+    """当前筛选结果的聚合器和空间索引，同一搜索条件下跨 rerun 复用"""
+    cached = session_state.get("map_layers")
+    if cached is None or cached[0] != search_query or len(cached[1]) != len(filtered_df):
+        lat = filtered_df['latitude'].to_numpy()
+        lon = filtered_df['longitude'].to_numpy()
+        cached = (search_query, MarkerClusterer(lat, lon), GridIndex(lat, lon))
+        session_state["map_layers"] = cached
+    return cached[1], cached[2]
+
+
+def marker_layer_data(filtered_df, clusterer, index, zoom, bounds):
+    """只序列化视野范围内的标记：放大到街道级别时按评分取前 N 个景点，否则取与视野相交的聚合点"""
+    limit = settings.MAP_MAX_MARKERS
+    if zoom >= settings.MAP_CLUSTER_MAX_ZOOM:
+        firsts = index.top_in(bounds, filtered_df['avg_rating'].to_numpy(), limit)
+        counts = np.ones(len(firsts), dtype=np.int64)
+        lats = filtered_df['latitude'].to_numpy()[firsts]
+        lons = filtered_df['longitude'].to_numpy()[firsts]
+    else:
+        level = clusterer.clusters(zoom, limit, subset=index.query(bounds))
+        counts, lats, lons, firsts = level["count"], level["lat"], level["lon"], level["first"]
+
+    # 所有标记合成一个 GeoJSON 图层，图标、提示和弹窗在浏览器端生成
+    singles = counts == 1
+    names = np.where(singles, filtered_df['name'].to_numpy()[firsts], "")
+    prices = np.where(singles, filtered_df['price'].astype(str).to_numpy()[firsts], "")
+    return encode_features(lats, lons, {"name": names, "price": prices, "count": counts})
+
+
 def sights_map(session_state=None):
     if session_state is None:
         session_state = st.session_state
@@ -26,19 +100,15 @@ def sights_map(session_state=None):
     def load_data():
         try:
             data_file = Path(__file__).parent.parent / "data" / "sights_coordinates.xlsx"
-            df = pd.read_excel(data_file)
+            # 从列式缓存加载，Excel 有变化时自动重建
+            df = load_coordinates(data_file)
 
             required_cols = ["name", "address", "price", "description", "initial_rating", "latitude", "longitude"]
             if not all(col in df.columns for col in required_cols):
                 st.error("Excel文件缺少必要列！")
                 return None
 
-            df = df[df['latitude'].notna() & df['longitude'].notna()]
-            df['avg_rating'] = df.apply(
-                lambda row: sights_data.calculate_avg_rating(row['name'], row['initial_rating']),
-                axis=1
-            )
-            return df
+            return df[df['latitude'].notna() & df['longitude'].notna()]
         except Exception as e:
             st.error(f"数据加载失败: {str(e)}")
             return None
@@ -46,56 +116,93 @@ def sights_map(session_state=None):
     df = load_data()
     if df is None:
         st.stop()
+    search_index = get_search_index(df.attrs.get("source_hash"), df)
+    # 数据版本：坐标表内容 + 评分数据修订号，任一变化都会使渲染缓存失效
+    data_version = (df.attrs.get("source_hash"), sights_data.store.revision)
+    # 评分随用户提交变化，不进缓存；整表合并一次即可算出所有景点的平均分
+    df = with_avg_rating(df, sights_data)
 
     col_map, col_detail = st.columns([3, 2])  # 3:2比例相当于5/3 : 5/2
 
     with col_map:
         st.title("🗺️ 中国景点地图")
-        search_query= st.text_input("搜索景点名称或地址", "", key="search")
+        search_query = normalize_query(st.text_input("搜索景点名称或地址", "", key="search"))
         # 数据筛选
         def filter_data():
             if search_query:
-                mask = (df["name"].str.contains(search_query, case=False)) | \
-                       (df["address"].str.contains(search_query, case=False))
-                return df[mask]
+                if settings.MAP_USE_FULLTEXT:
+                    names = fulltext_sight_names(search_query)
+                    if names is not None:
+                        rank = {name: i for i, name in enumerate(names)}
+                        matched = df[df["name"].isin(rank)]
+                        return matched.iloc[matched["name"].map(rank).argsort()]
+                # 字面子串匹配（不解释正则元字符），按名称匹配程度排序
+                return df.iloc[search_index.search(search_query)]
             return df
 
         filtered_df = filter_data()
 
         # 主地图区域
         if not filtered_df.empty:
+            # 视野（中心、缩放级别）保存在会话中，搜索条件变化时重置
+            view = session_state.get("map_view")
+            if view is None or view["query"] != search_query:
+                view = {
+                    "query": search_query,
+                    "center": [filtered_df['latitude'].mean(), filtered_df['longitude'].mean()],
+                    "zoom": 6 if len(filtered_df) > 50 else 8,
+                }
+                session_state["map_view"] = view
+
             m = folium.Map(
-                location=[filtered_df['latitude'].mean(), filtered_df['longitude'].mean()],
-                zoom_start=6 if len(filtered_df) > 50 else 8,
+                location=view["center"],
+                zoom_start=view["zoom"],
                 tiles='https://webrd01.is.autonavi.com/appmaptile?lang=zh_cn&size=1&scale=1&style=8&x={x}&y={y}&z={z}',
                 attr='高德地图',
                 control_scale=True
             )
 
-            # 添加标记点
-            for _, row in filtered_df.iterrows():
-                folium.Marker(
-                    location=[row['latitude'], row['longitude']],
-                    popup=folium.Popup(f"<b>{row['name']}</b>", max_width=120),
-                    tooltip=f"{row['name']} ¥{row['price']}",
-                    icon=folium.Icon(color='blue'),
-                ).add_to(m)
+            # 只加载视野（四周各留出一部分余量）内的标记，按缩放级别聚合
+            bounds = view.get("bounds") or estimate_bounds(view["center"], view["zoom"])
+            rendered = pad_bounds(bounds, settings.MAP_VIEWPORT_PADDING)
+            # 相同搜索词、缩放档位、数据版本和视野的渲染结果在所有会话间共享
+            cache_key = (search_query, zoom_bucket(view["zoom"]), data_version,
+                         tuple(round(v, 4) for v in rendered))
+
+            def build_layer():
+                clusterer, index = get_map_layers(session_state, search_query, filtered_df)
+                return marker_layer_data(filtered_df, clusterer, index, view["zoom"], rendered)
+
+            SightsMarkerLayer(get_map_cache().get_or_build(cache_key, build_layer)).add_to(m)
 
             # 渲染地图
-            st_folium(
+            map_state = st_folium(
                 m,
                 width=None,
                 height=650,
                 key="main_map",
-                returned_objects=["last_object_clicked"]
+                returned_objects=["last_object_clicked", "zoom", "center", "bounds"]
             )
 
+            # 缩放或平移出已加载范围后重新加载；范围内的小幅平移只记住视野
+            if map_state and map_state.get("center"):
+                view["center"] = [map_state["center"]["lat"], map_state["center"]["lng"]]
+                new_bounds = bounds_from_folium(map_state.get("bounds"))
+                if new_bounds:
+                    view["bounds"] = new_bounds
+                zoom_changed = map_state.get("zoom") and map_state["zoom"] != view["zoom"]
+                if zoom_changed:
+                    view["zoom"] = map_state["zoom"]
+                if zoom_changed or (new_bounds and not contains(rendered, new_bounds)):
+                    st.rerun()
+
     with col_detail:
         # 景点详情板块（与页面标题齐平）
         # st.subheader("景点详情", divider=False)
 
-        # 景点选择下拉框
-        sight_options = filtered_df['name'].tolist() if not filtered_df.empty else []
+        # 景点选择下拉框：有搜索词时候选按相关度排序，只取前若干个作为联想；没有搜索词时列出全部景点
+        sight_names = filtered_df['name'].head(settings.MAP_SUGGEST_LIMIT) if search_query else filtered_df['name']
+        sight_options = sight_names.tolist() if not filtered_df.empty else []
         selected_sight_name = st.selectbox(
             "选择查看景点",
             options=sight_options,
@@ -122,6 +229,18 @@ def sights_map(session_state=None):
             with st.container(height=200):
                 st.write(selected_sight['description'])
 
+            # 附近景点（近邻索引，按球面距离排序）
+            with st.expander("📍 附近景点"):
+                try:
+                    nearby = get_sight_proximity().nearest_to(selected_sight_name, settings.PROXIMITY_K)
+                except Exception as e:
+                    print(f"附近景点查询失败: {str(e)}")
+                    nearby = []
+                for item in nearby:
+                    st.text(f"{item['name']}（{item['distance_m'] / 1000:.1f} 公里）")
+                if not nearby:
+                    st.info("暂无附近景点")
+
             # 评论部分（占详情部分的2/5）
             col_comments, col_rating_form = st.columns(2)  # 左右各占一半
 
@@ -156,7 +275,6 @@ def sights_map(session_state=None):
                                                             session_state["username"],
                                                             comment)
                                 st.success("评价已提交！")
-                                time.sleep(0.5)
                                 st.rerun()
                             except Exception as e:
                                 st.error(f"提交评价失败: {str(e)}")
@@ -0,0 +1,203 @@
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from config.settings import settings
+from data_manager.file_handler import FileHandler
+from data_manager.json_codec import get_codec
+from data_manager.write_behind import get_write_queue
+
+# 清空会话的标记记录，读取时只保留最后一个标记之后的消息
+CLEAR_MARKER = {"op": "clear"}
+LEGACY_HISTORY_FILE = "user_chat_history.json"
+
+
+class ChatLog:
+    """按用户分片的追加式聊天记录
+
+    每个用户一个目录，消息逐行追加到 JSONL 段文件(seg-000001.jsonl ...)，
+    当前段超过 CHAT_SEGMENT_BYTES 后开启新段。单条消息的写入代价与历史长度无关，
+    并发会话各自追加，不会互相覆盖。已封存的段数超过 CHAT_COMPACT_SEGMENTS 时在后台合并，
+    合并时丢弃最后一次清空之前的记录。
+    """
+
+    def __init__(self, log_dir: Optional[str] = None):
+        self.log_dir = Path(log_dir or settings.CHAT_LOG_DIR)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = settings.CHAT_SEGMENT_BYTES
+        self.compact_segments = settings.CHAT_COMPACT_SEGMENTS
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._compacting = set()
+
+    def _lock(self, username: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(username, threading.Lock())
+
+    def _user_dir(self, username: str) -> Path:
+        # 用户名中不适合作为目录名的字符用其码点替换
+        safe = re.sub(r'[^\w\-]', lambda m: f"%{ord(m.group()):06x}", username)
+        return self.log_dir / safe
+
+    @staticmethod
+    def _segments(user_dir: Path) -> List[Path]:
+        return sorted(user_dir.glob("seg-*.jsonl"))
+
+    def users(self) -> List[str]:
+        """有聊天记录的用户名（包括尚未导入的旧版记录）"""
+        names = set(FileHandler().read_json(LEGACY_HISTORY_FILE).keys())
+        for path in self.log_dir.iterdir():
+            if path.is_dir() and not path.name.endswith(".tmp"):
+                names.add(re.sub(r'%([0-9a-f]{6})', lambda m: chr(int(m.group(1), 16)), path.name))
+        return sorted(names)
+
+    def append(self, username: str, message: Dict) -> None:
+        """追加一条消息"""
+        self._submit(username, [message])
+
+    def clear(self, username: str, messages: Optional[List[Dict]] = None) -> None:
+        """清空会话（追加清空标记），可同时写入新的初始消息"""
+        self._submit(username, [CLEAR_MARKER] + list(messages or []))
+
+    def _submit(self, username: str, records: List[Dict]) -> None:
+        # 开启后台写入时只入队即返回，同一用户的记录保持入队顺序
+        if settings.WRITE_BEHIND_ENABLED:
+            get_write_queue().submit("chat", (username, records))
+        else:
+            self.append_records(username, records)
+
+    def write_batch(self, payloads: List[tuple]) -> None:
+        """后台写入：按用户合并一批记录，每个用户只写一次"""
+        grouped: Dict[str, List[Dict]] = {}
+        for username, records in payloads:
+            grouped.setdefault(username, []).extend(records)
+        for username, records in grouped.items():
+            self.append_records(username, records)
+
+    def append_records(self, username: str, records: List[Dict]) -> None:
+        user_dir = self._ensure_user(username)
+        codec = get_codec()
+        data = b"".join(codec.dumps(r, compact=True) + b"\n" for r in records)
+        with self._lock(username):
+            segments = self._segments(user_dir)
+            active = segments[-1] if segments else user_dir / "seg-000001.jsonl"
+            if active.exists() and active.stat().st_size + len(data) > self.segment_bytes:
+                active = user_dir / f"seg-{int(active.stem[4:]) + 1:06d}.jsonl"
+                segments.append(active)
+            # O_APPEND 单次写入：多进程同时追加也不会交错或覆盖
+            fd = os.open(active, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+
+        if len(segments) - 1 > self.compact_segments:
+            self._compact_in_background(username)
+
+    def tail(self, username: str, n: Optional[int] = None) -> List[Dict]:
+        """最近 n 条消息（n 为空时返回全部），从最新的段向前读，遇到清空标记即停止"""
+        user_dir = self._ensure_user(username)
+        collected: List[Dict] = []
+        with self._lock(username):
+            for segment in reversed(self._segments(user_dir)):
+                records = self._read_segment(segment)
+                for record in reversed(records):
+                    if record.get("op") == "clear":
+                        return collected[::-1]
+                    collected.append(record)
+                    if n is not None and len(collected) >= n:
+                        return collected[::-1]
+        return collected[::-1]
+
+    def read_all(self, username: str) -> List[Dict]:
+        return self.tail(username)
+
+    @staticmethod
+    def _read_segment(segment: Path) -> List[Dict]:
+        records = []
+        codec = get_codec()
+        with open(segment, "rb") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(codec.loads(line))
+                except ValueError:
+                    # 进程中断留下的半行，跳过
+                    continue
+        return records
+
+    def _ensure_user(self, username: str) -> Path:
+        """首次访问时创建用户目录，并导入旧版 user_chat_history.json 中的记录"""
+        user_dir = self._user_dir(username)
+        if user_dir.exists():
+            return user_dir
+        with self._lock(username):
+            if not user_dir.exists():
+                legacy = FileHandler().get_item(LEGACY_HISTORY_FILE, username, []) or []
+                tmp_dir = user_dir.with_name(user_dir.name + ".tmp")
+                tmp_dir.mkdir(parents=True, exist_ok=True)
+                codec = get_codec()
+                with open(tmp_dir / "seg-000001.jsonl", "wb") as f:
+                    for message in legacy:
+                        f.write(codec.dumps(message, compact=True) + b"\n")
+                os.replace(tmp_dir, user_dir)
+        return user_dir
+
+    def _compact_in_background(self, username: str) -> None:
+        with self._locks_guard:
+            if username in self._compacting:
+                return
+            self._compacting.add(username)
+        threading.Thread(target=self.compact, args=(username,), daemon=True).start()
+
+    def compact(self, username: str) -> None:
+        """把已封存的段合并为一个段（当前写入的段不动）"""
+        try:
+            user_dir = self._user_dir(username)
+            with self._lock(username):
+                sealed = self._segments(user_dir)[:-1]
+                if len(sealed) < 2:
+                    return
+                records: List[Dict] = []
+                for segment in sealed:
+                    for record in self._read_segment(segment):
+                        if record.get("op") == "clear":
+                            records = [record]
+                        else:
+                            records.append(record)
+
+                # 合并结果写到最后一个封存段的位置，保持段号顺序
+                target = sealed[-1]
+                tmp = target.with_suffix(".tmp")
+                codec = get_codec()
+                with open(tmp, "wb") as f:
+                    for record in records:
+                        f.write(codec.dumps(record, compact=True) + b"\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, target)
+                for segment in sealed[:-1]:
+                    segment.unlink()
+        except Exception as e:
+            print(f"聊天记录合并失败({username}): {str(e)}")
+        finally:
+            with self._locks_guard:
+                self._compacting.discard(username)
+
+
+_chat_log: Optional[ChatLog] = None
+_chat_log_lock = threading.Lock()
+
+
+def get_chat_log() -> ChatLog:
+    """进程内共享的聊天记录存储"""
+    global _chat_log
+    with _chat_log_lock:
+        if _chat_log is None:
+            _chat_log = ChatLog()
+            get_write_queue().register("chat", _chat_log.write_batch)
+        return _chat_log
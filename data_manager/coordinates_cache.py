@@ -0,0 +1,188 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from config.settings import settings
+from data_manager.file_lock import FileLock
+
+DEFAULT_SOURCE = Path(__file__).parent.parent / "data" / "sights_coordinates.xlsx"
+CACHE_FORMAT_VERSION = 1
+
+
+def _file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _has_pyarrow() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class ColumnarCache:
+    """把 Excel 数据表转换为可内存映射的列式文件，按源文件内容哈希判断是否需要重建
+
+    产物位于 DATA_CACHE_DIR/<表名>-<哈希前12位>/，安装了 pyarrow 时为 Feather（无压缩，可 mmap），
+    否则每列一个 .npy（字符串列另存缺失值掩码）。<表名>.meta.json 最后写入，
+    记录源文件的哈希、大小和修改时间：大小和修改时间没变时直接加载，变了再计算哈希确认。
+    构建时持有 <表名>.meta.json 的文件锁，多个进程同时发现缓存过期时只有一个会重建。
+    """
+
+    def __init__(self, source: Union[str, Path] = DEFAULT_SOURCE, cache_dir: Optional[str] = None):
+        self.source = Path(source)
+        self.cache_dir = Path(cache_dir or settings.DATA_CACHE_DIR)
+        self.meta_file = self.cache_dir / f"{self.source.stem}.meta.json"
+
+    def _read_meta(self) -> Optional[Dict]:
+        try:
+            with open(self.meta_file, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if meta.get("version") != CACHE_FORMAT_VERSION or not (self.cache_dir / meta["artifact"]).exists():
+            return None
+        return meta
+
+    def is_fresh(self, meta: Optional[Dict]) -> bool:
+        if meta is None:
+            return False
+        st = self.source.stat()
+        if meta["source_size"] == st.st_size and meta["source_mtime_ns"] == st.st_mtime_ns:
+            return True
+        # 文件被touch或复制过但内容未变时不必重建
+        if meta["source_size"] == st.st_size and meta["source_hash"] == _file_hash(self.source):
+            meta["source_mtime_ns"] = st.st_mtime_ns
+            self._write_meta(meta)
+            return True
+        return False
+
+    def cached_hash(self) -> Optional[str]:
+        """已构建缓存对应的源文件哈希（尚未构建时为 None），不检查源文件是否变化"""
+        meta = self._read_meta()
+        return meta["source_hash"] if meta else None
+
+    def load(self) -> pd.DataFrame:
+        """加载数据表，源文件有变化时自动重建缓存"""
+        meta = self._read_meta()
+        if not self.is_fresh(meta):
+            with self._lock():
+                # 等锁期间其他进程可能已经重建完成
+                meta = self._read_meta()
+                if not self.is_fresh(meta):
+                    meta = self._build()
+        df = self._load_artifact(meta)
+        # 源文件哈希作为数据版本，供下游缓存判断数据是否变化
+        df.attrs["source_hash"] = meta["source_hash"]
+        return df
+
+    def build(self) -> Dict:
+        """读取源文件并写出列式缓存，返回新的元数据"""
+        with self._lock():
+            return self._build()
+
+    def _lock(self) -> FileLock:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        return FileLock(self.meta_file)
+
+    def _build(self) -> Dict:
+        # 调用方须持有 _lock()
+        df = pd.read_excel(self.source)
+        source_hash = _file_hash(self.source)
+        st = self.source.stat()
+        artifact = f"{self.source.stem}-{source_hash[:12]}"
+        target = self.cache_dir / artifact
+        # 每次构建使用独立的临时目录，中途失败的残留不会影响其他构建
+        tmp = Path(tempfile.mkdtemp(dir=self.cache_dir, prefix=f".{artifact}."))
+
+        df = df.reset_index(drop=True)
+        fmt = settings.COORDINATES_CACHE_FORMAT
+        if fmt == "auto":
+            fmt = "feather" if _has_pyarrow() else "numpy"
+        try:
+            if fmt == "feather":
+                df.to_feather(tmp / "data.feather")
+            else:
+                self._write_numpy(df, tmp)
+            shutil.rmtree(target, ignore_errors=True)
+            os.replace(tmp, target)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        meta = {
+            "version": CACHE_FORMAT_VERSION,
+            "format": fmt,
+            "artifact": artifact,
+            "columns": list(map(str, df.columns)),
+            "rows": len(df),
+            "source_hash": source_hash,
+            "source_size": st.st_size,
+            "source_mtime_ns": st.st_mtime_ns,
+        }
+        self._write_meta(meta)
+        self._remove_stale(artifact)
+        return meta
+
+    def _write_meta(self, meta: Dict) -> None:
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, prefix=f".{self.meta_file.name}.")
+        with open(fd, "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.meta_file)
+
+    def _remove_stale(self, current: str) -> None:
+        for path in self.cache_dir.glob(f"{self.source.stem}-*"):
+            if path.is_dir() and path.name != current:
+                shutil.rmtree(path, ignore_errors=True)
+
+    @staticmethod
+    def _write_numpy(df: pd.DataFrame, directory: Path) -> None:
+        for i, column in enumerate(df.columns):
+            series = df[column]
+            if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+                np.save(directory / f"{i}.npy", series.to_numpy())
+            else:
+                # 字符串列保存为定长 unicode 数组（可 mmap），缺失值单独记录
+                missing = series.isna().to_numpy()
+                np.save(directory / f"{i}.npy", series.fillna("").astype(str).to_numpy(dtype=str))
+                np.save(directory / f"{i}.isna.npy", missing)
+
+    def _load_artifact(self, meta: Dict) -> pd.DataFrame:
+        directory = self.cache_dir / meta["artifact"]
+        if meta["format"] == "feather":
+            return pd.read_feather(directory / "data.feather", memory_map=True)
+
+        columns = {}
+        for i, column in enumerate(meta["columns"]):
+            values = np.load(directory / f"{i}.npy", mmap_mode="r")
+            mask_file = directory / f"{i}.isna.npy"
+            if mask_file.exists():
+                values = values.astype(object)
+                values[np.load(mask_file)] = np.nan
+            columns[column] = values
+        return pd.DataFrame(columns)
+
+
+def load_coordinates(source: Union[str, Path] = DEFAULT_SOURCE) -> pd.DataFrame:
+    """从列式缓存加载景点坐标表（源 Excel 变化后自动重建）"""
+    return ColumnarCache(source).load()
+
+
+if __name__ == "__main__":
+    # 数据构建: python -m data_manager.coordinates_cache [源文件]
+    import sys
+
+    cache = ColumnarCache(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_SOURCE)
+    meta = cache.build()
+    print(f"Built {meta['format']} cache {meta['artifact']}: {meta['rows']} rows, {len(meta['columns'])} columns")
@@ -1,31 +1,69 @@
-import json
-from typing import Dict, List, Any, Union
+from typing import Dict, List, Any, Callable, Iterator, Optional, Union
 from pathlib import Path
 
+from data_manager.storage import FrozenDict, get_backend
+
+
 class FileHandler:
     def __init__(self):
         self.data_dir = Path(__file__).parent.parent / "data"
         self.data_dir.mkdir(exist_ok=True)
+        # 存储后端由 settings.STORAGE_BACKEND 选择（json / sqlite）
+        self.backend = get_backend(self.data_dir)
 
     def get_path(self, filename: str) -> Path:
         return self.data_dir / filename
 
+    def exists(self, filename: str) -> bool:
+        return self.backend.exists(filename)
+
     def load_json(self, filename: str) -> Union[Dict, List]:
-        file_path = self.get_path(filename)
-        if not file_path.exists():
-            return {}
-
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
-                if not content:
-                    return {}
-                return json.loads(content)
-        except json.JSONDecodeError:
-            print(f" Warning: {filename} format invalid, reset ")
-            return {}
+        data = self.backend.load(filename)
+        return {} if data is None else data
+
+    def read_json(self, filename: str) -> Any:
+        """只读视图（dict 为只读字典、list 为 tuple），多次读取共享同一份缓存，不做复制"""
+        data = self.backend.read(filename)
+        return FrozenDict() if data is None else data
+
+    def iter_json(self, filename: str) -> Iterator[Any]:
+        """流式读取大文件：顶层为列表时逐个产出元素，为字典时逐个产出 (key, value)"""
+        return self.backend.iter_items(filename)
+
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """各文件的读缓存命中/未命中次数"""
+        return self.backend.cache_stats()
 
     def save_json(self, filename: str, data: Any) -> None:
-        file_path = self.get_path(filename)
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        self.backend.save(filename, data)
+
+    def update(self, filename: str, fn: Callable[[Any], Any]) -> Any:
+        """并发安全的读-改-写：fn(当前数据或None) -> 新数据，冲突时自动重试，返回写入的数据"""
+        return self.backend.update(filename, fn)
+
+    def version(self, filename: str) -> Any:
+        return self.backend.version(filename)
+
+    def compare_and_swap(self, filename: str, expected_version: Any, data: Any) -> Any:
+        """文件版本仍为 expected_version（来自 version()）时才写入，成功返回新版本，失败返回 None"""
+        return self.backend.compare_and_swap(filename, expected_version, data)
+
+    def get_item(self, filename: str, key: str, default: Any = None) -> Any:
+        """读取字典文档中的单个键"""
+        return self.backend.get_item(filename, key, default)
+
+    def put_item(self, filename: str, key: str, value: Any) -> None:
+        """写入字典文档中的单个键"""
+        self.backend.put_item(filename, key, value)
+
+    def delete_item(self, filename: str, key: str) -> None:
+        self.backend.delete_item(filename, key)
+
+    def append_item(self, filename: str, value: Any, key: Optional[str] = None) -> None:
+        """追加到列表文档；给定 key 时追加到该键对应的列表"""
+        self.backend.append_item(filename, value, key)
+
+    def scan_items(self, filename: str, key: Optional[str] = None,
+                   start: int = 0, end: Optional[int] = None) -> List:
+        """按位置范围读取列表文档（或某个键对应的列表）"""
+        return self.backend.scan_items(filename, key, start, end)
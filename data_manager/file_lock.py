@@ -0,0 +1,55 @@
+import os
+from pathlib import Path
+from typing import Union
+
+try:
+    import fcntl
+
+    def _lock(fd: int) -> None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+    def _unlock(fd: int) -> None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+except ImportError:  # Windows
+    import msvcrt
+
+    def _lock(fd: int) -> None:
+        # LK_LOCK 每秒重试一次，10次后抛出 OSError，这里一直等到拿到锁
+        while True:
+            try:
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue
+
+    def _unlock(fd: int) -> None:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+class FileLock:
+    """跨进程建议锁：对 <path>.lock 加排他锁，多个应用进程共享同一数据目录时串行化写入
+
+    每次进入都单独打开锁文件，所以同一进程的不同线程之间同样互斥。
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.lock_path = str(path) + ".lock"
+        self._fd = None
+
+    def __enter__(self) -> "FileLock":
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            _lock(fd)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        try:
+            _unlock(self._fd)
+        finally:
+            os.close(self._fd)
+            self._fd = None
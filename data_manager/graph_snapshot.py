@@ -0,0 +1,538 @@
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config.settings import settings
+
+SNAPSHOT_FORMAT = 1
+
+# 各标签的稳定业务主键（用于跨快照识别节点、计算增量）
+KEY_PROPERTIES = {
+    "Sight": "city_uid",
+    "Restaurant": "city_uid",
+    "Delicacy": "city_uid",
+    "Line": "city_uid",
+    "Station": "poi_id",
+}
+KEY_COLUMN = "__key__"
+
+NodeRef = Tuple[str, str]  # (label, key)
+
+
+class StringTable:
+    """字符串表：UTF-8 拼接的字节块 + int64 偏移数组，可内存映射"""
+
+    def __init__(self, blob, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings: List[str]) -> "StringTable":
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return cls(b"".join(encoded), offsets)
+
+    @classmethod
+    def load(cls, directory: Path) -> "StringTable":
+        blob_path = directory / "strings.bin"
+        blob = np.memmap(blob_path, dtype=np.uint8, mode="r") if blob_path.stat().st_size else b""
+        return cls(blob, np.load(directory / "strings.idx.npy", mmap_mode="r"))
+
+    def save(self, directory: Path) -> None:
+        with open(directory / "strings.bin", "wb") as f:
+            f.write(bytes(self.blob))
+        np.save(directory / "strings.idx.npy", np.asarray(self.offsets))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def get(self, code: int) -> Optional[str]:
+        if code < 0:
+            return None
+        start, end = int(self.offsets[code]), int(self.offsets[code + 1])
+        return bytes(self.blob[start:end]).decode("utf-8")
+
+
+class GraphData:
+    """快照的可变中间表示：按标签/关系类型组织的属性字典，用于导出和增量合并"""
+
+    def __init__(self):
+        self.nodes: Dict[str, Dict[str, Dict]] = {}
+        self.rels: Dict[str, Dict[Tuple, Dict]] = {}
+
+    def add_node(self, label: str, key: str, props: Dict) -> None:
+        self.nodes.setdefault(label, {})[key] = props
+
+    def add_rel(self, rel_type: str, src: NodeRef, dst: NodeRef, props: Dict) -> None:
+        rel_id = (src, dst, json.dumps(props, sort_keys=True, ensure_ascii=False, default=str))
+        self.rels.setdefault(rel_type, {})[rel_id] = props
+
+
+class GraphSnapshot:
+    """只读图快照：节点按标签分列存储，关系为全局节点下标的 src/dst 数组"""
+
+    def __init__(self, version: int, strings: StringTable, labels: Dict, rel_types: Dict):
+        self.version = version
+        self.strings = strings
+        self._labels = labels          # label -> {"offset", "count", "columns": {prop: (kind, array)}}
+        self._rel_types = rel_types    # type -> {"src", "dst", "columns": {...}}
+        self._decoded: Dict[Tuple[str, str], List] = {}
+        self.created_at: Optional[float] = None  # 导出时间（由清单读取）
+
+    # ---------- 加载 ----------
+    @classmethod
+    def load(cls, directory: Optional[Path] = None) -> Optional["GraphSnapshot"]:
+        """加载快照（基础版本内存映射），不存在时返回 None
+
+        导出时总是写出完整的基础版本，加载不需要解码。旧版导出留下的增量仍会应用，
+        但要把整个基础版本解码重建，应执行 --compact 合并。
+        """
+        directory = Path(directory or settings.GRAPH_SNAPSHOT_DIR)
+        manifest_path = directory / "manifest.json"
+        if not manifest_path.exists():
+            return None
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        if manifest.get("format") != SNAPSHOT_FORMAT:
+            print(f"Unsupported snapshot format: {manifest.get('format')}")
+            return None
+
+        base_dir = directory / manifest["base"]
+        snapshot = cls._load_base(base_dir, manifest["version"])
+        snapshot.created_at = manifest.get("created_at")
+        if not manifest.get("deltas"):
+            return snapshot
+
+        print(f"Snapshot has {len(manifest['deltas'])} unmerged deltas, "
+              f"run --compact to keep loading memory-mapped")
+        data = snapshot.to_graph_data()
+        for delta_name in manifest["deltas"]:
+            _apply_delta(data, json.loads((directory / delta_name).read_text(encoding="utf-8")))
+        merged = cls.from_graph_data(data, manifest["version"])
+        merged.created_at = snapshot.created_at
+        return merged
+
+    @classmethod
+    def _load_base(cls, base_dir: Path, version: int) -> "GraphSnapshot":
+        meta = json.loads((base_dir / "meta.json").read_text(encoding="utf-8"))
+
+        def load_columns(directory: Path, columns: Dict[str, str]) -> Dict:
+            return {prop: (kind, np.load(directory / f"{_file_name(prop)}.npy", mmap_mode="r"))
+                    for prop, kind in columns.items()}
+
+        labels = {}
+        for label, info in meta["labels"].items():
+            labels[label] = {
+                "offset": info["offset"],
+                "count": info["count"],
+                "columns": load_columns(base_dir / "nodes" / label, info["columns"]),
+            }
+        rel_types = {}
+        for rel_type, info in meta["rel_types"].items():
+            rel_dir = base_dir / "rels" / rel_type
+            rel_types[rel_type] = {
+                "src": np.load(rel_dir / "src.npy", mmap_mode="r"),
+                "dst": np.load(rel_dir / "dst.npy", mmap_mode="r"),
+                "columns": load_columns(rel_dir, info["columns"]),
+            }
+        return cls(version, StringTable.load(base_dir), labels, rel_types)
+
+    @classmethod
+    def from_graph_data(cls, data: GraphData, version: int = 0) -> "GraphSnapshot":
+        """由中间表示构建内存中的快照"""
+        strings: Dict[str, int] = {}
+        labels, index = {}, {}
+        offset = 0
+        for label in sorted(data.nodes):
+            rows = data.nodes[label]
+            keys = list(rows)
+            for i, key in enumerate(keys):
+                index[(label, key)] = offset + i
+            columns = _encode_columns([rows[k] for k in keys], strings)
+            columns[KEY_COLUMN] = ("str", np.array([_intern(k, strings) for k in keys], dtype=np.int32))
+            labels[label] = {"offset": offset, "count": len(keys), "columns": columns}
+            offset += len(keys)
+
+        rel_types = {}
+        for rel_type in sorted(data.rels):
+            rels = [(index.get(src), index.get(dst), props)
+                    for (src, dst, _), props in data.rels[rel_type].items()]
+            rels = [r for r in rels if r[0] is not None and r[1] is not None]
+            rel_types[rel_type] = {
+                "src": np.array([r[0] for r in rels], dtype=np.int32),
+                "dst": np.array([r[1] for r in rels], dtype=np.int32),
+                "columns": _encode_columns([r[2] for r in rels], strings),
+            }
+
+        table = StringTable.from_strings(sorted(strings, key=strings.get))
+        return cls(version, table, labels, rel_types)
+
+    def save(self, base_dir: Path) -> None:
+        """把快照写成列式目录（每列一个 .npy，可内存映射）"""
+        base_dir.mkdir(parents=True, exist_ok=True)
+        self.strings.save(base_dir)
+        meta = {"labels": {}, "rel_types": {}}
+        for label, info in self._labels.items():
+            node_dir = base_dir / "nodes" / label
+            node_dir.mkdir(parents=True, exist_ok=True)
+            for prop, (_, array) in info["columns"].items():
+                np.save(node_dir / f"{_file_name(prop)}.npy", np.asarray(array))
+            meta["labels"][label] = {
+                "offset": info["offset"],
+                "count": info["count"],
+                "columns": {prop: kind for prop, (kind, _) in info["columns"].items()},
+            }
+        for rel_type, info in self._rel_types.items():
+            rel_dir = base_dir / "rels" / rel_type
+            rel_dir.mkdir(parents=True, exist_ok=True)
+            np.save(rel_dir / "src.npy", np.asarray(info["src"]))
+            np.save(rel_dir / "dst.npy", np.asarray(info["dst"]))
+            for prop, (_, array) in info["columns"].items():
+                np.save(rel_dir / f"{_file_name(prop)}.npy", np.asarray(array))
+            meta["rel_types"][rel_type] = {
+                "count": len(info["src"]),
+                "columns": {prop: kind for prop, (kind, _) in info["columns"].items()},
+            }
+        (base_dir / "meta.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+
+    # ---------- 读取 ----------
+    @property
+    def labels(self) -> List[str]:
+        return list(self._labels)
+
+    @property
+    def rel_types(self) -> List[str]:
+        return list(self._rel_types)
+
+    def count(self, label: str) -> int:
+        return self._labels[label]["count"] if label in self._labels else 0
+
+    def label_range(self, label: str) -> Tuple[int, int]:
+        """标签在全局节点下标中的区间 [start, end)"""
+        info = self._labels[label]
+        return info["offset"], info["offset"] + info["count"]
+
+    def label_of(self, node: int) -> Optional[str]:
+        for label, info in self._labels.items():
+            if info["offset"] <= node < info["offset"] + info["count"]:
+                return label
+        return None
+
+    def names_of(self, nodes) -> List[Tuple[str, Optional[str]]]:
+        """全局节点下标 -> (标签, name)"""
+        result = []
+        for node in nodes:
+            label = self.label_of(int(node))
+            result.append((label, self.values(label, "name")[int(node) - self._labels[label]["offset"]]))
+        return result
+
+    def properties(self, label: str) -> List[str]:
+        if label not in self._labels:
+            return []
+        return [p for p in self._labels[label]["columns"] if p != KEY_COLUMN]
+
+    def column(self, label: str, prop: str) -> Optional[np.ndarray]:
+        """原始列：数值列为 float64（缺失为 NaN），字符串列为字符串表下标（缺失为 -1）"""
+        column = self._labels.get(label, {}).get("columns", {}).get(prop)
+        return column[1] if column else None
+
+    def column_kind(self, label: str, prop: str) -> Optional[str]:
+        column = self._labels.get(label, {}).get("columns", {}).get(prop)
+        return column[0] if column else None
+
+    def values(self, label: str, prop: str) -> List[Any]:
+        """解码后的整列取值（按需解码并缓存）"""
+        cache_key = (label, prop)
+        if cache_key not in self._decoded:
+            column = self._labels.get(label, {}).get("columns", {}).get(prop)
+            self._decoded[cache_key] = _decode_column(column, self.strings, self.count(label))
+        return self._decoded[cache_key]
+
+    def node(self, label: str, i: int) -> Dict:
+        """按标签内下标取节点属性"""
+        props = {}
+        for prop, (kind, array) in self._labels[label]["columns"].items():
+            if prop == KEY_COLUMN:
+                continue
+            value = _decode_value(kind, array[i], self.strings)
+            if value is not None:
+                props[prop] = value
+        return props
+
+    def relationships(self, rel_type: str) -> Tuple[np.ndarray, np.ndarray]:
+        """关系的 (src, dst) 全局节点下标数组"""
+        info = self._rel_types.get(rel_type)
+        if not info:
+            empty = np.zeros(0, dtype=np.int32)
+            return empty, empty
+        return info["src"], info["dst"]
+
+    def rel_column(self, rel_type: str, prop: str) -> List[Any]:
+        info = self._rel_types.get(rel_type)
+        if not info:
+            return []
+        return _decode_column(info["columns"].get(prop), self.strings, len(info["src"]))
+
+    def to_graph_data(self) -> GraphData:
+        data = GraphData()
+        refs = []
+        for label, info in self._labels.items():
+            keys = self.values(label, KEY_COLUMN)
+            for i in range(info["count"]):
+                data.add_node(label, keys[i], self.node(label, i))
+                refs.append((label, keys[i]))
+        for rel_type, info in self._rel_types.items():
+            columns = {prop: _decode_column(col, self.strings, len(info["src"]))
+                       for prop, col in info["columns"].items()}
+            for j, (src, dst) in enumerate(zip(info["src"], info["dst"])):
+                props = {p: values[j] for p, values in columns.items() if values[j] is not None}
+                data.add_rel(rel_type, refs[int(src)], refs[int(dst)], props)
+        return data
+
+    def schema(self) -> Dict:
+        """与 SchemaCache 相同结构的schema，用于无数据库时冷启动"""
+        return {
+            "nodes": self.labels,
+            "relationships": self.rel_types,
+            "properties": {label: self.properties(label) for label in self.labels},
+            "relationship_properties": {
+                rel_type: [p for p in info["columns"]] for rel_type, info in self._rel_types.items()
+            },
+        }
+
+
+class SnapshotExporter:
+    """从Neo4j导出快照：每次导出都写出完整的基础版本，加载时始终内存映射
+
+    增量导出与当前快照比较：图没有变化时沿用当前版本，不写任何文件；有变化时额外把差异
+    保存为 delta-<版本>.json（变更记录，加载时不读取）。Neo4j 中的节点没有修改时间，
+    因此两种导出都要读取整个图。
+    """
+
+    def __init__(self, driver, directory: Optional[Path] = None):
+        self.driver = driver
+        self.directory = Path(directory or settings.GRAPH_SNAPSHOT_DIR)
+
+    def export(self, incremental: bool = False) -> int:
+        """导出并返回快照版本号（增量导出且图没有变化时返回当前版本号）"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        manifest = self._read_manifest()
+        version = manifest.get("version", 0) + 1
+        data = self._fetch_graph()
+
+        changes = []
+        current = GraphSnapshot.load(self.directory) if incremental and manifest else None
+        if current is not None:
+            delta = _diff(current.to_graph_data(), data)
+            if not any(delta.values()):
+                return manifest["version"]
+            delta_name = f"delta-{version:06d}.json"
+            (self.directory / delta_name).write_text(
+                json.dumps(delta, ensure_ascii=False, separators=(",", ":"), default=str), encoding="utf-8")
+            changes.append(delta_name)
+
+        base = f"base-{version:06d}"
+        GraphSnapshot.from_graph_data(data, version).save(self.directory / base)
+        self._write_manifest({"format": SNAPSHOT_FORMAT, "version": version, "base": base, "deltas": [],
+                              "changes": changes, "created_at": time.time()})
+        self._cleanup(keep={base, *changes})
+        return version
+
+    def compact(self) -> int:
+        """把旧版导出留下的基础版本与增量合并为新的基础版本"""
+        snapshot = GraphSnapshot.load(self.directory)
+        if snapshot is None:
+            return self.export()
+        manifest = self._read_manifest()
+        base = f"base-{snapshot.version:06d}"
+        if manifest["base"] != base:
+            GraphSnapshot.from_graph_data(snapshot.to_graph_data(), snapshot.version).save(self.directory / base)
+        self._write_manifest({"format": SNAPSHOT_FORMAT, "version": snapshot.version,
+                              "base": base, "deltas": [], "created_at": time.time()})
+        self._cleanup(keep={base})
+        return snapshot.version
+
+    def _fetch_graph(self) -> GraphData:
+        data = GraphData()
+        refs: Dict[str, NodeRef] = {}
+        labels = [r["label"] for r in self._safe_query("CALL db.labels()")]
+        for label in labels:
+            rows = self._safe_query(
+                f"MATCH (n:`{label}`) RETURN elementId(n) AS id, labels(n) AS labels, properties(n) AS props")
+            key_prop = KEY_PROPERTIES.get(label, "name")
+            for row in rows:
+                if row["labels"][0] != label:
+                    continue
+                key = row["props"].get(key_prop)
+                key = str(key) if key is not None else row["id"]
+                refs[row["id"]] = (label, key)
+                data.add_node(label, key, {k: _plain(v) for k, v in row["props"].items()})
+
+        rows = self._safe_query(
+            "MATCH (a)-[r]->(b) RETURN elementId(a) AS src, elementId(b) AS dst, "
+            "type(r) AS type, properties(r) AS props")
+        for row in rows:
+            if row["src"] in refs and row["dst"] in refs:
+                data.add_rel(row["type"], refs[row["src"]], refs[row["dst"]],
+                             {k: _plain(v) for k, v in row["props"].items()})
+        return data
+
+    def _read_manifest(self) -> Dict:
+        path = self.directory / "manifest.json"
+        return json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+
+    def _write_manifest(self, manifest: Dict) -> None:
+        tmp = self.directory / "manifest.json.tmp"
+        tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp, self.directory / "manifest.json")
+
+    def _cleanup(self, keep: set) -> None:
+        for path in self.directory.iterdir():
+            if path.name.startswith("base-") and path.name not in keep:
+                shutil.rmtree(path, ignore_errors=True)
+            elif path.name.startswith("delta-") and path.name not in keep:
+                path.unlink()
+
+    def _safe_query(self, query: str) -> List[Dict]:
+        with self.driver.session() as session:
+            return session.run(query).data()
+
+
+_snapshot_cache: Dict[str, Any] = {"version": None, "snapshot": None}
+
+
+def get_snapshot() -> Optional[GraphSnapshot]:
+    """进程内共享的快照（清单版本变化时重新加载）"""
+    manifest_path = Path(settings.GRAPH_SNAPSHOT_DIR) / "manifest.json"
+    if not manifest_path.exists():
+        return None
+    version = json.loads(manifest_path.read_text(encoding="utf-8")).get("version")
+    if _snapshot_cache["version"] != version:
+        _snapshot_cache["snapshot"] = GraphSnapshot.load()
+        _snapshot_cache["version"] = version
+    return _snapshot_cache["snapshot"]
+
+
+# ---------- 编码工具 ----------
+def _plain(value: Any) -> Any:
+    """把Neo4j返回值转换为可存储的基本类型"""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if value is None or isinstance(value, (str, int, float, bool, list)):
+        return value
+    return str(value)
+
+
+def _intern(value: str, strings: Dict[str, int]) -> int:
+    code = strings.get(value)
+    if code is None:
+        code = strings[value] = len(strings)
+    return code
+
+
+def _encode_columns(rows: List[Dict], strings: Dict[str, int]) -> Dict:
+    props = sorted({prop for row in rows for prop in row})
+    columns = {}
+    for prop in props:
+        values = [row.get(prop) for row in rows]
+        present = [v for v in values if v is not None]
+        if present and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+            columns[prop] = ("f8", np.array([np.nan if v is None else v for v in values], dtype=np.float64))
+        elif all(isinstance(v, str) for v in present):
+            columns[prop] = ("str", np.array(
+                [-1 if v is None else _intern(v, strings) for v in values], dtype=np.int32))
+        else:
+            columns[prop] = ("json", np.array(
+                [-1 if v is None else _intern(json.dumps(v, ensure_ascii=False), strings) for v in values],
+                dtype=np.int32))
+    return columns
+
+
+def _decode_value(kind: str, raw, strings: StringTable) -> Any:
+    if kind == "f8":
+        value = float(raw)
+        if np.isnan(value):
+            return None
+        return int(value) if value.is_integer() else value
+    text = strings.get(int(raw))
+    if kind == "json" and text is not None:
+        return json.loads(text)
+    return text
+
+
+def _decode_column(column, strings: StringTable, count: int) -> List[Any]:
+    if column is None:
+        return [None] * count
+    kind, array = column
+    return [_decode_value(kind, raw, strings) for raw in array]
+
+
+def _file_name(prop: str) -> str:
+    return "".join(c if c.isalnum() or c in "_-" else f"%{ord(c):x}" for c in prop)
+
+
+def _ref_key(ref: NodeRef) -> List[str]:
+    return [ref[0], ref[1]]
+
+
+def _diff(old: GraphData, new: GraphData) -> Dict:
+    """计算两个版本之间的增量"""
+    delta = {"upsert": {}, "delete": {}, "rels_add": {}, "rels_remove": {}}
+    for label in set(old.nodes) | set(new.nodes):
+        old_rows, new_rows = old.nodes.get(label, {}), new.nodes.get(label, {})
+        upserts = {k: v for k, v in new_rows.items() if old_rows.get(k) != v}
+        deleted = [k for k in old_rows if k not in new_rows]
+        if upserts:
+            delta["upsert"][label] = upserts
+        if deleted:
+            delta["delete"][label] = deleted
+    for rel_type in set(old.rels) | set(new.rels):
+        old_rels, new_rels = old.rels.get(rel_type, {}), new.rels.get(rel_type, {})
+        added = [_ref_key(s) + _ref_key(d) + [props] for (s, d, pid), props in new_rels.items()
+                 if (s, d, pid) not in old_rels]
+        removed = [_ref_key(s) + _ref_key(d) + [props] for (s, d, pid), props in old_rels.items()
+                   if (s, d, pid) not in new_rels]
+        if added:
+            delta["rels_add"][rel_type] = added
+        if removed:
+            delta["rels_remove"][rel_type] = removed
+    return delta
+
+
+def _apply_delta(data: GraphData, delta: Dict) -> None:
+    for label, rows in delta["upsert"].items():
+        for key, props in rows.items():
+            data.add_node(label, key, props)
+    for label, keys in delta["delete"].items():
+        for key in keys:
+            data.nodes.get(label, {}).pop(key, None)
+    for rel_type, rels in delta["rels_remove"].items():
+        for src_label, src_key, dst_label, dst_key, props in rels:
+            pid = json.dumps(props, sort_keys=True, ensure_ascii=False, default=str)
+            data.rels.get(rel_type, {}).pop(((src_label, src_key), (dst_label, dst_key), pid), None)
+    for rel_type, rels in delta["rels_add"].items():
+        for src_label, src_key, dst_label, dst_key, props in rels:
+            data.add_rel(rel_type, (src_label, src_key), (dst_label, dst_key), props)
+
+
+if __name__ == "__main__":
+    # 执行: python -m data_manager.graph_snapshot [--incremental|--compact]
+    # --incremental: 图没有变化时不重写快照；--compact: 合并旧版导出留下的增量
+    import sys
+    from services.database import Neo4jDriver
+
+    neo4j = Neo4jDriver()
+    try:
+        exporter = SnapshotExporter(neo4j.driver)
+        if "--compact" in sys.argv:
+            print(f"Compacted snapshot version {exporter.compact()}")
+        else:
+            version = exporter.export(incremental="--incremental" in sys.argv)
+            print(f"Exported snapshot version {version} to {exporter.directory}")
+    finally:
+        neo4j.close()
@@ -0,0 +1,172 @@
+import json
+from pathlib import Path
+from typing import Any, Iterator, Optional, Union
+
+from config.settings import settings
+
+
+class JsonCodec:
+    """JSON 编解码接口，统一以 UTF-8 bytes 读写；compact=True 时不缩进（只给程序读的文件）"""
+
+    name = "base"
+
+    def dumps(self, data: Any, compact: bool = False) -> bytes:
+        raise NotImplementedError
+
+    def loads(self, content: Union[bytes, str]) -> Any:
+        raise NotImplementedError
+
+
+class StdlibCodec(JsonCodec):
+    name = "json"
+
+    def dumps(self, data: Any, compact: bool = False) -> bytes:
+        if compact:
+            text = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        else:
+            text = json.dumps(data, indent=2, ensure_ascii=False)
+        return text.encode("utf-8")
+
+    def loads(self, content: Union[bytes, str]) -> Any:
+        return json.loads(content)
+
+
+class OrjsonCodec(JsonCodec):
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+        self._options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(self, data: Any, compact: bool = False) -> bytes:
+        options = self._options if compact else self._options | self._orjson.OPT_INDENT_2
+        return self._orjson.dumps(data, option=options)
+
+    def loads(self, content: Union[bytes, str]) -> Any:
+        return self._orjson.loads(content)
+
+
+class MsgspecCodec(JsonCodec):
+    name = "msgspec"
+
+    def __init__(self):
+        import msgspec
+        self._msgspec = msgspec
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+
+    def dumps(self, data: Any, compact: bool = False) -> bytes:
+        content = self._encoder.encode(data)
+        return content if compact else self._msgspec.json.format(content, indent=2)
+
+    def loads(self, content: Union[bytes, str]) -> Any:
+        try:
+            return self._decoder.decode(content)
+        except self._msgspec.DecodeError as e:
+            # 与其他编解码器一致，解码失败统一抛出 ValueError
+            raise ValueError(str(e)) from e
+
+
+_CODECS = {"orjson": OrjsonCodec, "msgspec": MsgspecCodec, "json": StdlibCodec}
+_codec: Optional[JsonCodec] = None
+
+
+def get_codec() -> JsonCodec:
+    """按 settings.JSON_CODEC 选择编解码器；auto 时依次尝试 orjson、msgspec，都没有安装则用标准库"""
+    global _codec
+    if _codec is None:
+        name = settings.JSON_CODEC
+        candidates = ["orjson", "msgspec", "json"] if name == "auto" else [name, "json"]
+        for candidate in candidates:
+            try:
+                _codec = _CODECS[candidate]()
+                break
+            except (ImportError, KeyError):
+                continue
+    return _codec
+
+
+def is_compact(filename: str) -> bool:
+    """是否以紧凑格式保存（只由程序读写、不需要人工查看的文件）"""
+    return filename in settings.JSON_COMPACT_FILES
+
+
+# 顶层数组/对象中一个值之后可能出现的字符
+_DELIMITERS = frozenset(",]}: \t\r\n")
+
+
+def iter_json(path: Union[str, Path], chunk_size: int = 1 << 20) -> Iterator[Any]:
+    """流式解码大文件：顶层为数组时逐个产出元素，为对象时逐个产出 (key, value)
+
+    每次只读入 chunk_size 字节，不会一次性构造整个文档。
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = ""
+        pos = 0
+        eof = False
+
+        def fill() -> bool:
+            nonlocal buffer, pos, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+                return False
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            return True
+
+        def skip_ws():
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                    pos += 1
+                if pos < len(buffer) or not fill():
+                    return
+
+        def decode():
+            nonlocal pos
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                    # 数字可能被块边界截断（如 "12.5" 只读到 "12."），后面跟着分隔符或到达文件末尾才算完整
+                    if (end == len(buffer) or buffer[end] not in _DELIMITERS) and not eof and fill():
+                        continue
+                    pos = end
+                    return value
+                except json.JSONDecodeError:
+                    if eof or not fill():
+                        raise
+
+        skip_ws()
+        if pos >= len(buffer):
+            return
+        opener = buffer[pos]
+        if opener not in "[{":
+            raise ValueError(f"{path}: top-level value must be an array or object")
+        closer = "]" if opener == "[" else "}"
+        pos += 1
+
+        skip_ws()
+        if buffer[pos:pos + 1] == closer:
+            return
+        while True:
+            skip_ws()
+            if opener == "[":
+                yield decode()
+            else:
+                key = decode()
+                skip_ws()
+                if buffer[pos:pos + 1] != ":":
+                    raise ValueError(f"{path}: expected ':' at offset {pos}")
+                pos += 1
+                skip_ws()
+                yield key, decode()
+            skip_ws()
+            separator = buffer[pos:pos + 1]
+            pos += 1
+            if separator == closer:
+                return
+            if separator != ",":
+                raise ValueError(f"{path}: expected ',' or '{closer}' at offset {pos - 1}")
@@ -0,0 +1,65 @@
+import re
+from typing import Any, Dict, Optional
+
+# 原始文本字段 -> 数值字段（原始文本保留不动）
+NUMERIC_FIELDS = {
+    "heat": "heat_num",
+    "comment_score": "comment_score_num",
+    "comment_number": "comment_number_num",
+    "price": "price_num",
+    "price_average": "price_average_num",
+}
+
+_NUMBER = re.compile(r"(\d+(?:\.\d+)?)\s*(万|千|k|w)?", re.IGNORECASE)
+_MULTIPLIERS = {"万": 10000, "w": 10000, "千": 1000, "k": 1000}
+_FREE_WORDS = ("免费", "免票")
+
+
+def parse_number(value: Any) -> Optional[float]:
+    """从 "4.7分"、"1.2万条点评" 之类的文本中解析出第一个数值"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _NUMBER.search(str(value).replace(",", ""))
+    if not match:
+        return None
+    number = float(match.group(1))
+    unit = match.group(2)
+    if unit:
+        number *= _MULTIPLIERS[unit.lower()]
+    return number
+
+
+def parse_price(value: Any) -> Optional[float]:
+    """解析价格: "¥60起" -> 60.0, "免费" -> 0.0"""
+    if isinstance(value, str) and any(word in value for word in _FREE_WORDS):
+        return 0.0
+    return parse_number(value)
+
+
+def parse_count(value: Any) -> Optional[int]:
+    """解析数量: "1.2万条点评" -> 12000"""
+    number = parse_number(value)
+    return int(round(number)) if number is not None else None
+
+
+_PARSERS = {
+    "heat": parse_number,
+    "comment_score": parse_number,
+    "comment_number": parse_count,
+    "price": parse_price,
+    "price_average": parse_price,
+}
+
+
+def normalize_numeric_fields(data: Dict) -> Dict:
+    """返回可解析字段对应的数值属性，如 {"heat_num": 8.9, "price_num": 60.0}"""
+    normalized = {}
+    for field, target in NUMERIC_FIELDS.items():
+        if field not in data:
+            continue
+        number = _PARSERS[field](data[field])
+        if number is not None:
+            normalized[target] = number
+    return normalized
@@ -1,4 +1,5 @@
 from .file_handler import FileHandler
+from .graph_snapshot import get_snapshot
 from services.database import Neo4jDriver
 from typing import Dict, List, Set
 import os
@@ -59,6 +60,10 @@ class SchemaCache:
             if cached:
                 print(f"Using cached schema (Neo4j error: {e})")
                 return cached
+            snapshot = get_snapshot()
+            if snapshot is not None:
+                print(f"Using snapshot schema (Neo4j error: {e})")
+                return snapshot.schema()
             raise
 
     def _safe_query(self, query):
@@ -1,70 +1,341 @@
 # -*- coding: utf-8 -*-
+import threading
 import pandas as pd
 from pathlib import Path
+from typing import Dict, List, Optional
 import folium
 from data_manager.file_handler import FileHandler
+from data_manager.write_behind import get_write_queue
+from config.settings import settings
+
+SIGHTS_FILE = "sights_data.json"
+
+
+class RatingStats:
+    """评分的累计统计量，新增评分时 O(1) 更新；直方图按 0.5 分一档（1.0 ~ 5.0 共 9 档）"""
+
+    __slots__ = ("count", "sum", "sumsq", "hist")
+
+    BUCKETS = 9
+
+    def __init__(self, count: int = 0, total: float = 0.0, sumsq: float = 0.0,
+                 hist: Optional[List[int]] = None):
+        self.count = count
+        self.sum = total
+        self.sumsq = sumsq
+        self.hist = list(hist) if hist and len(hist) == self.BUCKETS else [0] * self.BUCKETS
+
+    @classmethod
+    def from_ratings(cls, ratings: List[Dict]) -> "RatingStats":
+        stats = cls()
+        for rating in ratings:
+            stats.add(rating["score"])
+        return stats
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "RatingStats":
+        return cls(data.get("count", 0), data.get("sum", 0.0), data.get("sumsq", 0.0), data.get("hist"))
+
+    def add(self, score: float) -> None:
+        self.count += 1
+        self.sum += score
+        self.sumsq += score * score
+        bucket = min(max(int(round((score - 1.0) * 2)), 0), self.BUCKETS - 1)
+        self.hist[bucket] += 1
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    @property
+    def variance(self) -> Optional[float]:
+        if not self.count:
+            return None
+        mean = self.sum / self.count
+        return max(self.sumsq / self.count - mean * mean, 0.0)
+
+    def to_dict(self) -> Dict:
+        return {"count": self.count, "sum": self.sum, "sumsq": self.sumsq, "hist": list(self.hist)}
+
+
+class SightRecord:
+    """单个景点的用户数据（评分、评论），未知字段原样保存在 extra 中"""
+
+    __slots__ = ("name", "city_uid", "address", "longitude", "latitude", "ratings", "comments",
+                 "rating_stats", "extra")
+
+    FIELDS = ("name", "city_uid", "address", "longitude", "latitude")
+
+    def __init__(self, name: str, city_uid: Optional[str] = None, address: Optional[str] = None,
+                 longitude: Optional[float] = None, latitude: Optional[float] = None,
+                 ratings: Optional[List[Dict]] = None, comments: Optional[List[Dict]] = None,
+                 rating_stats: Optional[RatingStats] = None, extra: Optional[Dict] = None):
+        self.name = name
+        self.city_uid = city_uid
+        self.address = address
+        self.longitude = longitude
+        self.latitude = latitude
+        self.ratings = ratings if ratings is not None else []
+        self.comments = comments if comments is not None else []
+        self.rating_stats = rating_stats or RatingStats.from_ratings(self.ratings)
+        self.extra = extra or {}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "SightRecord":
+        data = dict(data)
+        fields = {key: data.pop(key, None) for key in cls.FIELDS}
+        ratings = list(data.pop("ratings", None) or [])
+        comments = list(data.pop("comments", None) or [])
+        stats = data.pop("rating_stats", None)
+        # 旧数据没有统计量（或与评分列表不一致）时由评分列表回填
+        stats = RatingStats.from_dict(stats) if stats and stats.get("count") == len(ratings) else None
+        return cls(ratings=ratings, comments=comments, rating_stats=stats, extra=data, **fields)
+
+    def to_dict(self) -> Dict:
+        data = {key: getattr(self, key) for key in self.FIELDS if getattr(self, key) is not None}
+        data.update(self.extra)
+        data["ratings"] = list(self.ratings)
+        data["comments"] = list(self.comments)
+        data["rating_stats"] = self.rating_stats.to_dict()
+        return data
+
+    def add_rating(self, username: str, score: float) -> None:
+        self.ratings.append({"username": username, "score": score})
+        self.rating_stats.add(score)
+
+
+class SightsStore:
+    """进程内共享的景点数据模型：按名称、city_uid 建立字典索引，查询和改动都是 O(1)
+
+    以 sights_data.json 为持久化存储，每次访问前比较文件版本，其他进程写入后自动重新加载；
+    改动先作用于内存（stage）并记入待写列表，再以比较交换写回（flush_pending），
+    重新加载或写入冲突时基于最新文件重新应用尚未写回的改动。
+    """
 
-class SightsData:
     def __init__(self):
-        self.data_file = FileHandler().get_path("sights_data.json")
-        self._init_data()
+        self._lock = threading.RLock()
+        self._records: List[SightRecord] = []
+        self._by_name: Dict[str, SightRecord] = {}
+        self._by_city_uid: Dict[str, SightRecord] = {}
+        self._version = None
+        self._loaded = False
+        self._revision = 0
+        self._pending: List[tuple] = []
+
+    # ---------- 加载与同步 ----------
+    def _sync(self) -> None:
+        """文件被其他进程改动过时重新加载（调用方持有锁）"""
+        file_handler = FileHandler()
+        version = file_handler.version(SIGHTS_FILE)
+        if self._loaded and version == self._version:
+            return
+        if not file_handler.exists(SIGHTS_FILE):
+            file_handler.save_json(SIGHTS_FILE, {"sights": []})
+            version = file_handler.version(SIGHTS_FILE)
+        self._rebuild(file_handler.load_json(SIGHTS_FILE))
+        self._version = version
+        # 尚未写回的本进程改动在新数据上重新应用
+        for update in self._pending:
+            self._apply(update)
+
+    def _rebuild(self, data: Dict) -> None:
+        self._records = [SightRecord.from_dict(s) for s in (data or {}).get("sights", [])]
+        self._by_name = {}
+        self._by_city_uid = {}
+        for record in self._records:
+            self._index(record)
+        self._loaded = True
+        self._revision += 1
+
+    def _index(self, record: SightRecord) -> None:
+        # 同名景点以第一条为准（与原来的线性查找一致）
+        self._by_name.setdefault(record.name, record)
+        if record.city_uid:
+            self._by_city_uid.setdefault(record.city_uid, record)
+
+    def _to_data(self) -> Dict:
+        return {"sights": [record.to_dict() for record in self._records]}
+
+    @property
+    def revision(self) -> int:
+        """内存模型的修订号，每次重新加载或应用改动后递增，用作派生数据的版本"""
+        with self._lock:
+            self._sync()
+            return self._revision
+
+    # ---------- 查询 ----------
+    def get(self, name: str) -> Optional[Dict]:
+        with self._lock:
+            self._sync()
+            record = self._by_name.get(name)
+            return record.to_dict() if record else None
+
+    def get_by_city_uid(self, city_uid: str) -> Optional[Dict]:
+        with self._lock:
+            self._sync()
+            record = self._by_city_uid.get(city_uid)
+            return record.to_dict() if record else None
 
-    def _init_data(self):
-        if not self.data_file.exists():
-            initial_data = {"sights": []}
-            FileHandler().save_json("sights_data.json", initial_data)
+    def all(self) -> List[Dict]:
+        with self._lock:
+            self._sync()
+            return [record.to_dict() for record in self._records]
+
+    def coordinates(self) -> List[tuple]:
+        """带经纬度的景点 (名称, 纬度, 经度, city_uid)"""
+        with self._lock:
+            self._sync()
+            return [(record.name, float(record.latitude), float(record.longitude), record.city_uid)
+                    for record in self._records if record.latitude is not None and record.longitude is not None]
+
+    def ratings(self, name: str) -> List[Dict]:
+        with self._lock:
+            self._sync()
+            record = self._by_name.get(name)
+            return list(record.ratings) if record else []
+
+    def ratings_for(self, names) -> Dict[str, Dict]:
+        """批量读取评分统计: {景点名: {count, sum, sumsq, hist, mean}}，没有评分的景点不出现在结果中"""
+        result = {}
+        with self._lock:
+            self._sync()
+            for name in names:
+                record = self._by_name.get(name)
+                if record is not None and record.rating_stats.count:
+                    stats = record.rating_stats.to_dict()
+                    stats["mean"] = record.rating_stats.mean
+                    result[name] = stats
+        return result
+
+    def rating_totals(self) -> List[tuple]:
+        """所有有评分景点的 (名称, 评分数, 评分和)"""
+        with self._lock:
+            self._sync()
+            return [(name, record.rating_stats.count, record.rating_stats.sum)
+                    for name, record in self._by_name.items() if record.rating_stats.count]
+
+    def rating_stats(self, name: str) -> Optional[RatingStats]:
+        with self._lock:
+            self._sync()
+            record = self._by_name.get(name)
+            if record is None:
+                return None
+            stats = record.rating_stats
+            return RatingStats(stats.count, stats.sum, stats.sumsq, stats.hist)
+
+    def backfill_rating_stats(self) -> int:
+        """把回填后的评分统计量写回存储，返回景点数"""
+        with self._lock:
+            self._sync()
+            self.apply_updates([])
+            return len(self._records)
+
+    # ---------- 改动 ----------
+    def _apply(self, update: tuple) -> None:
+        self._revision += 1
+        if update[0] == "rating":
+            _, sight_name, username, score = update
+            record = self._by_name.get(sight_name)
+            if record is not None:
+                record.add_rating(username, score)
+        else:
+            _, sight_name, username, comment, timestamp = update
+            record = self._by_name.get(sight_name)
+            if record is None:
+                # 如果景点不存在，创建新条目
+                record = SightRecord(sight_name)
+                self._records.append(record)
+                self._index(record)
+            record.comments.append({
+                "username": username,
+                "comment": comment,
+                "timestamp": timestamp
+            })
+
+    def stage(self, updates: List[tuple]) -> None:
+        """把改动立即应用到内存模型（本进程随后的读取可见），写回由 flush_pending 完成"""
+        with self._lock:
+            self._sync()
+            for update in updates:
+                self._apply(update)
+                self._pending.append(update)
+
+    def flush_pending(self) -> None:
+        """把已暂存的改动写回存储；没有待写改动时不做任何事"""
+        with self._lock:
+            if self._pending:
+                self._write()
+
+    def apply_updates(self, updates: List[tuple]) -> None:
+        """把一批评分/评论改动应用到内存模型并写回存储（一批只写一次文件）"""
+        with self._lock:
+            self.stage(updates)
+            self._write()
+
+    def _write(self) -> None:
+        """以比较交换写回内存模型，成功后清空待写列表（调用方持有锁）"""
+        file_handler = FileHandler()
+        self._sync()
+        version = file_handler.compare_and_swap(SIGHTS_FILE, self._version, self._to_data())
+        if version is not None:
+            self._version = version
+            self._pending.clear()
+            return
+
+        # 其他进程抢先写入：基于最新文件重新应用待写改动
+        def apply(data):
+            self._rebuild(data)
+            for update in self._pending:
+                self._apply(update)
+            return self._to_data()
+
+        file_handler.update(SIGHTS_FILE, apply)
+        self._pending.clear()
+        self._version = file_handler.version(SIGHTS_FILE)
+
+
+_store: Optional[SightsStore] = None
+_store_lock = threading.Lock()
+
+
+def get_sights_store() -> SightsStore:
+    """进程内共享的景点数据模型"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SightsStore()
+        return _store
+
+
+class SightsData:
+    def __init__(self):
+        self.data_file = FileHandler().get_path(SIGHTS_FILE)
+        self.store = get_sights_store()
 
     def get_all_sights(self):
-        data = FileHandler().load_json("sights_data.json")
-        return data["sights"]
+        return self.store.all()
 
     def get_sight_by_name(self, name):
-        sights = self.get_all_sights()
-        return next((s for s in sights if s["name"] == name), None)
+        return self.store.get(name)
+
+    def get_sight_by_city_uid(self, city_uid):
+        return self.store.get_by_city_uid(city_uid)
 
     def add_rating(self, sight_name, username, score):
-        sights = self.get_all_sights()
-        for sight in sights:
-            if sight["name"] == sight_name:
-                sight["ratings"].append({"username": username, "score": float(score)})
-                break
-        self._save_sights(sights)
+        self._submit(("rating", sight_name, username, float(score)))
 
     def add_comment(self, sight_name, username, comment):
         """添加评论到景点数据"""
-        sights = self.get_all_sights()
-        sight_found = False
-
-        # 查找景点并添加评论
-        for sight in sights:
-            if sight["name"] == sight_name:
-                if "comments" not in sight:
-                    sight["comments"] = []
-
-                sight["comments"].append({
-                    "username": username,
-                    "comment": comment,
-                    "timestamp": pd.Timestamp.now().strftime("%Y-%m-%d %H:%M")
-                })
-                sight_found = True
-                break
-
-        if not sight_found:
-            # 如果景点不存在，创建新条目
-            sights.append({
-                "name": sight_name,
-                "comments": [{
-                    "username": username,
-                    "comment": comment,
-                    "timestamp": pd.Timestamp.now().strftime("%Y-%m-%d %H:%M")
-                }],
-                "ratings": []
-            })
+        self._submit(("comment", sight_name, username, comment,
+                      pd.Timestamp.now().strftime("%Y-%m-%d %H:%M")))
 
-        self._save_sights(sights)
-
-    def _save_sights(self, sights):
-        FileHandler().save_json("sights_data.json", {"sights": sights})
+    def _submit(self, update):
+        # 开启后台写入时改动立即作用于内存，只把写文件交给写入线程合并后批量完成
+        if settings.WRITE_BEHIND_ENABLED:
+            self.store.stage([update])
+            get_write_queue().submit("sights", update)
+        else:
+            self.store.apply_updates([update])
 
     def create_map(self, center=[35.0, 105.0], zoom_start=5):
         """创建高德街道图"""
@@ -76,10 +347,27 @@ class SightsData:
             control_scale=True
         )
 
+    def ratings_for(self, names):
+        """批量读取评分统计: {景点名: {count, sum, sumsq, hist, mean}}"""
+        return self.store.ratings_for(names)
+
+    def ratings_frame(self):
+        """评分统计表（name, rating_count, rating_sum），用于与景点坐标表整体合并"""
+        return pd.DataFrame(self.store.rating_totals(), columns=["name", "rating_count", "rating_sum"])
+
     def calculate_avg_rating(self, sight_name, initial_rating):
         """计算平均评分（包含初始评分）"""
-        sight = self.get_sight_by_name(sight_name)
-        if not sight or not sight.get("ratings"):
+        stats = self.store.rating_stats(sight_name)
+        if not stats or not stats.count:
             return initial_rating
-        ratings = [r["score"] for r in sight["ratings"]]
-        return (sum(ratings) + initial_rating) / (len(ratings) + 1)
\ No newline at end of file
+        return (stats.sum + initial_rating) / (stats.count + 1)
+
+
+# 改动已在提交时作用于内存，写入线程只负责把待写改动落盘；
+# 待写改动保留在 SightsStore 中直到写入成功，因此失败后一直重试而不中途落盘（否则会被重复写入）
+get_write_queue().register("sights", lambda updates: get_sights_store().flush_pending(), retry_forever=True)
+
+
+if __name__ == "__main__":
+    # 回填评分统计量: python -m data_manager.sights_data
+    print(f"Rating stats backfilled for {get_sights_store().backfill_rating_stats()} sights")
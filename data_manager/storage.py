@@ -0,0 +1,545 @@
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+
+from config.settings import settings
+from data_manager.file_lock import FileLock
+from data_manager.json_codec import get_codec, is_compact, iter_json
+
+
+class StorageError(Exception):
+    """存储层错误（文件损坏、并发更新冲突等）"""
+
+
+class ConcurrentUpdateError(StorageError):
+    """多次重试后仍与其他进程的写入冲突"""
+
+
+class FrozenDict(dict):
+    """缓存中共享的只读字典，原地修改会报错（需要修改时用 thaw 复制）"""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("cached JSON view is read-only, use FileHandler.load_json for a mutable copy")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __copy__(self):
+        return thaw(self)
+
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+    def __reduce__(self):
+        return FrozenDict, (dict(self),)
+
+
+def freeze(value: Any) -> Any:
+    """JSON对象 -> 只读视图（dict -> FrozenDict, list -> tuple）"""
+    if isinstance(value, dict):
+        return FrozenDict((k, freeze(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """只读视图 -> 可修改的JSON对象（深复制）"""
+    if isinstance(value, dict):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(v) for v in value]
+    return value
+
+
+class StorageBackend(ABC):
+    """FileHandler 的存储后端接口：整文档读写 + 按键读写、追加、范围扫描
+
+    每个文档有一个版本号（不存在时为 None），任何写入都会改变它，供 compare_and_swap 做乐观并发控制。
+    """
+
+    @abstractmethod
+    def exists(self, filename: str) -> bool:
+        ...
+
+    @abstractmethod
+    def load(self, filename: str) -> Union[Dict, List, None]:
+        ...
+
+    def read(self, filename: str) -> Any:
+        """只读视图，调用方不得修改；默认每次重新加载"""
+        return freeze(self.load(filename))
+
+    def iter_items(self, filename: str) -> Iterator[Any]:
+        """逐个产出列表文档的元素或字典文档的 (key, value)"""
+        data = self.load(filename)
+        if isinstance(data, dict):
+            yield from data.items()
+        elif isinstance(data, list):
+            yield from data
+
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        return {}
+
+    @abstractmethod
+    def save(self, filename: str, data: Any) -> None:
+        ...
+
+    @abstractmethod
+    def version(self, filename: str) -> Any:
+        """文档当前版本（不存在时为 None），用于 compare_and_swap"""
+
+    @abstractmethod
+    def compare_and_swap(self, filename: str, expected_version: Any, data: Any) -> Any:
+        """仅当文档仍是 expected_version 时写入 data，成功返回写入后的新版本，失败返回 None"""
+
+    @abstractmethod
+    def update(self, filename: str, fn: Callable[[Any], Any]) -> Any:
+        """读-改-写：fn 接收当前数据的可修改副本（不存在时为 None）并返回新数据，
+        与其他线程/进程的写入不会互相覆盖"""
+
+    @abstractmethod
+    def get_item(self, filename: str, key: str, default: Any = None) -> Any:
+        ...
+
+    @abstractmethod
+    def put_item(self, filename: str, key: str, value: Any) -> None:
+        ...
+
+    @abstractmethod
+    def delete_item(self, filename: str, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def append_item(self, filename: str, value: Any, key: Optional[str] = None) -> None:
+        """追加到列表文档；给定 key 时追加到字典文档中该键对应的列表"""
+
+    @abstractmethod
+    def scan_items(self, filename: str, key: Optional[str] = None,
+                   start: int = 0, end: Optional[int] = None) -> List:
+        """按位置范围读取列表（支持负数下标，如 start=-20 取最后20条）"""
+
+
+class JsonFileBackend(StorageBackend):
+    """每个文档一个JSON文件（原有行为），按键操作退化为整文件读改写
+
+    解析结果按路径缓存为只读视图，以 (mtime, size, inode) 校验文件是否被改动，
+    同一进程内的重复读取（包括 Streamlit 多次 rerun）不再重新解析。
+
+    写入先写临时文件再原子替换，读者不会看到写了一半的文件；写入与比较交换在
+    <文件>.lock 的跨进程锁内完成，锁内只做版本比较和替换，读取和计算都在锁外。
+    """
+
+    CAS_RETRIES = 20
+
+    def __init__(self, data_dir: Path):
+        self.data_dir = data_dir
+        self._cache: Dict[str, tuple] = {}            # filename -> (stat签名, 只读视图)
+        self._stats: Dict[str, Dict[str, int]] = {}   # filename -> {hits, misses}
+        self._lock = threading.Lock()
+
+    def _path(self, filename: str) -> Path:
+        return self.data_dir / filename
+
+    def _signature(self, filename: str) -> Optional[tuple]:
+        try:
+            st = self._path(filename).stat()
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def _count(self, filename: str, field: str) -> None:
+        stats = self._stats.setdefault(filename, {"hits": 0, "misses": 0})
+        stats[field] += 1
+
+    def exists(self, filename: str) -> bool:
+        return self._path(filename).exists()
+
+    def read(self, filename: str) -> Any:
+        signature = self._signature(filename)
+        if signature is None:
+            return None
+        with self._lock:
+            cached = self._cache.get(filename)
+            if cached and cached[0] == signature:
+                self._count(filename, "hits")
+                return cached[1]
+            self._count(filename, "misses")
+
+        view = freeze(self._parse(filename))
+        with self._lock:
+            self._cache[filename] = (signature, view)
+        return view
+
+    def _parse(self, filename: str) -> Union[Dict, List, None]:
+        try:
+            with open(self._path(filename), 'rb') as f:
+                content = f.read().strip()
+                if not content:
+                    return None
+                return get_codec().loads(content)
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            # json.JSONDecodeError / orjson.JSONDecodeError / msgspec.DecodeError 都是 ValueError 子类
+            # 不能当作空数据返回，否则下一次写入会把整个文件覆盖掉
+            raise StorageError(f"{filename} is corrupted: {e}") from e
+
+    def load(self, filename: str) -> Union[Dict, List, None]:
+        return thaw(self.read(filename))
+
+    def iter_items(self, filename: str) -> Iterator[Any]:
+        # 大文件流式解码，不经过缓存
+        path = self._path(filename)
+        if path.exists():
+            yield from iter_json(path)
+
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
+
+    def save(self, filename: str, data: Any) -> None:
+        with FileLock(self._path(filename)):
+            self._write_atomic(filename, data)
+
+    def _write_atomic(self, filename: str, data: Any) -> None:
+        """写临时文件、fsync 后原子替换目标文件（调用方持有文件锁）"""
+        path = self._path(filename)
+        fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(get_codec().dumps(data, compact=is_compact(filename)))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        # 写入后直接更新缓存，下次读取无需重新解析
+        signature = self._signature(filename)
+        with self._lock:
+            self._cache[filename] = (signature, freeze(data))
+
+    def version(self, filename: str) -> Optional[tuple]:
+        """文件当前版本（不存在时为 None），用于 compare_and_swap"""
+        return self._signature(filename)
+
+    def compare_and_swap(self, filename: str, expected_version: Optional[tuple], data: Any) -> Optional[tuple]:
+        """仅当文件仍是 expected_version 时写入 data，成功返回写入后的新版本，失败返回 None"""
+        with FileLock(self._path(filename)):
+            if self._signature(filename) != expected_version:
+                return None
+            self._write_atomic(filename, data)
+            return self._signature(filename)
+
+    def update(self, filename: str, fn: Callable[[Any], Any]) -> Any:
+        for _ in range(self.CAS_RETRIES):
+            version = self._signature(filename)
+            current = self.load(filename) if version is not None else None
+            data = fn(current)
+            if self.compare_and_swap(filename, version, data) is not None:
+                return data
+        raise ConcurrentUpdateError(f"{filename}: too many concurrent updates")
+
+    def get_item(self, filename: str, key: str, default: Any = None) -> Any:
+        data = self.read(filename)
+        return thaw(data.get(key, default)) if isinstance(data, dict) else default
+
+    def put_item(self, filename: str, key: str, value: Any) -> None:
+        def put(data):
+            data = data if isinstance(data, dict) else {}
+            data[key] = value
+            return data
+        self.update(filename, put)
+
+    def delete_item(self, filename: str, key: str) -> None:
+        def delete(data):
+            data = data if isinstance(data, dict) else {}
+            data.pop(key, None)
+            return data
+        self.update(filename, delete)
+
+    def append_item(self, filename: str, value: Any, key: Optional[str] = None) -> None:
+        def append(data):
+            if key is None:
+                data = data if isinstance(data, list) else []
+                data.append(value)
+            else:
+                data = data if isinstance(data, dict) else {}
+                data.setdefault(key, []).append(value)
+            return data
+        self.update(filename, append)
+
+    def scan_items(self, filename: str, key: Optional[str] = None,
+                   start: int = 0, end: Optional[int] = None) -> List:
+        data = self.read(filename)
+        items = data.get(key, ()) if key is not None and isinstance(data, dict) else data
+        return thaw(items[start:end]) if isinstance(items, tuple) else []
+
+
+def _encode(value: Any) -> str:
+    """SQLite 中每行存一个紧凑的 JSON 文本"""
+    return get_codec().dumps(value, compact=True).decode("utf-8")
+
+
+class SQLiteBackend(StorageBackend):
+    """SQLite(WAL) 后端：字典文档按键一行、列表按元素一行，写入代价与改动量成正比
+
+    documents.version 在每次写入该文档的同一事务内加一，作为 compare_and_swap 的版本号。
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS documents (
+            file TEXT PRIMARY KEY,
+            shape TEXT NOT NULL,                  -- dict | list
+            version INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS entries (
+            file TEXT NOT NULL,
+            key TEXT NOT NULL,
+            kind TEXT NOT NULL,                   -- value | list
+            value TEXT,
+            PRIMARY KEY (file, key)
+        );
+        CREATE TABLE IF NOT EXISTS list_items (
+            file TEXT NOT NULL,
+            key TEXT NOT NULL,                    -- 列表文档为 ''
+            seq INTEGER NOT NULL,
+            value TEXT NOT NULL,
+            PRIMARY KEY (file, key, seq)
+        );
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript(self.SCHEMA)
+        # 旧数据库的 documents 表没有 version 列
+        if "version" not in {row[1] for row in conn.execute("PRAGMA table_info(documents)")}:
+            conn.execute("ALTER TABLE documents ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+    def _conn(self) -> sqlite3.Connection:
+        # 每个线程一个连接（Streamlit 在多个线程中执行脚本）
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _write(self, statements) -> None:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for sql, params in statements:
+                conn.execute(sql, params)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _shape(self, filename: str) -> Optional[str]:
+        row = self._conn().execute("SELECT shape FROM documents WHERE file = ?", (filename,)).fetchone()
+        return row[0] if row else None
+
+    def exists(self, filename: str) -> bool:
+        return self._shape(filename) is not None
+
+    def load(self, filename: str) -> Union[Dict, List, None]:
+        shape = self._shape(filename)
+        if shape is None:
+            return None
+        conn = self._conn()
+        if shape == "list":
+            return self.scan_items(filename)
+
+        lists: Dict[str, List] = {}
+        codec = get_codec()
+        for key, value in conn.execute(
+                "SELECT key, value FROM list_items WHERE file = ? ORDER BY key, seq", (filename,)):
+            lists.setdefault(key, []).append(codec.loads(value))
+        data = {}
+        for key, kind, value in conn.execute(
+                "SELECT key, kind, value FROM entries WHERE file = ? ORDER BY rowid", (filename,)):
+            data[key] = lists.get(key, []) if kind == "list" else codec.loads(value)
+        return data
+
+    def save(self, filename: str, data: Any) -> None:
+        self._write(self._save_statements(filename, data))
+
+    def version(self, filename: str) -> Optional[int]:
+        row = self._conn().execute("SELECT version FROM documents WHERE file = ?", (filename,)).fetchone()
+        return row[0] if row else None
+
+    def compare_and_swap(self, filename: str, expected_version: Optional[int], data: Any) -> Optional[int]:
+        # 版本比较和写入在同一个 IMMEDIATE 事务里完成
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self.version(filename) != expected_version:
+                conn.execute("ROLLBACK")
+                return None
+            for sql, params in self._save_statements(filename, data):
+                conn.execute(sql, params)
+            version = self.version(filename)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return version
+
+    def update(self, filename: str, fn: Callable[[Any], Any]) -> Any:
+        # 在同一个 IMMEDIATE 事务里读取、计算并写回，其他写者在此期间等待
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            data = fn(self.load(filename))
+            for sql, params in self._save_statements(filename, data):
+                conn.execute(sql, params)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return data
+
+    def _save_statements(self, filename: str, data: Any) -> List:
+        shape = "list" if isinstance(data, list) else "dict"
+        statements = [
+            ("DELETE FROM entries WHERE file = ?", (filename,)),
+            ("DELETE FROM list_items WHERE file = ?", (filename,)),
+            ("INSERT INTO documents (file, shape, version) VALUES (?, ?, 1) "
+             "ON CONFLICT (file) DO UPDATE SET shape = excluded.shape, version = version + 1", (filename, shape)),
+        ]
+        if shape == "list":
+            statements += self._list_rows(filename, "", data)
+        else:
+            for key, value in data.items():
+                statements += self._entry_rows(filename, str(key), value)
+        return statements
+
+    def _entry_rows(self, filename: str, key: str, value: Any) -> List:
+        if isinstance(value, list):
+            return [("INSERT INTO entries (file, key, kind, value) VALUES (?, ?, 'list', NULL) "
+                     "ON CONFLICT (file, key) DO UPDATE SET kind = 'list', value = NULL", (filename, key))
+                    ] + self._list_rows(filename, key, value)
+        return [("INSERT INTO entries (file, key, kind, value) VALUES (?, ?, 'value', ?) "
+                 "ON CONFLICT (file, key) DO UPDATE SET kind = 'value', value = excluded.value",
+                 (filename, key, _encode(value)))]
+
+    @staticmethod
+    def _list_rows(filename: str, key: str, items: List) -> List:
+        return [("INSERT INTO list_items (file, key, seq, value) VALUES (?, ?, ?, ?)",
+                 (filename, key, seq, _encode(item)))
+                for seq, item in enumerate(items)]
+
+    def get_item(self, filename: str, key: str, default: Any = None) -> Any:
+        row = self._conn().execute(
+            "SELECT kind, value FROM entries WHERE file = ? AND key = ?", (filename, key)).fetchone()
+        if row is None:
+            return default
+        return self.scan_items(filename, key) if row[0] == "list" else get_codec().loads(row[1])
+
+    def _write_item(self, filename: str, shape: str, statements: List) -> None:
+        # 与 JSON 后端一致：文档不存在或形状不同时先重置为空文档，再写入单项
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self._shape(filename) != shape:
+                conn.execute("DELETE FROM entries WHERE file = ?", (filename,))
+                conn.execute("DELETE FROM list_items WHERE file = ?", (filename,))
+            conn.execute("INSERT INTO documents (file, shape, version) VALUES (?, ?, 1) "
+                         "ON CONFLICT (file) DO UPDATE SET shape = excluded.shape, version = version + 1",
+                         (filename, shape))
+            for sql, params in statements:
+                conn.execute(sql, params)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def put_item(self, filename: str, key: str, value: Any) -> None:
+        statements = [("DELETE FROM list_items WHERE file = ? AND key = ?", (filename, key))]
+        self._write_item(filename, "dict", statements + self._entry_rows(filename, key, value))
+
+    def delete_item(self, filename: str, key: str) -> None:
+        self._write_item(filename, "dict", [
+            ("DELETE FROM entries WHERE file = ? AND key = ?", (filename, key)),
+            ("DELETE FROM list_items WHERE file = ? AND key = ?", (filename, key)),
+        ])
+
+    def append_item(self, filename: str, value: Any, key: Optional[str] = None) -> None:
+        statements = []
+        if key is not None:
+            statements.append(("INSERT OR IGNORE INTO entries (file, key, kind, value) "
+                               "VALUES (?, ?, 'list', NULL)", (filename, key)))
+        statements.append((
+            "INSERT INTO list_items (file, key, seq, value) "
+            "SELECT ?, ?, COALESCE(MAX(seq) + 1, 0), ? FROM list_items WHERE file = ? AND key = ?",
+            (filename, key or "", _encode(value), filename, key or "")))
+        self._write_item(filename, "list" if key is None else "dict", statements)
+
+    def scan_items(self, filename: str, key: Optional[str] = None,
+                   start: int = 0, end: Optional[int] = None) -> List:
+        conn = self._conn()
+        key = key or ""
+        if start < 0 or (end is not None and end < 0):
+            total = conn.execute("SELECT COUNT(*) FROM list_items WHERE file = ? AND key = ?",
+                                 (filename, key)).fetchone()[0]
+            start = max(total + start, 0) if start < 0 else start
+            end = max(total + end, 0) if end is not None and end < 0 else end
+        limit = -1 if end is None else max(end - start, 0)
+        rows = conn.execute(
+            "SELECT value FROM list_items WHERE file = ? AND key = ? ORDER BY seq LIMIT ? OFFSET ?",
+            (filename, key, limit, start))
+        codec = get_codec()
+        return [codec.loads(value) for (value,) in rows]
+
+
+_backend_lock = threading.Lock()
+_backends: Dict[str, StorageBackend] = {}
+
+
+def get_backend(data_dir: Path) -> StorageBackend:
+    """按配置返回进程内共享的存储后端"""
+    name = settings.STORAGE_BACKEND
+    with _backend_lock:
+        if name not in _backends:
+            if name == "sqlite":
+                _backends[name] = SQLiteBackend(Path(settings.SQLITE_DB_PATH))
+            else:
+                _backends[name] = JsonFileBackend(data_dir)
+        return _backends[name]
+
+
+def migrate_json_to_sqlite(data_dir: Path, db_path: Path) -> Dict[str, int]:
+    """把 data/*.json 导入SQLite存储，返回每个文件的顶层条目数"""
+    source = JsonFileBackend(data_dir)
+    target = SQLiteBackend(db_path)
+    migrated = {}
+    for path in sorted(data_dir.glob("*.json")):
+        data = source.load(path.name)
+        if data is None:
+            continue
+        target.save(path.name, data)
+        migrated[path.name] = len(data)
+    return migrated
+
+
+if __name__ == "__main__":
+    # 迁移: python -m data_manager.storage migrate
+    import sys
+
+    if sys.argv[1:] == ["migrate"]:
+        data_dir = Path(__file__).parent.parent / "data"
+        for name, count in migrate_json_to_sqlite(data_dir, Path(settings.SQLITE_DB_PATH)).items():
+            print(f"{name}: {count} entries")
+        print(f"Done. Set STORAGE_BACKEND=sqlite to use {settings.SQLITE_DB_PATH}")
+    else:
+        print("Usage: python -m data_manager.storage migrate")
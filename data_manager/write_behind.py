@@ -0,0 +1,216 @@
+import atexit
+import json
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config.settings import settings
+
+
+class WriteBehindQueue:
+    """后台持久化队列：请求线程只负责入队，写入由工作线程合并后批量提交
+
+    每个写入目标注册一个 sink(payloads)，同一批次内发往同一 sink 的改动按入队顺序
+    一次性交给它处理（例如多条评分只读写一次 sights_data.json）。
+    队列有界，满时入队阻塞形成背压；第一条改动入队后最多等待 max_staleness 秒就会提交；
+    进程退出时把剩余改动全部写完。
+    sink 抛出异常时该批改动不丢弃：按指数退避重试（与之后的同 sink 改动按原顺序合并），
+    重试次数用尽（retry_forever 的 sink 不受次数限制）或进程退出时仍未写入的改动
+    追加保存到 WRITE_BEHIND_SPILL_DIR 下的 <sink>.jsonl。
+    """
+
+    def __init__(self, max_size: Optional[int] = None, max_staleness: Optional[float] = None,
+                 batch_size: Optional[int] = None):
+        self.max_staleness = max_staleness if max_staleness is not None else settings.WRITE_BEHIND_MAX_STALENESS
+        self.batch_size = batch_size or settings.WRITE_BEHIND_BATCH_SIZE
+        self.max_retries = settings.WRITE_BEHIND_MAX_RETRIES
+        self.retry_delay = settings.WRITE_BEHIND_RETRY_DELAY
+        self._queue: "queue.Queue[Tuple[str, Any]]" = queue.Queue(max_size or settings.WRITE_BEHIND_QUEUE_SIZE)
+        self._sinks: Dict[str, Callable[[List[Any]], None]] = {}
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._closed = False
+        # 写入失败待重试的改动: {sink: [payload]}，以及各 sink 连续失败次数和下次重试时间
+        self._failed: Dict[str, List[Any]] = {}
+        self._attempts: Dict[str, int] = {}
+        self._retry_at = 0.0
+        self._retry_forever: set = set()
+        self._stats = {"enqueued": 0, "flushed": 0, "batches": 0, "errors": 0, "spilled": 0,
+                       "last_flush_ms": 0.0, "max_flush_ms": 0.0, "total_flush_ms": 0.0}
+
+    def register(self, sink: str, handler: Callable[[List[Any]], None], retry_forever: bool = False) -> None:
+        """注册写入目标；retry_forever=True 表示 sink 自己保留未写入的改动（重复调用只会写入一次），
+        失败后一直重试，仅在进程退出仍失败时落盘，避免落盘的改动之后又被 sink 写入而重复"""
+        with self._lock:
+            self._sinks[sink] = handler
+            if retry_forever:
+                self._retry_forever.add(sink)
+            else:
+                self._retry_forever.discard(sink)
+
+    def submit(self, sink: str, payload: Any) -> None:
+        """入队一个改动后立即返回；队列关闭后退化为同步写入"""
+        if self._closed:
+            self._apply({sink: [payload]})
+            return
+        self._ensure_worker()
+        self._queue.put((sink, payload))
+        with self._lock:
+            self._stats["enqueued"] += 1
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待已入队的改动全部处理完（写入失败的转入重试），返回是否在超时前完成"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self) -> None:
+        """停止接收新改动并把剩余改动写完（进程退出时自动调用）"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._worker is not None:
+            self._queue.put(("", None))  # 唤醒工作线程
+            self._worker.join()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["retrying"] = sum(len(payloads) for payloads in self._failed.values())
+        stats["depth"] = self._queue.qsize()
+        stats["avg_flush_ms"] = stats["total_flush_ms"] / stats["batches"] if stats["batches"] else 0.0
+        del stats["total_flush_ms"]
+        return stats
+
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self._retry_wait())]
+            except queue.Empty:
+                # 没有新改动，只重试失败的批次
+                batch = []
+            # 从第一条改动开始计时，攒够一批或到达最大延迟即提交
+            deadline = time.monotonic() + self.max_staleness
+            while batch and len(batch) < self.batch_size and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            if self._closed:
+                # 关闭时一次性取出剩余改动
+                while True:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+            self._commit(batch)
+            if self._closed and self._queue.empty():
+                return
+
+    def _retry_wait(self) -> Optional[float]:
+        """距下次重试的秒数；没有失败批次时无限等待新改动"""
+        with self._lock:
+            if not self._failed:
+                return None
+            return max(self._retry_at - time.monotonic(), 0.0)
+
+    def _commit(self, batch: List[Tuple[str, Any]]) -> None:
+        grouped: Dict[str, List[Any]] = {}
+        with self._lock:
+            # 先前失败的改动排在新改动之前，保持写入顺序
+            if self._closed or time.monotonic() >= self._retry_at:
+                grouped, self._failed = self._failed, {}
+            for sink, payload in batch:
+                if not sink:
+                    continue
+                if sink in self._failed:
+                    self._failed[sink].append(payload)
+                else:
+                    grouped.setdefault(sink, []).append(payload)
+
+        started = time.perf_counter()
+        try:
+            self._apply(grouped)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self._stats["batches"] += 1 if grouped else 0
+                self._stats["last_flush_ms"] = elapsed
+                self._stats["max_flush_ms"] = max(self._stats["max_flush_ms"], elapsed)
+                self._stats["total_flush_ms"] += elapsed
+            for _ in batch:
+                self._queue.task_done()
+
+    def _apply(self, grouped: Dict[str, List[Any]]) -> None:
+        for sink, payloads in grouped.items():
+            try:
+                self._sinks[sink](payloads)
+            except Exception as e:
+                self._failed_batch(sink, payloads, e)
+            else:
+                with self._lock:
+                    self._stats["flushed"] += len(payloads)
+                    self._attempts.pop(sink, None)
+
+    def _failed_batch(self, sink: str, payloads: List[Any], error: Exception) -> None:
+        with self._lock:
+            self._stats["errors"] += 1
+            attempts = self._attempts.get(sink, 0) + 1
+            if not self._closed and (attempts <= self.max_retries or sink in self._retry_forever):
+                self._attempts[sink] = attempts
+                self._failed[sink] = payloads + self._failed.get(sink, [])
+                # 等待时间逐次加倍，最长不超过最后一次常规重试的等待时间
+                delay = self.retry_delay * 2 ** (min(attempts, max(self.max_retries, 1)) - 1)
+                self._retry_at = time.monotonic() + delay
+                print(f"后台写入失败({sink}, {len(payloads)}条，第{attempts}次): {str(error)}")
+                return
+            self._attempts.pop(sink, None)
+        print(f"后台写入失败({sink}, {len(payloads)}条)，不再重试: {str(error)}")
+        self._spill(sink, payloads)
+
+    def _spill(self, sink: str, payloads: List[Any]) -> None:
+        """把无法写入的改动追加保存到磁盘，留待人工恢复"""
+        path = Path(settings.WRITE_BEHIND_SPILL_DIR) / f"{sink}.jsonl"
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            failed_at = time.strftime("%Y-%m-%d %H:%M:%S")
+            with open(path, "a", encoding="utf-8") as f:
+                for payload in payloads:
+                    f.write(json.dumps({"failed_at": failed_at, "payload": payload},
+                                       ensure_ascii=False, default=str) + "\n")
+            with self._lock:
+                self._stats["spilled"] += len(payloads)
+            print(f"已将 {len(payloads)} 条未写入的改动保存到 {path}")
+        except Exception as e:
+            print(f"保存未写入的改动失败({sink}, {len(payloads)}条): {str(e)}")
+
+
+_write_queue: Optional[WriteBehindQueue] = None
+_write_queue_lock = threading.Lock()
+
+
+def get_write_queue() -> WriteBehindQueue:
+    """进程内共享的后台写入队列"""
+    global _write_queue
+    with _write_queue_lock:
+        if _write_queue is None:
+            _write_queue = WriteBehindQueue()
+            atexit.register(_write_queue.close)
+        return _write_queue
@@ -1,6 +1,6 @@
 from neo4j import GraphDatabase
 from config.settings import settings
-from typing import  Any
+from typing import  Any, Dict, List, Optional
 
 class Neo4jDriver:
     def __init__(self):
@@ -9,15 +9,38 @@ class Neo4jDriver:
             auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD)
         )
 
-    def execute_query(self, cypher: str) -> Any:
+    def execute_query(self, cypher: str, **params) -> Any:
         """Execute Cypher query and return results"""
         try:
-            with self.neo4j_driver.session() as session:
-                result = session.run(cypher)
+            with self.driver.session() as session:
+                result = session.run(cypher, **params)
                 return [dict(record) for record in result]
         except Exception as e:
             print(f"Error executing Cypher: {e}")
             raise
 
+    def execute_bulk(self, template: str, rows: List[Dict],
+                     chunk_size: Optional[int] = None) -> List[List[Dict]]:
+        """Run a per-row query template for many parameter sets via UNWIND batching.
+
+        The template reads its parameters from `row` (e.g. `row.city`) and is run
+        once per parameter set inside a CALL subquery, so ORDER BY/LIMIT apply per
+        row. Results are grouped back per input row, in input order.
+        """
+        chunk_size = chunk_size or settings.BULK_CHUNK_SIZE
+        query = (f"UNWIND $rows AS row CALL {{ WITH row {template} }} "
+                 f"RETURN *, row.__index AS __index")
+
+        grouped: List[List[Dict]] = [[] for _ in rows]
+        for start in range(0, len(rows), chunk_size):
+            chunk = [{**params, "__index": i}
+                     for i, params in enumerate(rows[start:start + chunk_size], start)]
+            for record in self.execute_query(query, rows=chunk):
+                index = record.pop("__index")
+                record.pop("row", None)
+                if record:
+                    grouped[index].append(record)
+        return grouped
+
     def close(self):
-        self.driver.close()
\ No newline at end of file
+        self.driver.close()
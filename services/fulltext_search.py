@@ -0,0 +1,90 @@
+import re
+from typing import Dict, List, Optional
+
+from config.settings import settings
+from services.index_manager import INDEX_MANIFEST
+
+
+FULLTEXT_INDEX = "entity_fulltext"
+_FULLTEXT_SPEC = next(index for index in INDEX_MANIFEST if index["name"] == FULLTEXT_INDEX)
+FULLTEXT_LABELS = _FULLTEXT_SPEC["label"]
+
+# Lucene查询语法中的特殊字符
+_LUCENE_SPECIAL = re.compile(r'([+\-!(){}\[\]^"~*?:\\/&|])')
+
+
+class FullTextSearch:
+    def __init__(self, driver):
+        self.driver = driver
+        self.index_name = FULLTEXT_INDEX
+
+    @staticmethod
+    def escape(text: str) -> str:
+        """Escape Lucene special characters in user input"""
+        return _LUCENE_SPECIAL.sub(r"\\\1", text.strip())
+
+    def search(self, text: str, labels: Optional[List[str]] = None,
+               page: int = 1, page_size: int = 10) -> Dict:
+        """Ranked full-text search, returns scored hits for the requested page
+
+        Only the requested page (plus one row to detect a next page) is read from
+        the index: SKIP/LIMIT go into the procedure call when no label filter is
+        needed, otherwise the label filter streams into SKIP/LIMIT without
+        collecting every hit.
+        """
+        if not text or not text.strip():
+            return {"page": page, "page_size": page_size, "has_more": False, "hits": []}
+
+        labels = labels or FULLTEXT_LABELS
+        params = {
+            "index": self.index_name,
+            "query": self.escape(text),
+            "labels": labels,
+            "skip": max(page - 1, 0) * page_size,
+            "limit": page_size + 1
+        }
+        if set(FULLTEXT_LABELS) <= set(labels):
+            call = """
+                CALL db.index.fulltext.queryNodes($index, $query, {skip: $skip, limit: $limit})
+                YIELD node, score
+                WITH node, score, [l IN labels(node) WHERE l IN $labels][0] AS label
+            """
+            page_clause = ""
+        else:
+            call = """
+                CALL db.index.fulltext.queryNodes($index, $query) YIELD node, score
+                WITH node, score, [l IN labels(node) WHERE l IN $labels][0] AS label
+                WHERE label IS NOT NULL
+            """
+            page_clause = "SKIP $skip LIMIT $limit"
+        hits = self._safe_query(call + f"""
+            RETURN label, node.name AS name, node.city AS city, node.address AS address, score
+            {page_clause}
+        """, **params)
+
+        return {
+            "page": page,
+            "page_size": page_size,
+            "has_more": len(hits) > page_size,
+            "hits": hits[:page_size]
+        }
+
+    def resolve_hit(self, mention: str, label: Optional[str] = None,
+                    min_score: Optional[float] = None) -> Optional[Dict]:
+        """Best matching hit (label, name, city, address, score) for a fuzzy mention"""
+        min_score = settings.FULLTEXT_MIN_SCORE if min_score is None else min_score
+        hits = self.search(mention, labels=[label] if label else None, page_size=1)["hits"]
+        if hits and hits[0]["score"] >= min_score:
+            return hits[0]
+        return None
+
+    def resolve(self, mention: str, label: Optional[str] = None,
+                min_score: Optional[float] = None) -> Optional[str]:
+        """Resolve a fuzzy entity mention to the best matching node name"""
+        hit = self.resolve_hit(mention, label, min_score)
+        return hit["name"] if hit else None
+
+    def _safe_query(self, cypher: str, **params) -> List[Dict]:
+        # Parameters go in as a dict: $query would clash with Session.run's own `query` argument
+        with self.driver.session() as session:
+            return session.run(cypher, params).data()
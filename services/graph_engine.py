@@ -0,0 +1,440 @@
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config.settings import settings
+from data_manager.graph_snapshot import GraphSnapshot, get_snapshot
+
+# 字符串字面量（解析前先替换为占位符，避免其中的关键字干扰解析）
+_STRING = re.compile(r"'((?:[^'\\]|\\.)*)'|\"((?:[^\"\\]|\\.)*)\"")
+_PLACEHOLDER = re.compile(r"^\x00(\d+)\x00$")
+
+_QUERY = re.compile(
+    r"^\s*MATCH\s+(?P<path>.+?)"
+    r"(?:\s+WHERE\s+(?P<where>.+?))?"
+    r"\s+RETURN\s+(?P<ret>.+?)"
+    r"(?:\s+ORDER\s+BY\s+(?P<order>.+?))?"
+    r"(?:\s+LIMIT\s+(?P<limit>\d+))?\s*;?\s*$",
+    re.S | re.I,
+)
+_NODE = re.compile(r"\(\s*(\w*)\s*(?::\s*`?(\w+)`?)?\s*(\{[^}]*\})?\s*\)")
+_REL = re.compile(r"-\[\s*(\w*)\s*(?::\s*`?(\w+)`?)?\s*(\{[^}]*\})?\s*\]->")
+_CONDITION = re.compile(
+    r"^(\w+)\.(\w+)\s*(=|<>|>=|<=|>|<|CONTAINS|STARTS\s+WITH|ENDS\s+WITH|IN)\s*(.+)$", re.S | re.I)
+_UNSUPPORTED_WORDS = re.compile(
+    r"\b(OPTIONAL|UNWIND|CALL|UNION|DISTINCT|SKIP|CREATE|MERGE|SET|DELETE|REMOVE|OR|NOT|XOR)\b"
+    r"|(?<!STARTS )(?<!ENDS )\bWITH\b"
+    r"|\b(count|collect|sum|avg|min|max|size|exists|toLower|toUpper)\s*\(", re.I)
+
+
+class _Unsupported(Exception):
+    """查询形态超出内存引擎能力，需回退到Neo4j"""
+
+
+class InMemoryGraph:
+    """只读内存图引擎：基于快照的数组邻接表与属性排序索引，直接回答常见模板查询"""
+
+    def __init__(self, snapshot: GraphSnapshot):
+        self.snapshot = snapshot
+        self.node_count = sum(snapshot.count(label) for label in snapshot.labels)
+        self._forward: Dict[str, Tuple] = {}
+        self._reverse: Dict[str, Tuple] = {}
+        self._value_index: Dict[Tuple[str, str], Dict[Any, np.ndarray]] = {}
+        self._rank: Dict[Tuple[str, str], np.ndarray] = {}
+        self._rel_values: Dict[Tuple[str, str], List] = {}
+        for rel_type in snapshot.rel_types:
+            src, dst = snapshot.relationships(rel_type)
+            self._forward[rel_type] = self._build_csr(np.asarray(src), np.asarray(dst))
+            self._reverse[rel_type] = self._build_csr(np.asarray(dst), np.asarray(src))
+
+    # ---------- 索引 ----------
+    def _build_csr(self, src: np.ndarray, dst: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """压缩邻接表: (indptr, 邻居节点, 关系下标)"""
+        order = np.argsort(src, kind="stable")
+        indptr = np.zeros(self.node_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=self.node_count), out=indptr[1:])
+        return indptr, dst[order], order
+
+    def value_index(self, label: str, prop: str) -> Dict[Any, np.ndarray]:
+        """等值索引: 属性值 -> 标签内下标数组"""
+        key = (label, prop)
+        if key not in self._value_index:
+            groups: Dict[Any, List[int]] = {}
+            for i, value in enumerate(self.snapshot.values(label, prop)):
+                if value is not None and not isinstance(value, list):
+                    groups.setdefault(value, []).append(i)
+            self._value_index[key] = {v: np.array(ids, dtype=np.int64) for v, ids in groups.items()}
+        return self._value_index[key]
+
+    def rank(self, label: str, prop: str) -> np.ndarray:
+        """排序索引: 每个节点在该属性升序中的名次（null 视为最大值，与Cypher一致）"""
+        key = (label, prop)
+        if key not in self._rank:
+            self._rank[key] = _rank_of(self.snapshot.column(label, prop),
+                                       self.snapshot.column_kind(label, prop),
+                                       lambda: self.snapshot.values(label, prop),
+                                       self.snapshot.count(label))
+        return self._rank[key]
+
+    def _rel_prop(self, rel_type: str, prop: str) -> List:
+        key = (rel_type, prop)
+        if key not in self._rel_values:
+            self._rel_values[key] = self.snapshot.rel_column(rel_type, prop)
+        return self._rel_values[key]
+
+    # ---------- 常用查询形态 ----------
+    def find_by_name(self, label: str, name: str) -> List[Dict]:
+        ids = self.value_index(label, "name").get(name, [])
+        return [self.snapshot.node(label, int(i)) for i in ids]
+
+    def located_in(self, label: str, city: str, order_by: Optional[str] = None,
+                   descending: bool = True, limit: int = 5) -> List[Dict]:
+        """城市内的实体，可按属性排序"""
+        order = f" ORDER BY n.{order_by} {'DESC' if descending else 'ASC'}" if order_by else ""
+        return self.try_execute(
+            f"MATCH (n:{label})-[:LOCATED_IN]->(c:City {{name: {_literal(city)}}}) RETURN n{order} LIMIT {limit}"
+        ) or []
+
+    # ---------- Cypher 子集执行 ----------
+    def try_execute(self, cypher: str) -> Optional[List[Dict]]:
+        """执行受支持形态的只读Cypher，不支持时返回 None"""
+        try:
+            return self._execute(cypher)
+        except _Unsupported:
+            return None
+
+    def _execute(self, cypher: str) -> List[Dict]:
+        literals: List[str] = []
+
+        def stash(match):
+            literals.append((match.group(1) if match.group(1) is not None else match.group(2))
+                            .replace("\\'", "'").replace('\\"', '"'))
+            return f"\x00{len(literals) - 1}\x00"
+
+        text = _STRING.sub(stash, cypher)
+        if _UNSUPPORTED_WORDS.search(text) or "<-" in text:
+            raise _Unsupported()
+        match = _QUERY.match(text)
+        if not match:
+            raise _Unsupported()
+
+        nodes, rels = self._parse_path(match.group("path"), literals)
+        variables = {var: ("node", label) for var, label, _ in nodes if var}
+        variables.update({var: ("rel", rel_type) for var, rel_type, _ in rels if var})
+
+        filters: Dict[str, List[Tuple[str, str, Any]]] = {}
+        for var, _, props in nodes + rels:
+            for prop, value in props.items():
+                filters.setdefault(var, []).append((prop, "=", value))
+        if match.group("where"):
+            for condition in re.split(r"\s+AND\s+", match.group("where").strip(), flags=re.I):
+                cond = _CONDITION.match(condition.strip())
+                if not cond or cond.group(1) not in variables:
+                    raise _Unsupported()
+                op = re.sub(r"\s+", " ", cond.group(3).upper())
+                filters.setdefault(cond.group(1), []).append(
+                    (cond.group(2), op, _parse_value(cond.group(4), literals)))
+
+        bindings = self._match(nodes, rels, filters)
+        items = self._parse_return(match.group("ret"), variables, literals)
+        if match.group("order"):
+            bindings = self._order(bindings, match.group("order"), items, variables)
+        if match.group("limit"):
+            limit = int(match.group("limit"))
+            bindings = {var: ids[:limit] for var, ids in bindings.items()}
+        return self._project(bindings, items, variables)
+
+    def _parse_path(self, path: str, literals: List[str]):
+        nodes, rels = [], []
+        pos = 0
+        path = path.strip()
+        while True:
+            node = _NODE.match(path, pos)
+            if not node:
+                raise _Unsupported()
+            nodes.append((node.group(1) or f"_n{len(nodes)}", node.group(2),
+                          _parse_props(node.group(3), literals)))
+            pos = node.end()
+            while pos < len(path) and path[pos].isspace():
+                pos += 1
+            if pos == len(path):
+                break
+            rel = _REL.match(path, pos)
+            if not rel or not rel.group(2):
+                raise _Unsupported()
+            rels.append((rel.group(1) or f"_r{len(rels)}", rel.group(2),
+                         _parse_props(rel.group(3), literals)))
+            pos = rel.end()
+        return nodes, rels
+
+    def _candidates(self, label: Optional[str], conditions: List) -> Optional[np.ndarray]:
+        """满足标签与过滤条件的全局节点下标，无任何约束时返回 None"""
+        if not label:
+            if conditions:
+                raise _Unsupported()
+            return None
+        if label not in self.snapshot.labels:
+            # 快照中没有该标签（如快照早于该类数据导出），交给Neo4j回答
+            raise _Unsupported()
+
+        start, end = self.snapshot.label_range(label)
+        mask = np.ones(end - start, dtype=bool)
+        for prop, op, value in conditions:
+            mask &= self._condition_mask(label, prop, op, value, end - start)
+        return np.nonzero(mask)[0] + start
+
+    def _condition_mask(self, label: str, prop: str, op: str, value: Any, count: int) -> np.ndarray:
+        mask = np.zeros(count, dtype=bool)
+        if op in ("=", "IN"):
+            index = self.value_index(label, prop)
+            for v in (value if op == "IN" else [value]):
+                if isinstance(v, list):
+                    raise _Unsupported()
+                ids = index.get(v)
+                if ids is None and isinstance(v, (int, float)):
+                    ids = index.get(float(v))
+                if ids is not None:
+                    mask[ids] = True
+            return mask
+
+        if op in (">", ">=", "<", "<=") and self.snapshot.column_kind(label, prop) == "f8":
+            if not isinstance(value, (int, float)):
+                raise _Unsupported()
+            column = np.asarray(self.snapshot.column(label, prop))
+            with np.errstate(invalid="ignore"):
+                return {">": column > value, ">=": column >= value,
+                        "<": column < value, "<=": column <= value}[op]
+
+        if op in ("CONTAINS", "STARTS WITH", "ENDS WITH", "<>") and isinstance(value, str):
+            test = {
+                "CONTAINS": lambda s: value in s,
+                "STARTS WITH": lambda s: s.startswith(value),
+                "ENDS WITH": lambda s: s.endswith(value),
+                "<>": lambda s: s != value,
+            }[op]
+            for i, s in enumerate(self.snapshot.values(label, prop)):
+                if isinstance(s, str) and test(s):
+                    mask[i] = True
+            return mask
+        raise _Unsupported()
+
+    def _match(self, nodes, rels, filters) -> Dict[str, np.ndarray]:
+        candidates = [self._candidates(label, filters.get(var, [])) for var, label, _ in nodes]
+        sizes = [len(c) if c is not None else self.node_count for c in candidates]
+        anchor = int(np.argmin(sizes))
+        if candidates[anchor] is None:
+            raise _Unsupported()
+
+        bindings = {nodes[anchor][0]: candidates[anchor]}
+        # 从选择性最高的节点向右、向左扩展
+        for i in range(anchor, len(rels)):
+            bindings = self._expand(bindings, nodes[i][0], rels[i], nodes[i + 1][0],
+                                    candidates[i + 1], self._forward, filters)
+        for i in range(anchor - 1, -1, -1):
+            bindings = self._expand(bindings, nodes[i + 1][0], rels[i], nodes[i][0],
+                                    candidates[i], self._reverse, filters)
+        return bindings
+
+    def _expand(self, bindings, from_var, rel, to_var, to_candidates, adjacency, filters):
+        rel_var, rel_type, _ = rel
+        if rel_type not in adjacency:
+            raise _Unsupported()
+        indptr, neighbours, edge_ids = adjacency[rel_type]
+        frontier = bindings[from_var]
+        starts = indptr[frontier]
+        counts = indptr[frontier + 1] - starts
+        rows = np.repeat(np.arange(len(frontier)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        positions = np.repeat(starts, counts) + offsets
+        targets, edges = neighbours[positions], edge_ids[positions]
+
+        keep = np.ones(len(targets), dtype=bool)
+        if to_candidates is not None:
+            allowed = np.zeros(self.node_count, dtype=bool)
+            allowed[to_candidates] = True
+            keep &= allowed[targets]
+        if to_var in bindings:
+            keep &= targets == bindings[to_var][rows]
+        for prop, op, value in filters.get(rel_var, []):
+            if op != "=":
+                raise _Unsupported()
+            values = self._rel_prop(rel_type, prop)
+            keep &= np.array([values[e] == value for e in edges], dtype=bool)
+
+        result = {var: ids[rows][keep] for var, ids in bindings.items()}
+        result[to_var] = targets[keep]
+        result[rel_var] = edges[keep]
+        return result
+
+    def _parse_return(self, ret: str, variables, literals) -> List[Tuple[str, str, Optional[str], Any]]:
+        """返回项: (列名, 变量, 属性, 默认值)"""
+        items = []
+        for part in _split_top_level(ret):
+            alias = re.match(r"^(.+?)\s+AS\s+(\w+)$", part.strip(), re.S | re.I)
+            expr = (alias.group(1) if alias else part).strip()
+            coalesce = re.match(r"^COALESCE\(\s*(\w+)\.(\w+)\s*,\s*(.+)\)$", expr, re.I)
+            prop_ref = re.match(r"^(\w+)\.(\w+)$", expr)
+            if coalesce:
+                var, prop, default = coalesce.group(1), coalesce.group(2), _parse_value(coalesce.group(3), literals)
+            elif prop_ref:
+                var, prop, default = prop_ref.group(1), prop_ref.group(2), None
+            elif re.match(r"^\w+$", expr):
+                var, prop, default = expr, None, None
+            else:
+                raise _Unsupported()
+            if var not in variables:
+                raise _Unsupported()
+            name = alias.group(2) if alias else _restore(expr, literals)
+            items.append((name, var, prop, default))
+        return items
+
+    def _order(self, bindings, order: str, items, variables) -> Dict[str, np.ndarray]:
+        keys = []
+        for part in _split_top_level(order):
+            spec = re.match(r"^(.+?)(?:\s+(ASC|DESC|ASCENDING|DESCENDING))?$", part.strip(), re.I)
+            expr, descending = spec.group(1).strip(), (spec.group(2) or "").upper().startswith("DESC")
+            alias = next((item for item in items if item[0] == expr), None)
+            prop_ref = re.match(r"^(\w+)\.(\w+)$", expr)
+            if alias and alias[2]:
+                var, prop = alias[1], alias[2]
+            elif prop_ref and prop_ref.group(1) in variables:
+                var, prop = prop_ref.group(1), prop_ref.group(2)
+            else:
+                raise _Unsupported()
+            rank = self._binding_rank(bindings[var], variables[var], prop)
+            keys.append(-rank if descending else rank)
+        if not keys or not len(keys[0]):
+            return bindings
+        order_ids = np.lexsort(keys[::-1])
+        return {var: ids[order_ids] for var, ids in bindings.items()}
+
+    def _binding_rank(self, ids: np.ndarray, kind: Tuple[str, str], prop: str) -> np.ndarray:
+        if kind[0] == "rel":
+            values = self._rel_prop(kind[1], prop)
+            return _rank_of(None, None, lambda: values, len(values))[ids]
+        label = kind[1]
+        if not label:
+            raise _Unsupported()
+        start, _ = self.snapshot.label_range(label)
+        return self.rank(label, prop)[ids - start]
+
+    def _project(self, bindings, items, variables) -> List[Dict]:
+        count = len(next(iter(bindings.values()))) if bindings else 0
+        records = [{} for _ in range(count)]
+        for name, var, prop, default in items:
+            kind, label = variables[var]
+            ids = bindings[var]
+            for row, ident in enumerate(ids):
+                ident = int(ident)
+                if kind == "rel":
+                    value = self._rel_prop(label, prop)[ident] if prop else None
+                else:
+                    node_label = label or self.snapshot.label_of(ident)
+                    local = ident - self.snapshot.label_range(node_label)[0]
+                    value = (self.snapshot.values(node_label, prop)[local] if prop
+                             else self.snapshot.node(node_label, local))
+                records[row][name] = default if value is None else value
+        return records
+
+
+# ---------- 解析工具 ----------
+def _literal(value: str) -> str:
+    return "'" + value.replace("'", "\\'") + "'"
+
+
+def _restore(text: str, literals: List[str]) -> str:
+    return re.sub(r"\x00(\d+)\x00", lambda m: _literal(literals[int(m.group(1))]), text)
+
+
+def _parse_value(text: str, literals: List[str]) -> Any:
+    text = text.strip()
+    placeholder = _PLACEHOLDER.match(text)
+    if placeholder:
+        return literals[int(placeholder.group(1))]
+    if text.startswith("[") and text.endswith("]"):
+        return [_parse_value(v, literals) for v in text[1:-1].split(",") if v.strip()]
+    if text.lower() in ("true", "false"):
+        return text.lower() == "true"
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return float(text)
+    except ValueError:
+        raise _Unsupported()
+
+
+def _parse_props(text: Optional[str], literals: List[str]) -> Dict[str, Any]:
+    if not text:
+        return {}
+    props = {}
+    for pair in text.strip()[1:-1].split(","):
+        if not pair.strip():
+            continue
+        key, _, value = pair.partition(":")
+        if not value:
+            raise _Unsupported()
+        props[key.strip().strip("`")] = _parse_value(value, literals)
+    return props
+
+
+def _split_top_level(text: str) -> List[str]:
+    parts, depth, current = [], 0, []
+    for char in text:
+        if char in "([{":
+            depth += 1
+        elif char in ")]}":
+            depth -= 1
+        if char == "," and depth == 0:
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    parts.append("".join(current))
+    return [p for p in parts if p.strip()]
+
+
+def _rank_of(column, kind, values_fn, count: int) -> np.ndarray:
+    """升序名次数组，null 排在最后"""
+    if kind == "f8":
+        order = np.argsort(np.asarray(column), kind="stable")
+    else:
+        values = values_fn()
+        numeric = all(isinstance(v, (int, float)) for v in values if v is not None)
+        order = np.array(sorted(range(count), key=lambda i: (
+            values[i] is None, values[i] if numeric or values[i] is None else str(values[i]))),
+            dtype=np.int64)
+    rank = np.empty(count, dtype=np.int64)
+    rank[order] = np.arange(count)
+    return rank
+
+
+_engine_cache: Dict[str, Any] = {"version": None, "engine": None, "stale_warned": None}
+
+
+def is_stale(snapshot: GraphSnapshot) -> bool:
+    """快照导出时间超过 GRAPH_SNAPSHOT_MAX_AGE（或未知）时视为过期"""
+    max_age = settings.GRAPH_SNAPSHOT_MAX_AGE
+    if not max_age:
+        return False
+    return snapshot.created_at is None or time.time() - snapshot.created_at > max_age
+
+
+def get_engine() -> Optional[InMemoryGraph]:
+    """进程内共享的内存图引擎（快照版本变化时重建）；快照过期时返回 None，查询回退到Neo4j"""
+    snapshot = get_snapshot()
+    if snapshot is None:
+        return None
+    if is_stale(snapshot):
+        if _engine_cache["stale_warned"] != snapshot.version:
+            print(f"图快照(版本{snapshot.version})导出已超过{settings.GRAPH_SNAPSHOT_MAX_AGE:.0f}秒，"
+                  f"查询改由Neo4j回答，请重新导出快照")
+            _engine_cache["stale_warned"] = snapshot.version
+        return None
+    if _engine_cache["version"] != snapshot.version:
+        _engine_cache["engine"] = InMemoryGraph(snapshot)
+        _engine_cache["version"] = snapshot.version
+    return _engine_cache["engine"]
@@ -0,0 +1,194 @@
+import time
+from typing import Dict, List, Optional
+
+from config.settings import settings
+
+
+# 声明式索引清单：启动/部署时按名称幂等创建
+# City.name / Province.name 已有唯一约束（约束自带索引），此处不再重复声明
+INDEX_MANIFEST: List[Dict] = [
+    # 范围索引：等值查找、范围过滤、排序
+    {"name": "sight_name", "type": "RANGE", "label": "Sight", "properties": ["name"]},
+    {"name": "sight_star", "type": "RANGE", "label": "Sight", "properties": ["star"]},
+    {"name": "sight_heat", "type": "RANGE", "label": "Sight", "properties": ["heat"]},
+    {"name": "sight_city", "type": "RANGE", "label": "Sight", "properties": ["city"]},
+    {"name": "restaurant_name", "type": "RANGE", "label": "Restaurant", "properties": ["name"]},
+    {"name": "restaurant_city", "type": "RANGE", "label": "Restaurant", "properties": ["city"]},
+    {"name": "delicacy_name", "type": "RANGE", "label": "Delicacy", "properties": ["name"]},
+    {"name": "station_name", "type": "RANGE", "label": "Station", "properties": ["name"]},
+    {"name": "line_name", "type": "RANGE", "label": "Line", "properties": ["name"]},
+
+    # 数值属性（入库时由 data_manager/numeric_fields.py 解析）：索引排序与范围过滤
+    {"name": "sight_heat_num", "type": "RANGE", "label": "Sight", "properties": ["heat_num"]},
+    {"name": "sight_comment_score_num", "type": "RANGE", "label": "Sight", "properties": ["comment_score_num"]},
+    {"name": "sight_price_num", "type": "RANGE", "label": "Sight", "properties": ["price_num"]},
+    {"name": "restaurant_comment_score_num", "type": "RANGE", "label": "Restaurant",
+     "properties": ["comment_score_num"]},
+    {"name": "restaurant_price_average_num", "type": "RANGE", "label": "Restaurant",
+     "properties": ["price_average_num"]},
+
+    # 文本索引：名称的 CONTAINS / STARTS WITH 查找
+    {"name": "sight_name_text", "type": "TEXT", "label": "Sight", "properties": ["name"]},
+    {"name": "restaurant_name_text", "type": "TEXT", "label": "Restaurant", "properties": ["name"]},
+    {"name": "delicacy_name_text", "type": "TEXT", "label": "Delicacy", "properties": ["name"]},
+    {"name": "station_name_text", "type": "TEXT", "label": "Station", "properties": ["name"]},
+
+    # 复合索引：常见的组合过滤
+    {"name": "sight_star_heat", "type": "RANGE", "label": "Sight", "properties": ["star", "heat"]},
+    {"name": "sight_city_heat", "type": "RANGE", "label": "Sight", "properties": ["city", "heat"]},
+    {"name": "sight_city_heat_num", "type": "RANGE", "label": "Sight", "properties": ["city", "heat_num"]},
+    {"name": "sight_star_heat_num", "type": "RANGE", "label": "Sight", "properties": ["star", "heat_num"]},
+    {"name": "station_city_name", "type": "RANGE", "label": "Station", "properties": ["city", "name"]},
+
+    # 全文索引：景点/餐馆/美食的模糊检索（见 services/fulltext_search.py）
+    {"name": "entity_fulltext", "type": "FULLTEXT", "label": ["Sight", "Restaurant", "Delicacy"],
+     # 景点/餐馆的介绍存于 introduction，美食的介绍存于 introduce（见美食爬虫）
+     "properties": ["name", "address", "introduction", "introduce", "features"],
+     "analyzer": settings.FULLTEXT_ANALYZER},
+]
+
+_applied = False
+
+
+class IndexManager:
+    def __init__(self, driver, manifest: Optional[List[Dict]] = None):
+        self.driver = driver
+        self.manifest = manifest if manifest is not None else INDEX_MANIFEST
+
+    @staticmethod
+    def build_statement(index: Dict) -> str:
+        """Build CREATE INDEX statement for a manifest entry"""
+        props = ", ".join(f"n.`{p}`" for p in index["properties"])
+        if index["type"] == "FULLTEXT":
+            labels = "|".join(f"`{label}`" for label in index["label"])
+            return (f"CREATE FULLTEXT INDEX `{index['name']}` IF NOT EXISTS "
+                    f"FOR (n:{labels}) ON EACH [{props}] "
+                    f"OPTIONS {{indexConfig: {{`fulltext.analyzer`: '{index['analyzer']}'}}}}")
+        prefix = "CREATE TEXT INDEX" if index["type"] == "TEXT" else "CREATE INDEX"
+        return (f"{prefix} `{index['name']}` IF NOT EXISTS "
+                f"FOR (n:`{index['label']}`) ON ({props})")
+
+    def apply(self) -> List[str]:
+        """Create all indexes in the manifest (idempotent), return created names
+
+        An existing index whose labels or properties differ from the manifest
+        is dropped and recreated, so manifest changes reach deployed databases.
+        """
+        existing = {idx["name"]: idx for idx in self.list_indexes()}
+        created = []
+        for index in self.manifest:
+            current = existing.get(index["name"])
+            if current is not None and self._matches(index, current):
+                continue
+            try:
+                if current is not None:
+                    self._safe_query(f"DROP INDEX `{index['name']}` IF EXISTS")
+                self._safe_query(self.build_statement(index))
+                created.append(index["name"])
+            except Exception as e:
+                print(f"Index {index['name']} not created: {e}")
+        return created
+
+    @staticmethod
+    def _matches(index: Dict, current: Dict) -> bool:
+        labels = index["label"] if isinstance(index["label"], list) else [index["label"]]
+        return (list(current.get("labelsOrTypes") or []) == labels
+                and list(current.get("properties") or []) == index["properties"])
+
+    def list_indexes(self) -> List[Dict]:
+        """Get index states, population progress and usage from Neo4j"""
+        return self._safe_query(
+            "SHOW INDEXES YIELD name, type, state, populationPercent, "
+            "labelsOrTypes, properties, readCount, lastRead"
+        )
+
+    def wait_until_online(self, timeout: Optional[float] = None,
+                          poll_interval: float = 1.0, verbose: bool = True) -> bool:
+        """Wait until all manifest indexes are ONLINE, printing population progress"""
+        timeout = settings.INDEX_WAIT_TIMEOUT if timeout is None else timeout
+        wanted = {index["name"] for index in self.manifest}
+        deadline = time.time() + timeout
+
+        while True:
+            states = {idx["name"]: idx for idx in self.list_indexes() if idx["name"] in wanted}
+            pending = [idx for idx in states.values() if idx["state"] != "ONLINE"]
+            failed = [idx["name"] for idx in pending if idx["state"] == "FAILED"]
+            if failed:
+                print(f"Index population failed: {', '.join(failed)}")
+                return False
+            if not pending and len(states) == len(wanted):
+                return True
+            if time.time() >= deadline:
+                print(f"Timed out waiting for indexes: {', '.join(i['name'] for i in pending)}")
+                return False
+            if verbose:
+                for idx in pending:
+                    print(f"  {idx['name']}: {idx['state']} {idx['populationPercent']:.1f}%")
+            time.sleep(poll_interval)
+
+    def report(self) -> List[Dict]:
+        """Manifest index report: state, population percent and read usage"""
+        states = {idx["name"]: idx for idx in self.list_indexes()}
+        report = []
+        for index in self.manifest:
+            idx = states.get(index["name"], {})
+            report.append({
+                "name": index["name"],
+                "type": index["type"],
+                "schema": f"{self._label_text(index)}({', '.join(index['properties'])})",
+                "state": idx.get("state", "MISSING"),
+                "population_percent": idx.get("populationPercent"),
+                "read_count": idx.get("readCount"),
+                "last_read": str(idx["lastRead"]) if idx.get("lastRead") else None
+            })
+        return report
+
+    @staticmethod
+    def _label_text(index: Dict) -> str:
+        labels = index["label"]
+        return "|".join(labels) if isinstance(labels, list) else labels
+
+    def _safe_query(self, query: str) -> List[Dict]:
+        with self.driver.session() as session:
+            return session.run(query).data()
+
+
+def print_report(rows: List[Dict]) -> None:
+    """Print one line per manifest index from report()"""
+    for row in rows:
+        print(f"{row['name']:<24}{row['type']:<6}{row['schema']:<28}{row['state']:<8}"
+              f"{row['population_percent']}%  reads={row['read_count']} last={row['last_read']}")
+
+
+def ensure_indexes(driver) -> None:
+    """Apply the index manifest once per process (startup hook)
+
+    Waits up to STARTUP_INDEX_WAIT_TIMEOUT for the indexes to come ONLINE;
+    if they are not ready in time the report is printed and startup goes on.
+    """
+    global _applied
+    if _applied or not settings.APPLY_INDEXES_ON_STARTUP:
+        return
+    try:
+        manager = IndexManager(driver)
+        manager.apply()
+        if not manager.wait_until_online(timeout=settings.STARTUP_INDEX_WAIT_TIMEOUT, verbose=False):
+            print_report(manager.report())
+    except Exception as e:
+        print(f"Index provisioning skipped: {e}")
+    _applied = True
+
+
+if __name__ == "__main__":
+    # 部署时执行: python -m services.index_manager
+    from services.database import Neo4jDriver
+
+    neo4j = Neo4jDriver()
+    try:
+        manager = IndexManager(neo4j.driver)
+        created = manager.apply()
+        print(f"Created indexes: {created or 'none'}")
+        manager.wait_until_online()
+        print_report(manager.report())
+    finally:
+        neo4j.close()
@@ -0,0 +1,110 @@
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional
+
+from config.settings import settings
+
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_query(query: Optional[str]) -> str:
+    """搜索词归一化：全角转半角、忽略大小写、合并空白，使等价输入命中同一缓存项"""
+    if not query:
+        return ""
+    return _SPACES.sub(" ", unicodedata.normalize("NFKC", query)).strip().casefold()
+
+
+def zoom_bucket(zoom: int) -> int:
+    """缩放级别分档：不再聚合的级别渲染规则相同，归为一档"""
+    return min(int(zoom), settings.MAP_CLUSTER_MAX_ZOOM)
+
+
+class RenderedMapCache:
+    """进程内共享的地图渲染结果缓存（所有会话共用），按占用字节数做LRU淘汰
+
+    缓存值为已序列化的标记图层（字符串），键由调用方组合：归一化搜索词、缩放分档、
+    数据版本和视野范围。同一键并发未命中时只构建一次，其余线程等待结果。
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes if max_bytes is not None else settings.MAP_RENDER_CACHE_MB * 1024 * 1024
+        self._entries: "OrderedDict[Hashable, str]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._building: Dict[Hashable, threading.Event] = {}
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key: Hashable) -> Optional[str]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return value
+
+    def put(self, key: Hashable, value: str) -> None:
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= self._sizeof(old)
+            self._entries[key] = value
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= self._sizeof(evicted)
+                self._stats["evictions"] += 1
+
+    def get_or_build(self, key: Hashable, build: Callable[[], str]) -> str:
+        """命中直接返回；未命中时调用 build() 生成并缓存"""
+        while True:
+            value = self.get(key)
+            if value is not None:
+                return value
+            with self._lock:
+                pending = self._building.get(key)
+                if pending is None:
+                    pending = self._building[key] = threading.Event()
+                    self._stats["misses"] += 1
+                    break
+            pending.wait()
+        try:
+            value = build()
+            self.put(key, value)
+            return value
+        finally:
+            with self._lock:
+                self._building.pop(key, None)
+            pending.set()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries), bytes=self._bytes, max_bytes=self.max_bytes)
+
+    @staticmethod
+    def _sizeof(value: str) -> int:
+        # 图层数据以UTF-8写入页面，按编码后的字节数近似计算占用
+        return len(value.encode("utf-8"))
+
+
+_cache: Optional[RenderedMapCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_map_cache() -> RenderedMapCache:
+    """进程内共享的地图渲染缓存"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = RenderedMapCache()
+        return _cache
@@ -0,0 +1,85 @@
+from typing import Dict, Sequence
+
+import numpy as np
+from branca.element import MacroElement
+from jinja2 import Template
+
+from data_manager.json_codec import get_codec
+
+
+def feature_collection(lat: Sequence[float], lon: Sequence[float],
+                       properties: Dict[str, Sequence]) -> Dict:
+    """直接由列数组构建点的 GeoJSON FeatureCollection"""
+    keys = list(properties)
+    columns = [np.asarray(values).tolist() for values in properties.values()]
+    lon_list = np.asarray(lon, dtype=np.float64).tolist()
+    lat_list = np.asarray(lat, dtype=np.float64).tolist()
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [x, y]},
+                "properties": dict(zip(keys, values)),
+            }
+            for x, y, *values in zip(lon_list, lat_list, *columns)
+        ],
+    }
+
+
+def encode_features(lat: Sequence[float], lon: Sequence[float], properties: Dict[str, Sequence]) -> str:
+    """序列化 FeatureCollection，用于嵌入页面的 <script>"""
+    payload = get_codec().dumps(feature_collection(lat, lon, properties), compact=True).decode("utf-8")
+    # 防止字符串值提前闭合外层的 <script> 标签
+    return payload.replace("</", "<\\/")
+
+
+class SightsMarkerLayer(MacroElement):
+    """所有景点标记和聚合气泡合并为一个 Leaflet GeoJSON 图层
+
+    单个景点的要素带 name/price，聚合点带 count（大于1）；图标、提示和弹窗都在浏览器端生成，
+    Python 端只序列化一个 FeatureCollection。data 为 encode_features 的输出，调用方可缓存复用。
+    """
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        var {{ this.get_name() }} = (function() {
+            function esc(value) {
+                return String(value == null ? "" : value).replace(/[&<>"']/g, function(c) {
+                    return {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;"}[c];
+                });
+            }
+            return L.geoJSON({{ this.data }}, {
+                pointToLayer: function(feature, latlng) {
+                    var count = feature.properties.count || 1;
+                    if (count <= 1) {
+                        return L.marker(latlng);
+                    }
+                    var size = Math.round(28 + 8 * Math.log10(count));
+                    return L.marker(latlng, {icon: L.divIcon({
+                        className: "",
+                        iconSize: [size, size],
+                        iconAnchor: [size / 2, size / 2],
+                        html: '<div style="width:' + size + 'px;height:' + size + 'px;line-height:' + size +
+                              'px;border-radius:50%;background:rgba(49,130,189,0.85);color:#fff;' +
+                              'text-align:center;font-weight:bold;font-size:12px;">' + count + '</div>'
+                    })});
+                },
+                onEachFeature: function(feature, layer) {
+                    var p = feature.properties;
+                    if ((p.count || 1) > 1) {
+                        layer.bindTooltip(p.count + " 个景点，放大查看");
+                        return;
+                    }
+                    layer.bindTooltip(esc(p.name) + " ¥" + esc(p.price));
+                    layer.bindPopup("<b>" + esc(p.name) + "</b>", {maxWidth: 120});
+                }
+            }).addTo({{ this._parent.get_name() }});
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, data: str):
+        super().__init__()
+        self._name = "SightsMarkerLayer"
+        self.data = data
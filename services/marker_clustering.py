@@ -0,0 +1,75 @@
+import math
+from typing import Dict, Optional
+
+import numpy as np
+
+from config.settings import settings
+
+MAX_ZOOM = 18
+
+
+def mercator(lat: np.ndarray, lon: np.ndarray):
+    """经纬度投影为归一化的 Web 墨卡托坐标，取值 [0, 1)"""
+    lat = np.clip(np.asarray(lat, dtype=np.float64), -85.05112878, 85.05112878)
+    x = (np.asarray(lon, dtype=np.float64) + 180.0) / 360.0
+    sin = np.sin(np.radians(lat))
+    y = 0.5 - np.log((1 + sin) / (1 - sin)) / (4 * math.pi)
+    return np.clip(x, 0.0, 1.0 - 1e-12), np.clip(y, 0.0, 1.0 - 1e-12)
+
+
+class MarkerClusterer:
+    """服务端按网格聚合地图点位，每个缩放级别计算一次
+
+    缩放级别 z 时地图宽 256 * 2**z 像素，落在同一个 cell_px 像素网格内的点合并为一个聚合点，
+    位置取成员的质心。各级别按需用 NumPy 计算后缓存，每级只需一次 O(n) 分桶。
+    """
+
+    def __init__(self, lat, lon, cell_px: Optional[int] = None):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.x, self.y = mercator(self.lat, self.lon)
+        self.cell_px = cell_px or settings.MAP_CLUSTER_CELL_PX
+        self._levels: Dict[int, Dict[str, np.ndarray]] = {}
+
+    def __len__(self):
+        return len(self.lat)
+
+    def level(self, zoom: int) -> Dict[str, np.ndarray]:
+        """某缩放级别的聚合结果
+
+        返回数组 lat、lon（质心）、count（成员数）、first（一个成员的行号，单点时即该点）
+        和 cell（每个点所属聚合的编号）。
+        """
+        zoom = int(min(max(zoom, 0), MAX_ZOOM))
+        if zoom not in self._levels:
+            cells_per_axis = max(int(256 * 2 ** zoom // self.cell_px), 1)
+            cx = (self.x * cells_per_axis).astype(np.int64)
+            cy = (self.y * cells_per_axis).astype(np.int64)
+            keys = cx * cells_per_axis + cy
+            _, first, cell = np.unique(keys, return_index=True, return_inverse=True)
+            count = np.bincount(cell)
+            self._levels[zoom] = {
+                "lat": np.bincount(cell, weights=self.lat) / count,
+                "lon": np.bincount(cell, weights=self.lon) / count,
+                "count": count,
+                "first": first,
+                "cell": cell,
+            }
+        return self._levels[zoom]
+
+    def clusters(self, zoom: int, max_items: Optional[int] = None,
+                 subset: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """在 zoom 级别要绘制的聚合点，最多 max_items 个
+
+        给定 subset（点的下标，如视野内的点）时只返回包含其中至少一个点的聚合，计数仍包含全部成员。
+        聚合点过多时改用更粗的级别，无论数据量多大页面数据量都有上限。
+        """
+        max_items = max_items or settings.MAP_MAX_MARKERS
+        zoom = int(min(max(zoom, 0), MAX_ZOOM))
+        while True:
+            level = self.level(zoom)
+            ids = np.arange(len(level["count"])) if subset is None else np.unique(level["cell"][subset])
+            if len(ids) <= max_items or zoom == 0:
+                break
+            zoom -= 1
+        return {key: level[key][ids] for key in ("lat", "lon", "count", "first")}
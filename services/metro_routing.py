@@ -0,0 +1,321 @@
+import heapq
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from config.settings import settings
+from data_manager.graph_snapshot import get_snapshot
+from services.proximity import ProximityIndex, get_sight_proximity, haversine_m
+
+FASTEST, FEWEST_TRANSFERS = "fastest", "fewest_transfers"
+# 少换乘模式下每次换乘的附加代价，远大于任何一条线路内的乘车时间
+_TRANSFER_RANK = 1e7
+
+# 路线端点：站名，或 (纬度, 经度) 坐标
+Endpoint = Union[str, Tuple[float, float]]
+
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if np.isnan(value) else value
+
+
+def _line_edges(lat: np.ndarray, lon: np.ndarray) -> List[Tuple[int, int]]:
+    """推断一条线路上相邻的站：站点间距离的最小生成树即线路走向（支线自然形成分叉）
+
+    生成树是一条链、且两个端点的距离不超过相邻站平均间距的两倍时视为环线，补上首尾相连的一段。
+    """
+    n = len(lat)
+    if n < 2:
+        return []
+    dist = np.stack([haversine_m(lat[i], lon[i], lat, lon) for i in range(n)])
+    in_tree = np.zeros(n, dtype=bool)
+    in_tree[0] = True
+    best, parent = dist[0].copy(), np.zeros(n, dtype=np.int64)
+    edges = []
+    for _ in range(n - 1):
+        j = int(np.argmin(np.where(in_tree, np.inf, best)))
+        edges.append((int(parent[j]), j))
+        in_tree[j] = True
+        closer = dist[j] < best
+        best[closer], parent[closer] = dist[j][closer], j
+
+    degree = np.bincount(np.array(edges).ravel(), minlength=n)
+    if n >= 4 and degree.max() <= 2:
+        a, b = np.flatnonzero(degree == 1)
+        if dist[a, b] <= 2 * np.mean([dist[i, j] for i, j in edges]):
+            edges.append((int(a), int(b)))
+    return edges
+
+
+class MetroNetwork:
+    """单个城市的地铁网络：每个 (线路, 站名) 是一个站台节点，邻接关系以 CSR 数组存储
+
+    同一线路上的相邻站台之间是乘车边（耗时 = 距离 / 平均速度 + 停站时间），同名站或同一
+    POI 的不同线路站台之间是换乘边（耗时 = 换乘时间）。以站名为起点的最短路径树按
+    (站名, 模式) 缓存，热门起点的后续查询只需回溯路径。
+    """
+
+    def __init__(self, city: str, rows: Sequence[Dict]):
+        self.city = city
+        platforms: "OrderedDict[Tuple[str, str], List]" = OrderedDict()
+        for row in rows:
+            # 同一线路上重复出现的同名站（如上下行两个POI）合并为一个站台，坐标取平均
+            platforms.setdefault((row["line"], row["name"]), []).append(row)
+
+        self.lines = [line for line, _ in platforms]
+        self.names = [name for _, name in platforms]
+        self.lat = np.array([np.mean([r["lat"] for r in group]) for group in platforms.values()])
+        self.lon = np.array([np.mean([r["lng"] for r in group]) for group in platforms.values()])
+        self.by_name: Dict[str, List[int]] = {}
+        for i, name in enumerate(self.names):
+            self.by_name.setdefault(name, []).append(i)
+
+        src, dst, length, transfer = [], [], [], []
+
+        def connect(i, j, meters, is_transfer):
+            src.extend((i, j))
+            dst.extend((j, i))
+            length.extend((meters, meters))
+            transfer.extend((is_transfer, is_transfer))
+
+        by_line: Dict[str, List[int]] = {}
+        for i, line in enumerate(self.lines):
+            by_line.setdefault(line, []).append(i)
+        for members in by_line.values():
+            members = np.asarray(members)
+            for a, b in _line_edges(self.lat[members], self.lon[members]):
+                i, j = int(members[a]), int(members[b])
+                connect(i, j, float(haversine_m(self.lat[i], self.lon[i], self.lat[[j]], self.lon[[j]])[0]), False)
+
+        # 换乘：同名站台，以及同一个POI（站点节点）所属的不同线路站台
+        groups: Dict[Any, set] = {}
+        for i, group in enumerate(platforms.values()):
+            groups.setdefault(("name", self.names[i]), set()).add(i)
+            for row in group:
+                if row.get("poi_id") is not None:
+                    groups.setdefault(("poi", row["poi_id"]), set()).add(i)
+        linked = set()
+        for members in groups.values():
+            members = sorted(members)
+            for x, i in enumerate(members):
+                for j in members[x + 1:]:
+                    if (i, j) not in linked:
+                        linked.add((i, j))
+                        connect(i, j, 0.0, True)
+
+        order = np.argsort(np.asarray(src, dtype=np.int64), kind="stable")
+        self.indices = np.asarray(dst, dtype=np.int32)[order]
+        self.length_m = np.asarray(length, dtype=np.float64)[order]
+        self.is_transfer = np.asarray(transfer, dtype=bool)[order]
+        counts = np.bincount(np.asarray(src, dtype=np.int64), minlength=len(self.names))
+        self.indptr = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+        speed = settings.METRO_SPEED_KMH / 3.6
+        seconds = np.where(self.is_transfer, settings.METRO_TRANSFER_SECONDS,
+                           self.length_m / speed + settings.METRO_DWELL_SECONDS)
+        self.seconds = seconds
+        self._weights = {
+            FASTEST: seconds,
+            FEWEST_TRANSFERS: seconds + self.is_transfer * _TRANSFER_RANK,
+        }
+        self._trees: "OrderedDict[Tuple[str, str], Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.names)
+
+    def shortest_tree(self, name: str, mode: str = FASTEST) -> Tuple[np.ndarray, np.ndarray]:
+        """以站名（所有同名站台同时出发）为起点的最短路径树: (代价, 前驱站台)"""
+        key = (name, mode)
+        with self._lock:
+            if key in self._trees:
+                self._trees.move_to_end(key)
+                return self._trees[key]
+        tree = self._dijkstra(self.by_name[name], self._weights[mode])
+        with self._lock:
+            self._trees[key] = tree
+            while len(self._trees) > settings.METRO_TREE_CACHE:
+                self._trees.popitem(last=False)
+        return tree
+
+    def _dijkstra(self, sources: List[int], weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        n = len(self.names)
+        dist = [float("inf")] * n
+        prev = [-1] * n
+        indptr, indices, weights = self.indptr.tolist(), self.indices.tolist(), weights.tolist()
+        heap = []
+        for s in sources:
+            dist[s] = 0.0
+            heap.append((0.0, s))
+        heapq.heapify(heap)
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            for e in range(indptr[u], indptr[u + 1]):
+                v, nd = indices[e], d + weights[e]
+                if nd < dist[v]:
+                    dist[v], prev[v] = nd, u
+                    heapq.heappush(heap, (nd, v))
+        return np.asarray(dist), np.asarray(prev, dtype=np.int64)
+
+    def route(self, origin: str, destination: str, mode: str = FASTEST) -> Optional[Dict]:
+        """两站间的路线: {from, to, legs: [{line, from, to, stops}], transfers, distance_m, minutes}"""
+        if origin not in self.by_name or destination not in self.by_name:
+            return None
+        if origin == destination:
+            return {"city": self.city, "from": origin, "to": destination, "legs": [],
+                    "transfers": 0, "distance_m": 0, "minutes": 0.0}
+        cost, prev = self.shortest_tree(origin, mode)
+        targets = self.by_name[destination]
+        end = min(targets, key=lambda i: cost[i])
+        if not np.isfinite(cost[end]):
+            return None
+
+        path = [end]
+        while prev[path[-1]] >= 0:
+            path.append(int(prev[path[-1]]))
+        path.reverse()
+
+        legs, distance, seconds = [], 0.0, 0.0
+        for u, v in zip(path, path[1:]):
+            e = self._edge(u, v)
+            seconds += self.seconds[e]
+            if self.is_transfer[e]:
+                continue
+            distance += self.length_m[e]
+            if legs and legs[-1]["line"] == self.lines[u] and legs[-1]["to"] == self.names[u]:
+                legs[-1]["to"] = self.names[v]
+                legs[-1]["stops"] += 1
+            else:
+                legs.append({"line": self.lines[u], "from": self.names[u], "to": self.names[v], "stops": 1})
+        return {"city": self.city, "from": origin, "to": destination, "legs": legs,
+                "transfers": max(len(legs) - 1, 0), "distance_m": round(distance),
+                "minutes": round(float(seconds) / 60, 1)}
+
+    def _edge(self, u: int, v: int) -> int:
+        start, end = self.indptr[u], self.indptr[u + 1]
+        # 同一对站台之间可能同时有乘车边和换乘边，取耗时最短的一条（与最短路一致）
+        candidates = [e for e in range(start, end) if self.indices[e] == v]
+        return min(candidates, key=lambda e: self.seconds[e])
+
+
+class MetroRouter:
+    """所有城市的地铁路线规划：站名或坐标之间的最快/最少换乘路线，景点通过最近的地铁站接入"""
+
+    def __init__(self, rows: Sequence[Dict]):
+        by_city: Dict[str, List[Dict]] = {}
+        for row in rows:
+            lat, lng = _to_float(row.get("lat")), _to_float(row.get("lng"))
+            if row.get("city") and row.get("line") and row.get("name") and lat is not None and lng is not None:
+                by_city.setdefault(row["city"], []).append(dict(row, lat=lat, lng=lng))
+        self.networks = {city: MetroNetwork(city, city_rows) for city, city_rows in by_city.items()}
+
+        # 全国站台的近邻索引，用于把坐标（景点）接入最近的地铁站
+        self._platforms = [(city, i) for city, network in self.networks.items() for i in range(len(network))]
+        self._stations = ProximityIndex(
+            [self.networks[city].names[i] for city, i in self._platforms],
+            [self.networks[city].lat[i] for city, i in self._platforms],
+            [self.networks[city].lon[i] for city, i in self._platforms],
+        )
+
+    @classmethod
+    def from_snapshot(cls, snapshot) -> "MetroRouter":
+        station_start, _ = snapshot.label_range("Station")
+        line_start, _ = snapshot.label_range("Line")
+        lines = {
+            "name": snapshot.values("Line", "name"),
+            "city": snapshot.values("Line", "city"),
+        }
+        stations = {prop: snapshot.values("Station", prop) for prop in ("name", "poi_id", "gd_lat", "gd_lng")}
+        src, dst = snapshot.relationships("BELONGS_TO")
+        rows = []
+        for s, l in zip(np.asarray(src).tolist(), np.asarray(dst).tolist()):
+            i, j = s - station_start, l - line_start
+            if not (0 <= i < snapshot.count("Station") and 0 <= j < snapshot.count("Line")):
+                continue
+            rows.append({"city": lines["city"][j], "line": lines["name"][j], "name": stations["name"][i],
+                         "poi_id": stations["poi_id"][i], "lat": stations["gd_lat"][i],
+                         "lng": stations["gd_lng"][i]})
+        return cls(rows)
+
+    @classmethod
+    def from_neo4j(cls, neo4j) -> "MetroRouter":
+        return cls(neo4j.execute_query("""
+            MATCH (st:Station)-[:BELONGS_TO]->(l:Line)-[:OPERATES_IN]->(c:City)
+            RETURN c.name AS city, l.name AS line, st.name AS name, st.poi_id AS poi_id,
+                   st.gd_lat AS lat, st.gd_lng AS lng
+        """))
+
+    def cities_of(self, station: str) -> List[str]:
+        return [city for city, network in self.networks.items() if station in network.by_name]
+
+    def nearest_station(self, lat: float, lon: float,
+                        max_distance_m: Optional[float] = None) -> Optional[Tuple[str, str, float]]:
+        """距离坐标最近的地铁站: (城市, 站名, 距离米)，范围内没有时返回None"""
+        indices, distances = self._stations.nearest(lat, lon, 1, max_distance_m or settings.NEAR_STATION_MAX_M)
+        if not len(indices):
+            return None
+        city, i = self._platforms[int(indices[0])]
+        return city, self.networks[city].names[i], float(distances[0])
+
+    def route(self, origin: Endpoint, destination: Endpoint, mode: str = FASTEST) -> Optional[Dict]:
+        """站名或 (纬度, 经度) 之间的路线；坐标端点先步行到最近的地铁站（结果附带步行距离）"""
+        start, end = self._resolve(origin), self._resolve(destination)
+        for city in start:
+            if city in end:
+                result = self.networks[city].route(start[city][0], end[city][0], mode)
+                if result is not None:
+                    result["walk_from_m"] = round(start[city][1])
+                    result["walk_to_m"] = round(end[city][1])
+                    return result
+        return None
+
+    def route_sights(self, origin: str, destination: str, mode: str = FASTEST) -> Optional[Dict]:
+        """两个景点之间的地铁路线，经由各自最近的地铁站；景点没有坐标时返回None"""
+        index = get_sight_proximity()
+        points = [index.position(origin), index.position(destination)]
+        if None in points:
+            return None
+        start, end = [(float(index.lat[i]), float(index.lon[i])) for i in points]
+        return self.route(start, end, mode)
+
+    def _resolve(self, endpoint: Endpoint) -> Dict[str, Tuple[str, float]]:
+        """端点 -> {城市: (站名, 步行距离)}"""
+        if isinstance(endpoint, str):
+            return {city: (endpoint, 0.0) for city in self.cities_of(endpoint)}
+        nearest = self.nearest_station(*endpoint)
+        return {nearest[0]: (nearest[1], nearest[2])} if nearest else {}
+
+
+_router: Dict[str, Any] = {"version": None, "router": None}
+_router_lock = threading.Lock()
+
+
+def get_metro_router() -> Optional[MetroRouter]:
+    """进程内共享的地铁路线规划器：有图快照时从快照构建（版本变化时重建），否则从Neo4j加载一次"""
+    with _router_lock:
+        snapshot = get_snapshot()
+        if snapshot is not None and "Station" in snapshot.labels:
+            version = snapshot.version
+            if _router["version"] != version:
+                _router["router"] = MetroRouter.from_snapshot(snapshot)
+                _router["version"] = version
+        elif _router["router"] is None:
+            from services.database import Neo4jDriver
+
+            neo4j = Neo4jDriver()
+            try:
+                _router["router"] = MetroRouter.from_neo4j(neo4j)
+            except Exception as e:
+                print(f"加载地铁数据失败: {str(e)}")
+                return None
+            finally:
+                neo4j.close()
+        return _router["router"]
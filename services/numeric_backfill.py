@@ -0,0 +1,55 @@
+from typing import Dict, List
+
+from data_manager.numeric_fields import NUMERIC_FIELDS, normalize_numeric_fields
+
+# 需要回填数值属性的节点标签
+BACKFILL_LABELS = ["Sight", "Restaurant", "Delicacy"]
+
+
+class NumericBackfill:
+    """一次性回填：为已有节点解析 heat/comment_score/comment_number/price 的数值属性"""
+
+    def __init__(self, driver, batch_size: int = 1000):
+        self.driver = driver
+        self.batch_size = batch_size
+
+    def run(self, labels: List[str] = None) -> Dict[str, int]:
+        """回填所有标签，返回每个标签更新的节点数"""
+        return {label: self.backfill_label(label) for label in (labels or BACKFILL_LABELS)}
+
+    def backfill_label(self, label: str) -> int:
+        raw_fields = ", ".join(f"{field}: n.`{field}`" for field in NUMERIC_FIELDS)
+        rows = self._safe_query(
+            f"MATCH (n:`{label}`) RETURN elementId(n) AS id, {{{raw_fields}}} AS raw"
+        )
+
+        updates = []
+        for row in rows:
+            raw = {k: v for k, v in row["raw"].items() if v is not None}
+            props = normalize_numeric_fields(raw)
+            if props:
+                updates.append({"id": row["id"], "props": props})
+
+        for start in range(0, len(updates), self.batch_size):
+            self._safe_query("""
+                UNWIND $rows AS row
+                MATCH (n) WHERE elementId(n) = row.id
+                SET n += row.props
+            """, rows=updates[start:start + self.batch_size])
+        return len(updates)
+
+    def _safe_query(self, query: str, **params) -> List[Dict]:
+        with self.driver.session() as session:
+            return session.run(query, **params).data()
+
+
+if __name__ == "__main__":
+    # 执行: python -m services.numeric_backfill
+    from services.database import Neo4jDriver
+
+    neo4j = Neo4jDriver()
+    try:
+        for label, count in NumericBackfill(neo4j.driver).run().items():
+            print(f"{label}: {count} nodes updated")
+    finally:
+        neo4j.close()
@@ -0,0 +1,171 @@
+import math
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config.settings import settings
+from data_manager.coordinates_cache import ColumnarCache, load_coordinates
+from data_manager.sights_data import get_sights_store
+from services.spatial_index import GridIndex
+
+EARTH_RADIUS_M = 6371008.8
+# 半个赤道周长：任意两点的球面距离都不超过它
+MAX_DISTANCE_M = math.pi * EARTH_RADIUS_M
+
+
+def haversine_m(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """一点到一组点的球面距离（米），向量化计算"""
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def radius_bounds(lat: float, lon: float, radius_m: float) -> Tuple[float, float, float, float]:
+    """覆盖以 (lat, lon) 为圆心、radius_m 为半径的圆的经纬度矩形（跨180°经线时 west > east）"""
+    dlat = math.degrees(radius_m / EARTH_RADIUS_M)
+    south, north = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+    cos_lat = min(math.cos(math.radians(south)), math.cos(math.radians(north)))
+    if south <= -90.0 or north >= 90.0 or cos_lat <= 0:
+        return south, -180.0, north, 180.0
+    dlon = math.degrees(radius_m / (EARTH_RADIUS_M * cos_lat))
+    if dlon >= 180.0:
+        return south, -180.0, north, 180.0
+    west, east = lon - dlon, lon + dlon
+    if west < -180.0:
+        west += 360.0
+    if east > 180.0:
+        east -= 360.0
+    return south, west, north, east
+
+
+class ProximityIndex:
+    """地点的近邻检索：网格分桶筛选候选，再对候选做向量化 haversine 精确计算
+
+    半径查询只计算覆盖圆的矩形内的点；k 近邻从初始半径开始逐次加倍，
+    直到圆内（而非矩形内）已有 k 个点，此时圆内距离最小的 k 个点即为全局最近的 k 个。
+    """
+
+    def __init__(self, names: Sequence[str], lat, lon, cell_deg: Optional[float] = None):
+        self.names = list(names)
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.grid = GridIndex(self.lat, self.lon, cell_deg or settings.PROXIMITY_CELL_DEG)
+        self._position: Dict[str, int] = {}
+        for i, name in enumerate(self.names):
+            self._position.setdefault(name, i)
+
+    def __len__(self):
+        return len(self.names)
+
+    def position(self, name: str) -> Optional[int]:
+        return self._position.get(name)
+
+    def within(self, lat: float, lon: float, radius_m: float,
+               limit: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """半径 radius_m 米内的点，返回 (下标, 距离米)，按距离升序"""
+        candidates = self.grid.query(radius_bounds(lat, lon, radius_m))
+        distances = haversine_m(lat, lon, self.lat[candidates], self.lon[candidates])
+        inside = distances <= radius_m
+        candidates, distances = candidates[inside], distances[inside]
+        order = np.argsort(distances, kind="stable")
+        if limit is not None:
+            order = order[:limit]
+        return candidates[order], distances[order]
+
+    def nearest(self, lat: float, lon: float, k: int, max_radius_m: Optional[float] = None,
+                exclude: Sequence[int] = ()) -> Tuple[np.ndarray, np.ndarray]:
+        """距离 (lat, lon) 最近的 k 个点（可排除指定下标），返回 (下标, 距离米)，按距离升序"""
+        max_radius_m = min(max_radius_m or MAX_DISTANCE_M, MAX_DISTANCE_M)
+        wanted = min(k + len(exclude), len(self))
+        radius = min(settings.PROXIMITY_START_RADIUS_M, max_radius_m)
+        while True:
+            indices, distances = self.within(lat, lon, radius)
+            if len(indices) >= wanted or radius >= max_radius_m:
+                break
+            radius = min(radius * 2, max_radius_m)
+        if len(exclude):
+            keep = ~np.isin(indices, np.asarray(exclude))
+            indices, distances = indices[keep], distances[keep]
+        return indices[:k], distances[:k]
+
+    def nearest_to(self, name: str, k: int, max_radius_m: Optional[float] = None) -> List[Dict]:
+        """某地点周边最近的 k 个其他地点: [{name, distance_m}]；地点不存在时返回空列表"""
+        i = self.position(name)
+        if i is None:
+            return []
+        indices, distances = self.nearest(self.lat[i], self.lon[i], k, max_radius_m, exclude=[i])
+        return [{"name": self.names[j], "distance_m": round(float(d))} for j, d in zip(indices, distances)]
+
+
+def _city_of(name: str, city_uid: Optional[str]) -> Optional[str]:
+    # city_uid 形如 "城市_景点名"
+    suffix = f"_{name}"
+    if city_uid and city_uid.endswith(suffix) and len(city_uid) > len(suffix):
+        return city_uid[:-len(suffix)]
+    return None
+
+
+def sight_locations() -> Tuple[List[str], List[Optional[str]], np.ndarray, np.ndarray]:
+    """景点坐标表加上 sights_data.json 中带经纬度、且不在坐标表中的景点: (名称, 城市, 纬度, 经度)，城市未知时为None"""
+    df = load_coordinates()
+    df = df[df["latitude"].notna() & df["longitude"].notna()]
+    names = df["name"].tolist()
+    cities = df["city"].tolist() if "city" in df.columns else [None] * len(names)
+    cities = [city if isinstance(city, str) and city else None for city in cities]
+    known = set(names)
+    extra = [row for row in get_sights_store().coordinates() if row[0] not in known]
+    lat = np.concatenate([df["latitude"].to_numpy(dtype=np.float64), [row[1] for row in extra]])
+    lon = np.concatenate([df["longitude"].to_numpy(dtype=np.float64), [row[2] for row in extra]])
+    return (names + [row[0] for row in extra], cities + [_city_of(row[0], row[3]) for row in extra],
+            lat, lon)
+
+
+def sight_points() -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """景点的 (名称, 纬度, 经度)"""
+    names, _, lat, lon = sight_locations()
+    return names, lat, lon
+
+
+def build_sight_index() -> ProximityIndex:
+    return ProximityIndex(*sight_points())
+
+
+_sight_index: Dict = {"index": None, "meta": None, "revision": None, "coordinates": None}
+_sight_index_lock = threading.Lock()
+
+
+def _meta_signature() -> Optional[Tuple[int, int]]:
+    # 坐标缓存重建时会重写元数据文件，只取其 stat 签名，不读取内容
+    try:
+        st = ColumnarCache().meta_file.stat()
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def get_sight_proximity() -> ProximityIndex:
+    """进程内共享的景点近邻索引（坐标表或用户数据中的坐标变化时重建）
+
+    每次调用只做一次 stat 并读取 SightsStore 的修订号；修订号变化（如新增评分）时
+    才比较用户数据中的坐标，坐标确实变化才重建。
+    """
+    store = get_sights_store()
+    with _sight_index_lock:
+        revision = store.revision
+        if _sight_index["index"] is None or _sight_index["meta"] != _meta_signature():
+            _rebuild_sight_index(revision)
+        elif _sight_index["revision"] != revision:
+            if tuple(store.coordinates()) != _sight_index["coordinates"]:
+                _rebuild_sight_index(revision)
+            _sight_index["revision"] = revision
+        return _sight_index["index"]
+
+
+def _rebuild_sight_index(revision: int) -> None:
+    _sight_index["index"] = build_sight_index()
+    # 构建时可能刚生成坐标缓存，构建后再取签名
+    _sight_index["meta"] = _meta_signature()
+    _sight_index["revision"] = revision
+    _sight_index["coordinates"] = tuple(get_sights_store().coordinates())
@@ -0,0 +1,132 @@
+from typing import Dict, List, Optional
+
+from config.settings import settings
+
+# 星级文本 -> 可排序数值
+STAR_LEVEL = "CASE n.star WHEN '5A' THEN 5 WHEN '4A' THEN 4 WHEN '3A' THEN 3 " \
+             "WHEN '2A' THEN 2 WHEN '1A' THEN 1 ELSE NULL END"
+
+# 每个实体类型可物化的排行指标: metric -> (排序值表达式, 并列时的次序表达式)
+RANKING_SPECS: Dict[str, Dict[str, tuple]] = {
+    "Sight": {
+        "heat": ("n.heat_num", "n.comment_score_num"),
+        "score": ("n.comment_score_num", "n.comment_number_num"),
+        "star": (STAR_LEVEL, "n.heat_num"),
+    },
+    "Restaurant": {
+        "heat": ("n.comment_number_num", "n.comment_score_num"),
+        "score": ("n.comment_score_num", "n.comment_number_num"),
+    },
+    # 美食节点没有评分字段，以同城餐馆菜品中提及的次数作为热度
+    "Delicacy": {
+        "heat": ("COUNT { MATCH (r:Restaurant)-[:LOCATED_IN]->(:City {name: n.city}) "
+                 "WHERE r.cuisine CONTAINS n.name }", "n.name"),
+    },
+}
+
+# 区域类型 -> 实体到区域的匹配路径
+AREA_PATTERNS = {
+    "City": "(n:`{label}`)-[:LOCATED_IN]->(a)",
+    "Province": "(n:`{label}`)-[:LOCATED_IN]->(:City)-[:BELONGS_TO]->(a)",
+}
+
+
+class RankingMaterializer:
+    """按城市/省份物化 Top-N 排行，存为 (区域)-[:TOP_RANKED {label, metric, rank, value}]->(实体)"""
+
+    def __init__(self, driver, top_n: Optional[int] = None):
+        self.driver = driver
+        self.top_n = top_n or settings.RANKING_TOP_N
+
+    def refresh_all(self) -> Dict[str, int]:
+        """重建所有城市和省份的排行"""
+        areas = {
+            "City": [r["name"] for r in self._safe_query("MATCH (c:City) RETURN c.name AS name")],
+            "Province": [r["name"] for r in self._safe_query("MATCH (p:Province) RETURN p.name AS name")],
+        }
+        return self._refresh_areas(areas)
+
+    def refresh_dirty(self) -> Dict[str, int]:
+        """增量刷新：只重建爬虫提交后标记了 rankings_dirty 的城市及其所属省份"""
+        rows = self._safe_query("""
+            MATCH (c:City) WHERE c.rankings_dirty = true
+            OPTIONAL MATCH (c)-[:BELONGS_TO]->(p:Province)
+            RETURN c.name AS city, p.name AS province
+        """)
+        if not rows:
+            return {"City": 0, "Province": 0}
+
+        areas = {
+            "City": sorted({r["city"] for r in rows}),
+            "Province": sorted({r["province"] for r in rows if r["province"]}),
+        }
+        counts = self._refresh_areas(areas)
+        self._safe_query("""
+            UNWIND $names AS name
+            MATCH (c:City {name: name})
+            REMOVE c.rankings_dirty
+        """, names=areas["City"])
+        return counts
+
+    def _refresh_areas(self, areas: Dict[str, List[str]]) -> Dict[str, int]:
+        chunk = settings.BULK_CHUNK_SIZE
+        for area_label, names in areas.items():
+            for start in range(0, len(names), chunk):
+                batch = names[start:start + chunk]
+                for label, metrics in RANKING_SPECS.items():
+                    for metric in metrics:
+                        self._refresh(area_label, batch, label, metric)
+        return {area_label: len(names) for area_label, names in areas.items()}
+
+    def _refresh(self, area_label: str, names: List[str], label: str, metric: str) -> None:
+        value_expr, tiebreak_expr = RANKING_SPECS[label][metric]
+        pattern = AREA_PATTERNS[area_label].format(label=label)
+        self._safe_query(f"""
+            UNWIND $names AS area_name
+            MATCH (a:`{area_label}` {{name: area_name}})
+            OPTIONAL MATCH (a)-[old:TOP_RANKED {{label: $label, metric: $metric}}]->()
+            DELETE old
+            WITH DISTINCT a
+            CALL {{
+                WITH a
+                MATCH {pattern}
+                WITH n, {value_expr} AS value, {tiebreak_expr} AS tiebreak
+                WHERE value IS NOT NULL
+                ORDER BY value DESC, tiebreak DESC
+                LIMIT $top_n
+                RETURN collect(n) AS ranked, collect(value) AS vals
+            }}
+            UNWIND range(0, size(ranked) - 1) AS i
+            WITH a, ranked[i] AS n, vals[i] AS value, i
+            CREATE (a)-[:TOP_RANKED {{label: $label, metric: $metric, rank: i + 1, value: value}}]->(n)
+        """, names=names, label=label, metric=metric, top_n=self.top_n)
+
+    def _safe_query(self, query: str, **params) -> List[Dict]:
+        if hasattr(self.driver, "session"):
+            with self.driver.session() as session:
+                return session.run(query, **params).data()
+        # 爬虫使用的 py2neo Graph
+        return self.driver.run(query, **params).data()
+
+
+def mark_cities_dirty(tx, city_names: List[str]) -> None:
+    """在爬虫的提交事务中标记排行需要刷新的城市"""
+    tx.run("""
+        UNWIND $names AS name
+        MATCH (c:City {name: name})
+        SET c.rankings_dirty = true
+    """, names=list(set(city_names)))
+
+
+if __name__ == "__main__":
+    # 执行: python -m services.rankings [--all]
+    import sys
+    from services.database import Neo4jDriver
+
+    neo4j = Neo4jDriver()
+    try:
+        materializer = RankingMaterializer(neo4j.driver)
+        counts = materializer.refresh_all() if "--all" in sys.argv else materializer.refresh_dirty()
+        print(f"Rankings refreshed: {counts}")
+    finally:
+        neo4j.close()
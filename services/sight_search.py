@@ -0,0 +1,112 @@
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from services.map_cache import normalize_query
+
+# 排名档位：名称完全相同 < 名称前缀 < 名称包含 < 仅地址包含
+TIER_EXACT, TIER_PREFIX, TIER_NAME, TIER_ADDRESS = 0, 1, 2, 3
+
+
+class BigramIndex:
+    """单个文本字段的字符二元组倒排索引
+
+    每个单字和相邻两字各对应一条按文档号升序的倒排表，全部倒排表拼接存放在一个
+    int32 数组中，另以字典记录每个词项的 (起, 止) 偏移。查询时取查询串各二元组中最短的
+    几条倒排表求交集，再对候选逐条做字面子串校验，耗时与倒排表长度成正比而非与文档数成正比。
+    """
+
+    def __init__(self, texts: Sequence[str]):
+        self.texts: List[str] = [normalize_query(t) if isinstance(t, str) else "" for t in texts]
+        postings: Dict[str, List[int]] = {}
+        for doc, text in enumerate(self.texts):
+            terms = set(text)
+            terms.update(text[i:i + 2] for i in range(len(text) - 1))
+            for term in terms:
+                postings.setdefault(term, []).append(doc)
+
+        self._offsets: Dict[str, Tuple[int, int]] = {}
+        self._postings = np.empty(sum(len(docs) for docs in postings.values()), dtype=np.int32)
+        start = 0
+        for term, docs in postings.items():
+            self._postings[start:start + len(docs)] = docs
+            self._offsets[term] = (start, start + len(docs))
+            start += len(docs)
+
+        # 按文本排序的文档号，前缀查询用二分查找
+        self._sorted_docs = sorted(range(len(self.texts)), key=self.texts.__getitem__)
+        self._sorted_texts = [self.texts[doc] for doc in self._sorted_docs]
+
+    def __len__(self):
+        return len(self.texts)
+
+    def _posting(self, term: str) -> np.ndarray:
+        start, end = self._offsets.get(term, (0, 0))
+        return self._postings[start:end]
+
+    def candidates(self, query: str) -> np.ndarray:
+        """可能包含 query 的文档号（升序），是结果的超集"""
+        if len(query) == 1:
+            return self._posting(query)
+        terms = {query[i:i + 2] for i in range(len(query) - 1)}
+        lists = sorted((self._posting(term) for term in terms), key=len)
+        result = lists[0]
+        for docs in lists[1:]:
+            if not len(result):
+                break
+            result = np.intersect1d(result, docs, assume_unique=True)
+        return result
+
+    def contains(self, query: str) -> np.ndarray:
+        """字面包含 query 的文档号（升序）；query 须已归一化"""
+        if not query:
+            return np.arange(len(self.texts), dtype=np.int32)
+        texts = self.texts
+        return np.array([doc for doc in self.candidates(query).tolist() if query in texts[doc]], dtype=np.int32)
+
+    def prefix(self, query: str) -> np.ndarray:
+        """以 query 开头的文档号（按文本排序）；query 须已归一化"""
+        start = bisect_left(self._sorted_texts, query)
+        end = start
+        while end < len(self._sorted_texts) and self._sorted_texts[end].startswith(query):
+            end += 1
+        return np.array(self._sorted_docs[start:end], dtype=np.int32)
+
+
+class SightSearchIndex:
+    """景点名称与地址的字面子串检索（不区分大小写和全半角），数据加载后构建一次
+
+    结果按匹配档位排序：名称完全相同、名称前缀、名称包含、仅地址包含；同档内名称短的在前，
+    再按原始行序，因此结果的前若干项即可作为输入联想。返回值为行号数组，可直接用于 DataFrame.iloc。
+    """
+
+    def __init__(self, names: Sequence[str], addresses: Sequence[str]):
+        self.names = BigramIndex(names)
+        self.addresses = BigramIndex(addresses)
+        self._name_length = np.array([len(text) for text in self.names.texts], dtype=np.int32)
+
+    def __len__(self):
+        return len(self.names)
+
+    def search(self, query: str, limit: Optional[int] = None) -> np.ndarray:
+        """名称或地址包含 query 的行号，按相关度排序；空查询返回全部行"""
+        query = normalize_query(query)
+        if not query:
+            rows = np.arange(len(self), dtype=np.int32)
+            return rows if limit is None else rows[:limit]
+        rows = self._ranked(query)
+        return rows if limit is None else rows[:limit]
+
+    def _ranked(self, query: str) -> np.ndarray:
+        in_name = self.names.contains(query)
+        tiers = np.full(len(in_name), TIER_NAME, dtype=np.int8)
+        prefixed = np.isin(in_name, self.names.prefix(query), assume_unique=True)
+        tiers[prefixed] = TIER_PREFIX
+        # 包含 query 且长度相同即完全相同
+        tiers[self._name_length[in_name] == len(query)] = TIER_EXACT
+        in_address = np.setdiff1d(self.addresses.contains(query), in_name, assume_unique=True)
+        rows = np.concatenate([in_name, in_address])
+        tiers = np.concatenate([tiers, np.full(len(in_address), TIER_ADDRESS, dtype=np.int8)])
+        order = np.lexsort((rows, self._name_length[rows], tiers))
+        return rows[order]
@@ -0,0 +1,99 @@
+import math
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from services.marker_clustering import mercator
+
+# (南, 西, 北, 东)，单位为度
+Bounds = Tuple[float, float, float, float]
+
+
+class GridIndex:
+    """点坐标的等间距经纬度网格索引，每组点构建一次
+
+    点按网格编号（行优先）排序，查询矩形在同一网格行内覆盖的格子是一段连续的编号区间：
+    矩形查询只需对每个相交的网格行做一次 searchsorted，再向量化精确校验边界。
+    """
+
+    def __init__(self, lat, lon, cell_deg: float = 0.25):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.cell_deg = cell_deg
+        self.ncols = int(math.ceil(360.0 / cell_deg)) + 1
+        self.nrows = int(math.ceil(180.0 / cell_deg)) + 1
+
+        rows, cols = self._cell(self.lat, self.lon)
+        keys = rows * self.ncols + cols
+        self.order = np.argsort(keys, kind="stable")
+        self.sorted_keys = keys[self.order]
+
+    def __len__(self):
+        return len(self.lat)
+
+    def _cell(self, lat, lon):
+        rows = np.clip(((np.asarray(lat) + 90.0) // self.cell_deg).astype(np.int64), 0, self.nrows - 1)
+        cols = np.clip(((np.asarray(lon) + 180.0) // self.cell_deg).astype(np.int64), 0, self.ncols - 1)
+        return rows, cols
+
+    def query(self, bounds: Bounds) -> np.ndarray:
+        """bounds 内的点的下标，升序"""
+        south, west, north, east = bounds
+        if west > east:
+            # 矩形跨越180°经线时拆成两半分别查询
+            return np.union1d(self.query((south, west, north, 180.0)),
+                              self.query((south, -180.0, north, east)))
+        (row0, row1), (col0, col1) = self._cell([south, north], [west, east])
+        rows = np.arange(row0, row1 + 1, dtype=np.int64)
+        starts = np.searchsorted(self.sorted_keys, rows * self.ncols + col0, side="left")
+        ends = np.searchsorted(self.sorted_keys, rows * self.ncols + col1, side="right")
+        if not len(starts) or not (ends - starts).any():
+            return np.empty(0, dtype=np.int64)
+        candidates = self.order[np.concatenate([np.arange(s, e) for s, e in zip(starts, ends) if e > s])]
+        lat, lon = self.lat[candidates], self.lon[candidates]
+        inside = (lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)
+        return np.sort(candidates[inside])
+
+    def top_in(self, bounds: Bounds, priority: Optional[Sequence[float]], limit: int) -> np.ndarray:
+        """bounds 内最多 limit 个点，priority 高的在前（NaN 排最后）"""
+        indices = self.query(bounds)
+        if priority is None or len(indices) <= limit:
+            return indices[:limit]
+        scores = np.nan_to_num(np.asarray(priority, dtype=np.float64)[indices], nan=-np.inf)
+        best = np.argpartition(-scores, limit - 1)[:limit]
+        return indices[best[np.argsort(-scores[best], kind="stable")]]
+
+
+def pad_bounds(bounds: Bounds, ratio: float) -> Bounds:
+    """矩形每边向外扩展其尺寸的 ratio 倍（不超出合法经纬度范围）"""
+    south, west, north, east = bounds
+    dlat, dlon = (north - south) * ratio, (east - west) * ratio
+    return max(south - dlat, -90.0), max(west - dlon, -180.0), min(north + dlat, 90.0), min(east + dlon, 180.0)
+
+
+def contains(outer: Bounds, inner: Bounds) -> bool:
+    return outer[0] <= inner[0] and outer[1] <= inner[1] and outer[2] >= inner[2] and outer[3] >= inner[3]
+
+
+def estimate_bounds(center: Sequence[float], zoom: int, width_px: int = 1000, height_px: int = 650) -> Bounds:
+    """估算给定像素尺寸的 Web 墨卡托地图的可见范围"""
+    x, y = mercator(np.array([center[0]]), np.array([center[1]]))
+    world = 256.0 * 2 ** zoom
+    half_w, half_h = width_px / 2 / world, height_px / 2 / world
+    west = float((x[0] - half_w) * 360.0 - 180.0)
+    east = float((x[0] + half_w) * 360.0 - 180.0)
+
+    def to_lat(my):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * my))))
+
+    north, south = to_lat(max(float(y[0]) - half_h, 0.0)), to_lat(min(float(y[0]) + half_h, 1.0))
+    return south, max(west, -180.0), north, min(east, 180.0)
+
+
+def bounds_from_folium(state_bounds) -> Optional[Bounds]:
+    """把 st_folium 返回的 bounds（{_southWest, _northEast}）转换为元组，格式不对时返回None"""
+    try:
+        sw, ne = state_bounds["_southWest"], state_bounds["_northEast"]
+        return float(sw["lat"]), float(sw["lng"]), float(ne["lat"]), float(ne["lng"])
+    except (KeyError, TypeError, ValueError):
+        return None
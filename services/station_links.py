@@ -0,0 +1,144 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config.settings import settings
+from services.proximity import ProximityIndex, sight_locations
+
+# 一个景点的旧关联整体替换为新结果（OPTIONAL MATCH 未命中时 DELETE null 不做任何事）；
+# 按城市加名称定位景点，不同城市的同名景点互不影响
+_LINK_TEMPLATE = """
+    MATCH (s:Sight {city: row.city, name: row.sight})
+    OPTIONAL MATCH (s)-[old:NEAR_STATION]->()
+    DELETE old
+    WITH DISTINCT s, row
+    UNWIND row.stations AS near
+    MATCH (st:Station {poi_id: near.poi_id})
+    MERGE (s)-[r:NEAR_STATION]->(st)
+    SET r.distance_m = near.distance_m, r.rank = near.rank
+    RETURN count(r) AS linked
+"""
+
+# 全量重算前删除所有关联（包括已不在坐标表中的景点的旧关联），分批提交
+_UNLINK_ALL = """
+    MATCH ()-[r:NEAR_STATION]->()
+    CALL { WITH r DELETE r } IN TRANSACTIONS OF 10000 ROWS
+"""
+
+
+class NearStationLinker:
+    """批量计算每个景点最近的 k 个地铁站，写成 (Sight)-[:NEAR_STATION {distance_m, rank}]->(Station)
+
+    地铁站坐标取 Station 节点的 gd_lat/gd_lng（高德坐标），景点坐标取地理编码得到的坐标表
+    和 sights_data.json，两者同为 GCJ-02 坐标系。距离超过 max_distance_m 的地铁站不关联。
+    景点按 (城市, 名称) 写回，城市未知的景点取最近地铁站所在城市。
+    默认增量执行，只处理还没有 NEAR_STATION 关系的景点；地铁数据重新导入后用 full=True
+    先删除全部关联再全量重算。
+    """
+
+    def __init__(self, neo4j, k: Optional[int] = None, max_distance_m: Optional[float] = None):
+        self.neo4j = neo4j
+        self.k = k or settings.NEAR_STATION_K
+        self.max_distance_m = max_distance_m or settings.NEAR_STATION_MAX_M
+        self.station_cities: Dict[str, str] = {}
+
+    def load_stations(self) -> ProximityIndex:
+        rows = self.neo4j.execute_query("""
+            MATCH (st:Station)
+            WHERE st.gd_lat IS NOT NULL AND st.gd_lng IS NOT NULL
+            RETURN st.poi_id AS poi_id, st.city AS city, toFloat(st.gd_lat) AS lat, toFloat(st.gd_lng) AS lng
+        """)
+        rows = [row for row in rows if row["lat"] is not None and row["lng"] is not None]
+        self.station_cities = {row["poi_id"]: row["city"] for row in rows}
+        return ProximityIndex([row["poi_id"] for row in rows],
+                              [row["lat"] for row in rows], [row["lng"] for row in rows])
+
+    def linked_sights(self) -> set:
+        rows = self.neo4j.execute_query("""
+            MATCH (s:Sight) WHERE EXISTS { (s)-[:NEAR_STATION]->() }
+            RETURN DISTINCT s.city AS city, s.name AS name
+        """)
+        return {(row["city"], row["name"]) for row in rows}
+
+    def compute(self, stations: ProximityIndex, names: List[str], cities: List[Optional[str]],
+                lat: np.ndarray, lon: np.ndarray) -> List[Dict]:
+        """每个景点最近的地铁站: [{sight, city, stations: [{poi_id, distance_m, rank}]}]，附近没有地铁站的景点不出现"""
+        rows = []
+        for name, city, la, lo in zip(names, cities, lat.tolist(), lon.tolist()):
+            indices, distances = stations.nearest(la, lo, self.k, max_radius_m=self.max_distance_m)
+            if not len(indices):
+                continue
+            near = [{"poi_id": stations.names[i], "distance_m": round(float(d)), "rank": rank}
+                    for rank, (i, d) in enumerate(zip(indices.tolist(), distances.tolist()), 1)]
+            city = city or self.station_cities.get(near[0]["poi_id"])
+            if city:
+                rows.append({"sight": name, "city": city, "stations": near})
+        return rows
+
+    def run(self, full: bool = False) -> Dict[str, int]:
+        """计算并写回关联，返回处理的景点数、有地铁站的景点数和写入的关系数"""
+        stations = self.load_stations()
+        names, cities, lat, lon = sight_locations()
+        if full:
+            self.neo4j.execute_query(_UNLINK_ALL)
+        done = set() if full else self.linked_sights()
+        keep = self._pending(names, cities, done)
+        names, cities = [names[i] for i in keep], [cities[i] for i in keep]
+        rows = self.compute(stations, names, cities, lat[keep], lon[keep]) if len(stations) else []
+        rows = self._pending_rows(rows, done)
+        linked = 0
+        for records in self.neo4j.execute_bulk(_LINK_TEMPLATE, rows):
+            linked += sum(record["linked"] for record in records)
+        return {"sights": len(names), "with_stations": len(rows), "relationships": linked}
+
+    @staticmethod
+    def _pending(names: List[str], cities: List[Optional[str]], done: set) -> np.ndarray:
+        # 同一城市的同名景点只算一次（写回时按城市和名称匹配）
+        seen = set()
+        keep = []
+        for i, key in enumerate(zip(cities, names)):
+            if key[1] and key not in seen and key not in done:
+                seen.add(key)
+                keep.append(i)
+        return np.asarray(keep, dtype=np.int64)
+
+    @staticmethod
+    def _pending_rows(rows: List[Dict], done: set) -> List[Dict]:
+        # 城市由最近地铁站推断的景点到这里才能按 (城市, 名称) 去重
+        seen = set()
+        pending = []
+        for row in rows:
+            key = (row["city"], row["sight"])
+            if key not in seen and key not in done:
+                seen.add(key)
+                pending.append(row)
+        return pending
+
+
+def near_stations_cypher(sight_name: str, city: Optional[str] = None, limit: Optional[int] = None) -> str:
+    """"X附近有什么地铁站"的一跳查询；给出城市时与写入关联时一样按 (城市, 名称) 定位景点"""
+    def quote(value: str) -> str:
+        return value.replace("'", "\\'")
+
+    key = f"city: '{quote(city)}', name: '{quote(sight_name)}'" if city else f"name: '{quote(sight_name)}'"
+    return f"""
+        MATCH (s:Sight {{{key}}})-[r:NEAR_STATION]->(st:Station)
+        RETURN st.name AS name, st.line_name AS line, r.distance_m AS distance_m
+        ORDER BY r.distance_m
+        LIMIT {limit or settings.NEAR_STATION_K}
+    """.strip()
+
+
+if __name__ == "__main__":
+    # 执行: python -m services.station_links [--full]
+    import sys
+
+    from services.database import Neo4jDriver
+
+    neo4j = Neo4jDriver()
+    try:
+        stats = NearStationLinker(neo4j).run(full="--full" in sys.argv[1:])
+        print(f"{stats['sights']} sights processed, {stats['with_stations']} near a station, "
+              f"{stats['relationships']} NEAR_STATION relationships written")
+    finally:
+        neo4j.close()
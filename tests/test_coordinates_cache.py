@@ -0,0 +1,55 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from config.settings import settings
+from data_manager import coordinates_cache
+from data_manager.coordinates_cache import ColumnarCache
+
+
+def _source(tmp_path):
+    source = tmp_path / "sights_coordinates.csv"
+    pd.DataFrame({"name": ["故宫", "天坛", None], "lat": [39.9163, 39.8822, 31.2]}).to_csv(source, index=False)
+    return source
+
+
+def test_concurrent_builds_leave_one_complete_artifact(monkeypatch, tmp_path):
+    # 用 CSV 代替 Excel，避免依赖 openpyxl
+    monkeypatch.setattr(coordinates_cache.pd, "read_excel", pd.read_csv)
+    monkeypatch.setattr(settings, "COORDINATES_CACHE_FORMAT", "numpy")
+    source, cache_dir = _source(tmp_path), tmp_path / "cache"
+    errors = []
+
+    def build():
+        try:
+            ColumnarCache(source, cache_dir=str(cache_dir)).build()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=build) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    df = ColumnarCache(source, cache_dir=str(cache_dir)).load()
+    assert list(df["name"][:2]) == ["故宫", "天坛"] and pd.isna(df["name"][2])
+    assert sorted(p.name for p in cache_dir.iterdir() if p.is_dir()) == [
+        f"sights_coordinates-{df.attrs['source_hash'][:12]}"]
+    assert not [p for p in cache_dir.iterdir() if p.name.startswith(".")]
+
+
+def test_failed_build_removes_its_temporary_directory(monkeypatch, tmp_path):
+    monkeypatch.setattr(coordinates_cache.pd, "read_excel", pd.read_csv)
+    monkeypatch.setattr(settings, "COORDINATES_CACHE_FORMAT", "numpy")
+
+    def broken(df, directory):
+        raise IOError("disk full")
+
+    monkeypatch.setattr(ColumnarCache, "_write_numpy", staticmethod(broken))
+    cache_dir = tmp_path / "cache"
+    with pytest.raises(IOError):
+        ColumnarCache(_source(tmp_path), cache_dir=str(cache_dir)).build()
+    assert [p.name for p in cache_dir.iterdir()] == ["sights_coordinates.meta.json.lock"]
@@ -0,0 +1,83 @@
+import pytest
+
+pytest.importorskip("ollama")
+pytest.importorskip("neo4j")
+pytest.importorskip("folium")
+
+from core.Cyher_chat import LocalCypherGenerator  # noqa: E402
+
+
+@pytest.fixture
+def generator(monkeypatch):
+    # 不连接数据库，只测试意图识别
+    generator = LocalCypherGenerator.__new__(LocalCypherGenerator)
+    monkeypatch.setattr(generator, "_get_ranked_areas", lambda: [("City", "北京"), ("Province", "广西")])
+    return generator
+
+
+@pytest.mark.parametrize("question", ["北京最火的景点", "推荐几个北京好玩的地方", "广西必去的景区"])
+def test_ranking_intent_on_explicit_ranking_words(generator, question):
+    assert "TOP_RANKED" in generator._match_ranking_intent(question)
+
+
+@pytest.mark.parametrize("question", [
+    "北京有什么好玩的景点",
+    "北京有哪些景点",
+    "广西哪些景区免费",
+    "广西的5A景点有哪些",
+    "推荐广西的5A景点",
+    "北京人均100元以下的热门餐厅",
+    "推荐北京去哪玩",
+    "北京玩什么最火",
+])
+def test_ranking_intent_skips_generic_and_filtered_questions(generator, question):
+    assert generator._match_ranking_intent(question) is None
+
+
+class FakeFullText:
+    def resolve_hit(self, mention, label=None):
+        name = {"故宫": "故宫博物院"}.get(mention)
+        return {"label": label, "name": name, "city": "北京", "score": 5.0} if name else None
+
+    def resolve(self, mention, label=None):
+        hit = self.resolve_hit(mention, label)
+        return hit["name"] if hit else None
+
+
+@pytest.mark.parametrize("question", ["离故宫最近的地铁站是哪个", "故宫附近有什么地铁站"])
+def test_station_intent(generator, question):
+    generator.fulltext = FakeFullText()
+    assert "{city: '北京', name: '故宫博物院'}" in generator._match_station_intent(question)
+
+
+@pytest.mark.parametrize("question", ["最近地铁有什么新线路", "最近的地铁站怎么走", "某某公园附近有什么地铁站"])
+def test_station_intent_needs_nearby_and_a_resolved_sight(generator, question):
+    generator.fulltext = FakeFullText()
+    assert generator._match_station_intent(question) is None
+
+
+class FakeDriver:
+    def __init__(self):
+        self.calls = []
+
+    def execute_bulk(self, template, rows):
+        self.calls.append((template, rows))
+        return [[{"area": row["area"], "name": f"{row['area']}景点"}] for row in rows]
+
+
+def test_multi_area_ranking_passes_area_labels_as_parameters(generator):
+    generator.neo4j_driver = FakeDriver()
+    assert generator._match_ranking_intent("比较广西和北京的热门景点") is None
+    description, records = generator._match_ranking_comparison("比较广西和北京的热门景点")
+    [(template, rows)] = generator.neo4j_driver.calls
+    assert "row.area_label IN labels(a)" in template and "广西" not in template
+    assert [(row["area"], row["area_label"]) for row in rows] == [("广西", "Province"), ("北京", "City")]
+    assert [record["area"] for record in records] == ["广西", "北京"]
+
+
+@pytest.mark.parametrize("question", ["故宫附近有什么好吃的", "故宫周边有什么餐馆", "故宫附近吃什么", "故宫附近的酒店"])
+def test_nearby_intent_leaves_food_and_hotel_questions(generator, monkeypatch, question):
+    import core.Cyher_chat as chat
+
+    monkeypatch.setattr(chat, "get_sight_proximity", lambda: pytest.fail("nearby sights should not be used"))
+    assert generator._match_nearby_intent(question) is None
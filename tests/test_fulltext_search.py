@@ -0,0 +1,47 @@
+from services.fulltext_search import FULLTEXT_LABELS, FullTextSearch
+
+
+class FakeSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, parameters=None, **kwargs):
+        self.driver.calls.append((query, dict(parameters or {}, **kwargs)))
+        return self
+
+    def data(self):
+        return [{"label": "Sight", "name": f"景点{i}", "city": None, "address": None, "score": 1.0}
+                for i in range(self.driver.rows)]
+
+
+class FakeDriver:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def session(self):
+        return FakeSession(self)
+
+
+def test_unfiltered_search_pages_inside_the_procedure():
+    driver = FakeDriver(rows=4)
+    result = FullTextSearch(driver).search("故宫", page=3, page_size=3)
+    [(query, params)] = driver.calls
+    assert "{skip: $skip, limit: $limit}" in query and "collect(" not in query
+    assert (params["skip"], params["limit"]) == (6, 4)
+    assert result["has_more"] and len(result["hits"]) == 3
+
+
+def test_label_filtered_search_streams_into_skip_limit():
+    driver = FakeDriver(rows=1)
+    result = FullTextSearch(driver).search("故宫", labels=["Sight"], page_size=1)
+    [(query, params)] = driver.calls
+    assert "SKIP $skip LIMIT $limit" in query and "collect(" not in query
+    assert params["labels"] == ["Sight"] != FULLTEXT_LABELS
+    assert not result["has_more"] and result["hits"][0]["name"] == "景点0"
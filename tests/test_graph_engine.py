@@ -0,0 +1,48 @@
+from data_manager.graph_snapshot import GraphData, GraphSnapshot
+from services.graph_engine import InMemoryGraph
+
+
+def make_engine():
+    data = GraphData()
+    data.add_node("City", "北京", {"name": "北京"})
+    data.add_node("Sight", "北京_故宫", {"name": "故宫", "city_uid": "北京_故宫", "heat_num": 9.5})
+    data.add_rel("LOCATED_IN", ("Sight", "北京_故宫"), ("City", "北京"), {})
+    return InMemoryGraph(GraphSnapshot.from_graph_data(data, version=1))
+
+
+def test_supported_query_answered_from_snapshot():
+    engine = make_engine()
+    rows = engine.try_execute("MATCH (s:Sight)-[:LOCATED_IN]->(c:City {name: '北京'}) RETURN s.name AS name")
+    assert rows == [{"name": "故宫"}]
+
+
+def test_missing_relationship_type_falls_back():
+    # 快照早于排行物化，没有 TOP_RANKED 关系：应交给Neo4j而不是返回空结果
+    engine = make_engine()
+    assert engine.try_execute("MATCH (c:City {name: '北京'})-[r:TOP_RANKED]->(n) RETURN n.name AS name") is None
+
+
+def test_missing_label_falls_back():
+    engine = make_engine()
+    assert engine.try_execute("MATCH (r:Restaurant) RETURN r.name AS name LIMIT 5") is None
+
+
+def test_stale_snapshot_falls_back_to_neo4j(monkeypatch):
+    import time
+
+    from config.settings import settings
+    from services import graph_engine
+
+    data = GraphData()
+    data.add_node("City", "北京", {"name": "北京"})
+    snapshot = GraphSnapshot.from_graph_data(data, version=7)
+    monkeypatch.setattr(graph_engine, "get_snapshot", lambda: snapshot)
+    monkeypatch.setattr(graph_engine, "_engine_cache", {"version": None, "engine": None, "stale_warned": None})
+    monkeypatch.setattr(settings, "GRAPH_SNAPSHOT_MAX_AGE", 3600)
+
+    snapshot.created_at = time.time() - 7200
+    assert graph_engine.get_engine() is None
+    snapshot.created_at = time.time()
+    assert isinstance(graph_engine.get_engine(), InMemoryGraph)
+    snapshot.created_at = None
+    assert graph_engine.get_engine() is None
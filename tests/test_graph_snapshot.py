@@ -0,0 +1,70 @@
+import json
+
+import numpy as np
+
+from data_manager.graph_snapshot import GraphSnapshot, SnapshotExporter
+
+
+class FakeSession:
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query):
+        self.query = query
+        return self
+
+    def data(self):
+        nodes, rels = self.graph
+        if self.query == "CALL db.labels()":
+            return [{"label": label} for label in sorted({n["labels"][0] for n in nodes})]
+        if self.query.startswith("MATCH (n:"):
+            label = self.query.split("`")[1]
+            return [n for n in nodes if label in n["labels"]]
+        return rels
+
+
+class FakeDriver:
+    def __init__(self):
+        self.graph = ([], [])
+
+    def session(self):
+        return FakeSession(self.graph)
+
+
+def _graph(heat):
+    nodes = [
+        {"id": "c1", "labels": ["City"], "props": {"name": "北京"}},
+        {"id": "s1", "labels": ["Sight"], "props": {"name": "故宫", "city_uid": "北京_故宫", "heat": heat}},
+    ]
+    rels = [{"src": "s1", "dst": "c1", "type": "LOCATED_IN", "props": {}}]
+    return nodes, rels
+
+
+def test_incremental_export_keeps_loading_memory_mapped(tmp_path):
+    driver = FakeDriver()
+    exporter = SnapshotExporter(driver, tmp_path)
+    driver.graph = _graph(9.0)
+    assert exporter.export() == 1
+
+    # 图没有变化时沿用当前版本
+    assert exporter.export(incremental=True) == 1
+
+    driver.graph = _graph(9.5)
+    assert exporter.export(incremental=True) == 2
+    manifest = json.loads((tmp_path / "manifest.json").read_text(encoding="utf-8"))
+    assert manifest["deltas"] == [] and manifest["changes"] == ["delta-000002.json"]
+    assert not (tmp_path / "base-000001").exists()
+
+    snapshot = GraphSnapshot.load(tmp_path)
+    assert snapshot.version == 2
+    assert isinstance(snapshot.column("Sight", "heat"), np.memmap)
+    assert snapshot.values("Sight", "heat") == [9.5]
+    src, dst = snapshot.relationships("LOCATED_IN")
+    assert isinstance(src, np.memmap)
+    assert snapshot.names_of([int(src[0]), int(dst[0])]) == [("Sight", "故宫"), ("City", "北京")]
@@ -0,0 +1,77 @@
+from services.index_manager import INDEX_MANIFEST, IndexManager
+
+
+def _fulltext_entry():
+    return next(index for index in INDEX_MANIFEST if index["name"] == "entity_fulltext")
+
+
+def test_fulltext_index_covers_every_description_property():
+    index = _fulltext_entry()
+    assert index["label"] == ["Sight", "Restaurant", "Delicacy"]
+    # 景点/餐馆用 introduction，美食用 introduce
+    assert {"name", "introduction", "introduce"} <= set(index["properties"])
+    assert "n.`introduce`" in IndexManager.build_statement(index)
+
+
+class FakeSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query):
+        self.driver.queries.append(query)
+        self.rows = self.driver.existing if query.startswith("SHOW INDEXES") else []
+        return self
+
+    def data(self):
+        return self.rows
+
+
+class FakeDriver:
+    def __init__(self, existing):
+        self.existing = existing
+        self.queries = []
+
+    def session(self):
+        return FakeSession(self)
+
+
+def test_apply_recreates_index_whose_properties_changed():
+    index = _fulltext_entry()
+    outdated = {"name": index["name"], "labelsOrTypes": index["label"],
+                "properties": ["name", "address", "introduction", "features"]}
+    driver = FakeDriver([outdated])
+    assert IndexManager(driver, manifest=[index]).apply() == [index["name"]]
+    assert driver.queries[1] == f"DROP INDEX `{index['name']}` IF EXISTS"
+    assert driver.queries[2] == IndexManager.build_statement(index)
+
+
+def test_apply_skips_matching_index():
+    index = _fulltext_entry()
+    driver = FakeDriver([{"name": index["name"], "labelsOrTypes": index["label"],
+                          "properties": index["properties"]}])
+    assert IndexManager(driver, manifest=[index]).apply() == []
+    assert len(driver.queries) == 1
+
+
+def test_ensure_indexes_waits_and_reports_when_not_online(monkeypatch, capsys):
+    from config.settings import settings
+    from services import index_manager
+
+    index = _fulltext_entry()
+    driver = FakeDriver([{"name": index["name"], "labelsOrTypes": index["label"],
+                          "properties": index["properties"], "state": "POPULATING",
+                          "populationPercent": 42.0, "readCount": 0, "lastRead": None}])
+    monkeypatch.setattr(index_manager, "INDEX_MANIFEST", [index])
+    monkeypatch.setattr(index_manager, "_applied", False)
+    monkeypatch.setattr(settings, "APPLY_INDEXES_ON_STARTUP", True)
+    monkeypatch.setattr(settings, "STARTUP_INDEX_WAIT_TIMEOUT", 0)
+    index_manager.ensure_indexes(driver)
+    output = capsys.readouterr().out
+    assert "Timed out waiting for indexes: entity_fulltext" in output
+    assert "POPULATING" in output and "42.0%" in output
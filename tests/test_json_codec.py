@@ -0,0 +1,39 @@
+import json
+import random
+
+import pytest
+
+from data_manager.json_codec import iter_json
+
+DOCUMENTS = [
+    '[12.5]',
+    '[1, 0.1]',
+    '[-3e10, 1E-2, 0, true, false, null, "a\\"b", "中文"]',
+    '[{"a": [1, 2.25, {"b": null}]}, [], {}, 123456789.125]',
+    '{"x": 1.5, "y": [10, 20], "z": "</script>", "w": -0.000125}',
+    ' \n[ 1 ,\t2.5 ]\n',
+]
+
+
+def expected(text):
+    value = json.loads(text)
+    return list(value.items()) if isinstance(value, dict) else value
+
+
+@pytest.mark.parametrize("text", DOCUMENTS)
+def test_every_chunk_size(tmp_path, text):
+    path = tmp_path / "doc.json"
+    path.write_text(text, encoding="utf-8")
+    for chunk_size in range(1, len(text) + 1):
+        assert list(iter_json(path, chunk_size=chunk_size)) == expected(text), chunk_size
+
+
+def test_random_numbers_every_chunk_size(tmp_path):
+    rng = random.Random(0)
+    path = tmp_path / "numbers.json"
+    for _ in range(50):
+        values = [round(rng.uniform(-1e4, 1e4), rng.randint(0, 6)) for _ in range(rng.randint(1, 8))]
+        text = json.dumps(values)
+        path.write_text(text, encoding="utf-8")
+        for chunk_size in range(1, len(text) + 1):
+            assert list(iter_json(path, chunk_size=chunk_size)) == values
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("folium")
+
+from services import proximity  # noqa: E402
+from services.proximity import ProximityIndex  # noqa: E402
+
+
+class FakeStore:
+    def __init__(self):
+        self.revision = 1
+        self.points = [("故宫", 39.9163, 116.3972, None)]
+        self.coordinate_reads = 0
+
+    def coordinates(self):
+        self.coordinate_reads += 1
+        return list(self.points)
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = FakeStore()
+    builds = []
+    monkeypatch.setattr(proximity, "get_sights_store", lambda: store)
+    monkeypatch.setattr(proximity, "_meta_signature", lambda: (1, 1))
+    monkeypatch.setattr(proximity, "build_sight_index",
+                        lambda: builds.append(1) or ProximityIndex(["故宫"], np.array([39.9]), np.array([116.4])))
+    monkeypatch.setattr(proximity, "_sight_index", {"index": None, "meta": None, "revision": None,
+                                                    "coordinates": None})
+    store.builds = builds
+    return store
+
+
+def test_unchanged_revision_reuses_index_without_reading_coordinates(store):
+    index = proximity.get_sight_proximity()
+    reads = store.coordinate_reads
+    assert proximity.get_sight_proximity() is index
+    assert store.coordinate_reads == reads and len(store.builds) == 1
+
+
+def test_rating_does_not_rebuild_but_new_coordinates_do(store):
+    proximity.get_sight_proximity()
+    store.revision = 2
+    proximity.get_sight_proximity()
+    assert len(store.builds) == 1
+    store.revision = 3
+    store.points.append(("天坛", 39.8822, 116.4066, None))
+    proximity.get_sight_proximity()
+    assert len(store.builds) == 2
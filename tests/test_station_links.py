@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("folium")
+
+from services import station_links  # noqa: E402
+from services.station_links import NearStationLinker  # noqa: E402
+
+
+class FakeNeo4j:
+    def __init__(self, linked=()):
+        self.linked = list(linked)
+        self.queries = []
+        self.rows = []
+
+    def execute_query(self, cypher, **params):
+        self.queries.append(cypher)
+        if "RETURN st.poi_id" in cypher:
+            return [
+                {"poi_id": "bj1", "city": "北京", "lat": 39.9163, "lng": 116.3972},
+                {"poi_id": "nj1", "city": "南京", "lat": 32.0603, "lng": 118.7969},
+            ]
+        if "RETURN DISTINCT s.city" in cypher:
+            return self.linked
+        return []
+
+    def execute_bulk(self, template, rows):
+        self.rows.extend(rows)
+        return [[{"linked": len(row["stations"])}] for row in rows]
+
+
+@pytest.fixture
+def sights(monkeypatch):
+    # 两个城市各有一个"中山公园"，另有一个城市未知的景点
+    names = ["中山公园", "中山公园", "故宫"]
+    cities = ["北京", "南京", None]
+    lat = np.array([39.9170, 32.0610, 39.9165])
+    lon = np.array([116.3980, 118.7975, 116.3970])
+    monkeypatch.setattr(station_links, "sight_locations", lambda: (names, cities, lat, lon))
+
+
+def test_links_are_keyed_on_city(sights):
+    neo4j = FakeNeo4j()
+    stats = NearStationLinker(neo4j, k=1, max_distance_m=2000).run()
+    assert sorted((row["city"], row["sight"], row["stations"][0]["poi_id"]) for row in neo4j.rows) == [
+        ("北京", "中山公园", "bj1"), ("北京", "故宫", "bj1"), ("南京", "中山公园", "nj1"),
+    ]
+    assert stats == {"sights": 3, "with_stations": 3, "relationships": 3}
+
+
+def test_incremental_skips_linked_sights(sights):
+    neo4j = FakeNeo4j(linked=[{"city": "北京", "name": "中山公园"}, {"city": "北京", "name": "故宫"}])
+    NearStationLinker(neo4j, k=1, max_distance_m=2000).run()
+    assert [(row["city"], row["sight"]) for row in neo4j.rows] == [("南京", "中山公园")]
+    assert not any("IN TRANSACTIONS" in query for query in neo4j.queries)
+
+
+def test_full_run_deletes_all_links_first(sights):
+    neo4j = FakeNeo4j(linked=[{"city": "北京", "name": "中山公园"}])
+    NearStationLinker(neo4j, k=1, max_distance_m=2000).run(full=True)
+    assert any("DELETE r" in query for query in neo4j.queries)
+    assert len(neo4j.rows) == 3
+
+
+def test_near_stations_query_matches_city_and_name():
+    assert "(s:Sight {city: '北京', name: '中山公园'})" in station_links.near_stations_cypher("中山公园", "北京")
+    assert "(s:Sight {name: '中山公园'})" in station_links.near_stations_cypher("中山公园")
@@ -0,0 +1,75 @@
+import sqlite3
+
+import pytest
+
+from data_manager.storage import JsonFileBackend, SQLiteBackend, StorageBackend
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteBackend(tmp_path / "store.sqlite3")
+    return JsonFileBackend(tmp_path)
+
+
+def test_backend_interface_is_abstract():
+    with pytest.raises(TypeError):
+        StorageBackend()
+
+
+def test_compare_and_swap(backend):
+    assert backend.version("doc.json") is None
+    first = backend.compare_and_swap("doc.json", None, {"a": 1})
+    assert first is not None and backend.version("doc.json") == first
+    # 过期的版本号写入失败，数据不变
+    assert backend.compare_and_swap("doc.json", None, {"a": 2}) is None
+    assert backend.load("doc.json") == {"a": 1}
+    second = backend.compare_and_swap("doc.json", first, {"a": 3})
+    assert second is not None and second != first
+    assert backend.load("doc.json") == {"a": 3}
+
+
+@pytest.mark.parametrize("write", [
+    lambda b: b.save("doc.json", {"a": 2}),
+    lambda b: b.put_item("doc.json", "b", 1),
+    lambda b: b.delete_item("doc.json", "a"),
+    lambda b: b.append_item("doc.json", 1, key="items"),
+    lambda b: b.update("doc.json", lambda data: dict(data, c=1)),
+])
+def test_every_write_changes_version(backend, write):
+    version = backend.compare_and_swap("doc.json", None, {"a": 1})
+    write(backend)
+    assert backend.compare_and_swap("doc.json", version, {"a": 9}) is None
+
+
+def test_sqlite_adds_version_column_to_old_databases(tmp_path):
+    path = tmp_path / "old.sqlite3"
+    conn = sqlite3.connect(str(path))
+    conn.execute("CREATE TABLE documents (file TEXT PRIMARY KEY, shape TEXT NOT NULL)")
+    conn.execute("INSERT INTO documents VALUES ('doc.json', 'dict')")
+    conn.commit()
+    conn.close()
+    backend = SQLiteBackend(path)
+    version = backend.version("doc.json")
+    assert backend.compare_and_swap("doc.json", version, {"a": 1}) is not None
+    assert backend.load("doc.json") == {"a": 1}
+
+
+@pytest.mark.parametrize("operations", [
+    [("put_item", "doc.json", "a", {"x": 1}), ("put_item", "doc.json", "a", [1, 2]), ("put_item", "doc.json", "b", 2)],
+    [("save", "doc.json", [1, 2]), ("put_item", "doc.json", "a", 1)],
+    [("save", "doc.json", {"a": [1]}), ("append_item", "doc.json", 2)],
+    [("save", "doc.json", [1]), ("append_item", "doc.json", 2, "items"), ("append_item", "doc.json", 3, "items")],
+    [("delete_item", "doc.json", "a")],
+    [("save", "doc.json", [1]), ("delete_item", "doc.json", "a")],
+    [("save", "doc.json", {"a": 1, "b": [1]}), ("delete_item", "doc.json", "b"), ("put_item", "doc.json", "b", 3)],
+])
+def test_item_writes_match_between_backends(tmp_path, operations):
+    json_backend = JsonFileBackend(tmp_path)
+    sqlite_backend = SQLiteBackend(tmp_path / "store.sqlite3")
+    for backend in (json_backend, sqlite_backend):
+        for name, *args in operations:
+            getattr(backend, name)(*args)
+    assert sqlite_backend.load("doc.json") == json_backend.load("doc.json")
+    for key in ("a", "b", "items"):
+        assert sqlite_backend.get_item("doc.json", key) == json_backend.get_item("doc.json", key)
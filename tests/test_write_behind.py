@@ -0,0 +1,88 @@
+import json
+import time
+
+from config.settings import settings
+from data_manager.write_behind import WriteBehindQueue
+
+
+def _wait(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_failed_batch_is_retried_in_order(monkeypatch):
+    monkeypatch.setattr(settings, "WRITE_BEHIND_RETRY_DELAY", 0.01)
+    written, failures = [], [2]
+
+    def sink(payloads):
+        if failures[0]:
+            failures[0] -= 1
+            raise IOError("disk full")
+        written.extend(payloads)
+
+    queue = WriteBehindQueue(max_staleness=0.01)
+    queue.register("test", sink)
+    for i in range(3):
+        queue.submit("test", i)
+    assert _wait(lambda: len(written) == 3)
+    queue.submit("test", 3)
+    queue.close()
+    assert written == [0, 1, 2, 3]
+    assert queue.stats()["errors"] == 2
+    assert queue.stats()["retrying"] == 0
+
+
+def test_exhausted_retries_spill_to_disk(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "WRITE_BEHIND_RETRY_DELAY", 0.01)
+    monkeypatch.setattr(settings, "WRITE_BEHIND_MAX_RETRIES", 1)
+    monkeypatch.setattr(settings, "WRITE_BEHIND_SPILL_DIR", str(tmp_path))
+
+    def sink(payloads):
+        raise IOError("disk full")
+
+    queue = WriteBehindQueue(max_staleness=0.01)
+    queue.register("test", sink)
+    queue.submit("test", ["rating", "故宫", "alice", 5])
+    assert _wait(lambda: queue.stats()["spilled"] == 1)
+    queue.close()
+    lines = (tmp_path / "test.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["payload"] for line in lines] == [["rating", "故宫", "alice", 5]]
+
+
+def test_close_spills_pending_retries(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "WRITE_BEHIND_RETRY_DELAY", 60)
+    monkeypatch.setattr(settings, "WRITE_BEHIND_SPILL_DIR", str(tmp_path))
+
+    def sink(payloads):
+        raise IOError("disk full")
+
+    queue = WriteBehindQueue(max_staleness=0.01)
+    queue.register("test", sink)
+    queue.submit("test", 1)
+    assert _wait(lambda: queue.stats()["retrying"] == 1)
+    queue.close()
+    assert queue.stats()["spilled"] == 1
+    assert (tmp_path / "test.jsonl").exists()
+
+
+def test_retry_forever_sink_is_not_spilled_mid_run(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "WRITE_BEHIND_RETRY_DELAY", 0.01)
+    monkeypatch.setattr(settings, "WRITE_BEHIND_MAX_RETRIES", 1)
+    monkeypatch.setattr(settings, "WRITE_BEHIND_SPILL_DIR", str(tmp_path))
+    written, failures = [], [3]
+
+    def sink(payloads):
+        if failures[0]:
+            failures[0] -= 1
+            raise IOError("disk full")
+        written.extend(payloads)
+
+    queue = WriteBehindQueue(max_staleness=0.01)
+    queue.register("sights", sink, retry_forever=True)
+    queue.submit("sights", 1)
+    assert _wait(lambda: written == [1])
+    queue.close()
+    assert queue.stats()["spilled"] == 0
+    assert not (tmp_path / "sights.jsonl").exists()
@@ -24,8 +24,7 @@ if "show_login" not in st.session_state:
     st.session_state.show_login = True
 
 # 用户数据库
-USER_DB = FileHandler().get_path("users.json")
-if not USER_DB.exists():
+if not FileHandler().exists("users.json"):
     FileHandler().save_json("users.json", [
         {"username": "user", "password": "1234", "role": "user"},
         {"username": "admin", "password": "admin123", "role": "admin"}
@@ -48,17 +47,16 @@ def register():
                 st.error("两次输入的密码不一致")
                 return
 
-            users = FileHandler().load_json("users.json")
+            users = FileHandler().read_json("users.json")
             if any(u["username"] == username for u in users):
                 st.error("用户名已存在")
                 return
 
-            users.append({
+            FileHandler().append_item("users.json", {
                 "username": username,
                 "password": password,
                 "role": "user"
             })
-            FileHandler().save_json("users.json", users)
             st.success("注册成功！请登录")
             st.session_state.show_login = True
             time.sleep(1)
@@ -80,7 +78,7 @@ def login():
         password = st.text_input("密码", type="password")
 
         if st.form_submit_button("登录"):
-            users = FileHandler().load_json("users.json")
+            users = FileHandler().read_json("users.json")
             user = next((u for u in users if u["username"] == username and u["password"] == password), None)
 
             if user: